@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+
+
+class DiskCache:
+    """Size-capped on-disk cache with LRU eviction, tracked in an index.json file.
+
+    Several processes (render pool workers, render hosts, the prefetcher) may
+    share one cache directory: every change re-reads the index and writes it
+    back while holding an exclusive lock on index.lock.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = os.path.join(root, "index.lock")
+        self.lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+        # Counters for this process; lifetime totals are kept in the index
+        self.hits = 0
+        self.misses = 0
+        self.signature = None
+        self._refresh()
+
+    def _load(self):
+        """Loads the index from disk (or starts an empty one)."""
+        self.index = {"entries": {}, "stats": {"hits": 0, "misses": 0}}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.index.update(json.load(f))
+            except Exception as e:
+                print(f"  ⚠️ Cache index {self.index_path} unreadable, starting fresh: {e}")
+
+        # Drop entries whose files were removed behind our back
+        entries = self.index["entries"]
+        for key in [k for k, e in entries.items() if not os.path.exists(os.path.join(self.root, e["file"]))]:
+            del entries[key]
+
+    def _index_signature(self):
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        """Re-reads the index if another process (or cache object) wrote it since we last did."""
+        signature = self._index_signature()
+        if signature is None or signature != self.signature:
+            self._load()
+            self.signature = signature
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the index across threads and processes, with a fresh copy loaded.
+
+        The index is saved when the block exits.
+        """
+        with self.lock:
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield self.index
+                    self._save()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __getstate__(self):
+        # Locks can't be pickled (caches are handed to render worker processes)
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def _save(self):
+        """Writes the index atomically (readers outside the lock never see a partial file)."""
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+        self.signature = self._index_signature()
+
+    def path_for(self, key, ext=""):
+        """Returns the path a given key is (or will be) stored at."""
+        return os.path.join(self.root, f"{key}{ext}")
+
+    def get(self, key):
+        """Returns the cache entry for key (with its absolute 'path') or None, counting hit/miss."""
+        with self._locked() as index:
+            entry = index["entries"].get(key)
+            if entry and not os.path.exists(os.path.join(self.root, entry["file"])):
+                del index["entries"][key]
+                entry = None
+            if entry:
+                entry["last_used"] = time.time()
+                self.hits += 1
+                index["stats"]["hits"] += 1
+                return dict(entry, path=os.path.join(self.root, entry["file"]))
+
+            self.misses += 1
+            index["stats"]["misses"] += 1
+            return None
+
+    def peek(self, key):
+        """Returns the entry for key without touching stats or LRU order (None if missing)."""
+        with self.lock:
+            self._refresh()
+            entry = self.index["entries"].get(key)
+            return dict(entry) if entry else None
+
+    def keys(self):
+        """Keys currently in the cache (as seen by all processes)."""
+        with self.lock:
+            self._refresh()
+            return set(self.index["entries"])
+
+    def put(self, key, src_path, ext="", meta=None):
+        """Moves src_path into the cache under key and evicts old entries if over the size cap.
+
+        If the entry already stored under key is at least as good (see _keeps), src_path is
+        deleted and the stored file is kept. Returns the path of the cached file.
+        """
+        dest = self.path_for(key, ext)
+        with self._locked() as index:
+            # The file and its index entry change together: nobody sees one without the other
+            existing = index["entries"].get(key)
+            if existing and os.path.exists(os.path.join(self.root, existing["file"])) \
+                    and self._keeps(existing, meta or {}):
+                if os.path.abspath(src_path) != os.path.abspath(os.path.join(self.root, existing["file"])):
+                    os.unlink(src_path)
+                existing["last_used"] = time.time()
+                return os.path.join(self.root, existing["file"])
+
+            if os.path.abspath(src_path) != os.path.abspath(dest):
+                os.replace(src_path, dest)
+            index["entries"][key] = {
+                "file": os.path.basename(dest),
+                "size": os.path.getsize(dest),
+                "last_used": time.time(),
+                "meta": meta or {}
+            }
+            self._evict(keep=key)
+        return dest
+
+    def discard(self, key):
+        """Removes key and its file from the cache (no-op if missing); returns the bytes freed."""
+        with self._locked() as index:
+            entry = index["entries"].pop(key, None)
+            if entry is None:
+                return 0
+            try:
+                os.unlink(os.path.join(self.root, entry["file"]))
+            except OSError:
+                pass
+            self._on_evict(key)
+            return entry["size"]
+
+    def total_size(self):
+        return sum(e["size"] for e in self.index["entries"].values())
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        with self._locked():
+            self._evict(keep)
+
+    def _evict(self, keep=None):
+        """evict() for callers already holding _locked()."""
+        entries = self.index["entries"]
+        total = self.total_size()
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = entries.pop(key)
+            total -= entry["size"]
+            try:
+                os.unlink(os.path.join(self.root, entry["file"]))
+            except OSError:
+                pass
+            self._on_evict(key)
+
+    def _on_evict(self, key):
+        """Hook for subclasses that keep secondary indexes."""
+        pass
+
+    def _keeps(self, entry, meta):
+        """Whether put() keeps the stored entry instead of replacing it with a file described by meta."""
+        return False
+
+    def stats(self):
+        with self.lock:
+            self._refresh()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "total_hits": self.index["stats"]["hits"],
+                "total_misses": self.index["stats"]["misses"],
+                "entries": len(self.index["entries"]),
+                "bytes": self.total_size(),
+                "max_bytes": self.max_bytes
+            }
+
+
+class FootageCache(DiskCache):
+    """Stock footage cache keyed by Pexels video id and rendition, with a visual_query index."""
+
+    def _load(self):
+        super()._load()
+        self.index.setdefault("queries", {})
+
+    @staticmethod
+    def make_key(video_id, rendition):
+        """Rendition is the video file's WIDTHxHEIGHT."""
+        return f"pexels_{video_id}_{rendition}"
+
+    @staticmethod
+    def normalize_query(query):
+        return " ".join(query.lower().split())
+
+    def candidates(self, query):
+        """Returns cache keys of footage previously downloaded for this visual_query."""
+        with self.lock:
+            self._refresh()
+            keys = self.index["queries"].get(self.normalize_query(query), [])
+            return [k for k in keys if k in self.index["entries"]]
+
+    def remember_query(self, query, key):
+        """Records that the cached footage under key matches query."""
+        with self._locked() as index:
+            keys = index["queries"].setdefault(self.normalize_query(query), [])
+            if key not in keys:
+                keys.append(key)
+
+    @staticmethod
+    def covers(meta):
+        """Seconds a footage file plays (a prefix download covers less than the clip; None = all of it)."""
+        return meta.get("covers_s") or float("inf")
+
+    def _keeps(self, entry, meta):
+        # Another job may already be using the stored file: don't swap it for a shorter prefix
+        return self.covers(entry.get("meta", {})) >= self.covers(meta)
+
+    def _on_evict(self, key):
+        for query, keys in list(self.index["queries"].items()):
+            if key in keys:
+                keys.remove(key)
+            if not keys:
+                del self.index["queries"][query]
+
+
+class AudioCache(DiskCache):
+    """Voiceover cache keyed by a hash of (text, voice, rate); stores the mp3 plus its duration and word timings."""
+
+    @staticmethod
+    def make_key(text, voice, rate):
+        payload = json.dumps([text, voice, rate], ensure_ascii=False)
+        return "tts_" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class ResponseCache(DiskCache):
+    """LLM response cache keyed by a hash of (model, prompt, config); entries expire after a TTL."""
+
+    @staticmethod
+    def make_key(model, prompt, config=None):
+        payload = json.dumps([model, prompt, config], ensure_ascii=False, sort_keys=True)
+        return "llm_" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def get_fresh(self, key, ttl):
+        """Like get(), but an entry older than ttl seconds counts as a miss and is deleted."""
+        with self.lock:
+            entry = self.peek(key)
+            if entry and time.time() - entry["meta"].get("created", 0) > ttl:
+                self.discard(key)
+            return self.get(key)
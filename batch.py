@@ -0,0 +1,78 @@
+import os
+import json
+import time
+import argparse
+import datetime
+
+# Imported once: every short in the batch shares the bot, its caches, sessions and worker pools
+from scheduler import PipelineScheduler, STAGE_WORKERS, MAX_ACTIVE_JOBS
+from shorts_generator import ConfigError
+
+# Number of shorts per batch when no topics are given
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "6"))
+
+
+def read_topics(path):
+    """One topic per line (blank lines and # comments ignored)."""
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def run_batch(count=BATCH_SIZE, topics=None, regions=None, upload=True,
+              stage_workers=STAGE_WORKERS, max_active_jobs=MAX_ACTIVE_JOBS):
+    """Generates several shorts in one warm process and returns a summary per video.
+
+    Without topics, `count` distinct topics are picked from a single trend fetch.
+    """
+    scheduler = PipelineScheduler(stage_workers, max_active_jobs, upload=upload)
+    if not topics:
+        topics = scheduler.bot.select_trending_topics(count, regions)
+    if not topics:
+        raise Exception("No topics to generate")
+
+    print(f"[{datetime.datetime.now()}] 📦 Batch of {len(topics)} shorts: {', '.join(topics)}")
+    started = time.perf_counter()
+    results = scheduler.run_batch(topics)
+    elapsed = time.perf_counter() - started
+
+    summary = [
+        {
+            "job_id": job_id,
+            "topic": result['topic'],
+            "video_path": result['video_path'],
+            "metadata_path": os.path.splitext(result['video_path'])[0] + ".json",
+            "video_id": result['video_id'],
+        }
+        for job_id, result in results.items()
+    ]
+    print(f"[{datetime.datetime.now()}] ✅ {len(summary)}/{len(topics)} shorts in {elapsed:.0f}s")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate several YouTube Shorts in one process")
+    parser.add_argument("--count", type=int, default=BATCH_SIZE, help="Shorts to make from current trends")
+    parser.add_argument("--topics", nargs="+", help="Explicit topics (overrides --count)")
+    parser.add_argument("--topics-file", help="File with one topic per line")
+    parser.add_argument("--regions", help="Comma separated trend regions, e.g. US,GB,CA")
+    parser.add_argument("--no-upload", action="store_true", help="Only write videos and metadata to output/")
+    parser.add_argument("--max-active-jobs", type=int, default=MAX_ACTIVE_JOBS, help="Shorts in flight at once")
+    for stage, n in STAGE_WORKERS.items():
+        parser.add_argument(f"--{stage}-workers", type=int, default=n, help=f"Concurrency of the {stage} stage")
+    args = parser.parse_args()
+
+    topics = list(args.topics or [])
+    if args.topics_file:
+        topics += read_topics(args.topics_file)
+    regions = [r.strip() for r in args.regions.split(",") if r.strip()] if args.regions else None
+    stage_workers = {stage: getattr(args, f"{stage}_workers") for stage in STAGE_WORKERS}
+
+    try:
+        summary = run_batch(args.count, topics, regions, upload=not args.no_upload,
+                            stage_workers=stage_workers, max_active_jobs=args.max_active_jobs)
+    except ConfigError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+    print(json.dumps(summary, indent=2))
+    if len(summary) < (len(topics) or args.count):
+        raise SystemExit(1)
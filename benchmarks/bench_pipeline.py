@@ -0,0 +1,249 @@
+"""Offline end-to-end benchmark of the YouTubeShortsBot pipeline.
+
+Runs the real pipeline against local fakes (see fakes.py) and reports wall time,
+CPU time and peak RSS for every stage. Baselines are stored in
+benchmarks/baselines.json so regressions can be detected:
+
+    python3 benchmarks/bench_pipeline.py --scenes 6 --resolution 1080x1920 --save-baseline
+    python3 benchmarks/bench_pipeline.py --scenes 6 --resolution 1080x1920 --compare
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import RSSSampler
+
+BASELINES_FILE = os.path.join(ROOT, "benchmarks", "baselines.json")
+MEDIA_DIR = os.path.join(tempfile.gettempdir(), "shorts_bench_media")
+
+
+def cpu_seconds():
+    """User+system CPU of this process plus its finished children (ffmpeg)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class StageTimer:
+    """run_pipeline run_stage hook that measures every stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, stage, pool, fn, *args):
+        wall = time.perf_counter()
+        cpu = cpu_seconds()
+        with RSSSampler() as rss:
+            result = fn(*args)
+        self.stages[stage] = {
+            "wall_s": round(time.perf_counter() - wall, 3),
+            "cpu_s": round(cpu_seconds() - cpu, 3),
+            "peak_rss_mb": round(rss.peak, 1),
+            "child_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        }
+        return result
+
+
+def run_once(args, services, workdir):
+    """Runs the whole pipeline once inside workdir and returns per-stage metrics."""
+    import shorts_generator
+    import tts_engine
+    from encoder_profiles import encoder_settings
+    from fakes import FakeGenerativeModel, fake_synthesize
+
+    os.chdir(workdir)
+    tts_engine.synthesize = fake_synthesize
+    shorts_generator.upload_video = services.upload_video
+
+    bot = shorts_generator.YouTubeShortsBot(
+        render_backend=args.backend, render_parallel=args.parallel, subtitle_mode=args.subtitles,
+        low_memory=args.low_memory, remote_render=args.remote_workers > 0,
+        encoder=encoder_settings(args.encoder, args.time_budget, args.size_cap), draft=args.draft,
+        variants=args.variants
+    ).prepare()
+    bot.model = bot.llm.model = FakeGenerativeModel(scenes=args.scenes)
+    job_id = shorts_generator.new_job_id()
+
+    # In-process stand-ins for render hosts, pulling from the render queue
+    workers = []
+    if args.remote_workers:
+        from render_worker import RenderWorker
+        for i in range(args.remote_workers):
+            worker = RenderWorker(worker_id=f"bench-{i}")
+            threading.Thread(target=worker.run_forever, args=(0.2,), daemon=True).start()
+            workers.append(worker)
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    job_bot = bot.for_job(job_id)
+    try:
+        result = shorts_generator.run_pipeline(job_bot, job_id, run_stage=timer)
+    finally:
+        for worker in workers:
+            worker.stop()
+    total = time.perf_counter() - start
+
+    return {
+        "total_wall_s": round(total, 3),
+        "stages": timer.stages,
+        "output_mb": round(os.path.getsize(result["video_path"]) / 1024 / 1024, 2),
+        "counters": {stage: {k: v for k, v in m.items() if k not in ("duration_s", "status")}
+                     for stage, m in result["metrics"]["stages"].items()},
+        "llm_calls": bot.model.calls,
+        "video_id": result["video_id"],
+        "scenes": [r for r in job_bot.metrics.records if r["type"] == "scene"],
+        "drafts": [r for r in job_bot.metrics.records if r["type"] == "draft"],
+        "variants": [r for r in job_bot.metrics.records if r["type"] == "variant"],
+    }
+
+
+def config_key(args):
+    key = (f"scenes={args.scenes},res={args.resolution},fps={args.fps},backend={args.backend},"
+           f"parallel={int(args.parallel)},subs={args.subtitles},warm={int(args.warm)}")
+    key += ",lowmem=1" if args.low_memory else ""
+    key += ",draft=1" if args.draft else ""
+    key += f",uploadfail={args.upload_fail_every}" if args.upload_fail_every else ""
+    key += f",variants={'+'.join(args.variants)}" if args.variants else ""
+    if args.encoder != "balanced":
+        key += f",encoder={args.encoder}"
+        key += f",budget={args.time_budget:g}s" if args.time_budget else ""
+        key += f",cap={args.size_cap:g}MB" if args.size_cap else ""
+    return key + (f",remote={args.remote_workers}" if args.remote_workers else "")
+
+
+def load_baselines():
+    if os.path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def compare(baseline, report, tolerance):
+    """Returns a list of regression messages (stage wall time slower than baseline by > tolerance)."""
+    regressions = []
+    for stage, metrics in report["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base:
+            continue
+        # Ignore sub-second jitter
+        if metrics["wall_s"] > base["wall_s"] * (1 + tolerance) and metrics["wall_s"] - base["wall_s"] > 0.5:
+            regressions.append(f"{stage}: {metrics['wall_s']:.2f}s vs baseline {base['wall_s']:.2f}s")
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{'stage':<10} {'wall s':>8} {'cpu s':>8} {'peak MB':>9} {'child MB':>9}")
+    for stage, m in report["stages"].items():
+        print(f"{stage:<10} {m['wall_s']:>8.2f} {m['cpu_s']:>8.2f} {m['peak_rss_mb']:>9.1f} {m['child_peak_rss_mb']:>9.1f}")
+    print(f"{'total':<10} {report['total_wall_s']:>8.2f}   output {report['output_mb']} MB, "
+          f"{report['bytes_served'] / 1024 / 1024:.1f} MB served, {report['llm_calls']} LLM calls")
+    for stage, counters in report["counters"].items():
+        if counters:
+            print(f"  {stage}: " + ", ".join(f"{k}={v}" for k, v in counters.items()))
+    for scene in report["scenes"]:
+        print(f"  scene {scene['scene']}: {scene['duration_s']:.2f}s, peak {scene['peak_rss_mb']} MB (with ffmpeg children)")
+    for variant in report.get("variants", []):
+        print(f"  variant {variant['name']}: {variant['output_mb']} MB")
+    for draft in report.get("drafts", []):
+        print(f"  draft: {draft['render_s']:.2f}s, {len(draft['problems'])} problems")
+    if report.get("upload_chunk_failures"):
+        print(f"  upload: {report['upload_chunk_failures']} failed chunks resumed, video {report['video_id']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--scenes", type=int, default=6)
+    parser.add_argument("--resolution", default="1080x1920", help="Synthetic clip WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=30, help="Synthetic clip frame rate")
+    parser.add_argument("--backend", default="ffmpeg", choices=["moviepy", "ffmpeg"])
+    parser.add_argument("--parallel", action="store_true", help="Parallel per-scene rendering")
+    parser.add_argument("--subtitles", default="image", choices=["image", "ass"])
+    parser.add_argument("--low-memory", action="store_true", help="Render one scene at a time")
+    parser.add_argument("--remote-workers", type=int, default=0,
+                        help="Render through the render queue with this many in-process workers")
+    parser.add_argument("--encoder", default="balanced", help="Encoder profile name or 'auto'")
+    parser.add_argument("--time-budget", type=float, default=0, help="Auto encoder: encode time budget (s)")
+    parser.add_argument("--size-cap", type=float, default=0, help="Auto encoder: output size cap (MB)")
+    parser.add_argument("--draft", action="store_true", help="Render and validate a proxy draft first")
+    parser.add_argument("--variants", nargs="*", default=[], help="Output variants rendered in the same pass")
+    parser.add_argument("--upload-fail-every", type=int, default=0,
+                        help="Fail every Nth upload chunk with a 503 (the upload must resume and finish)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="Reuse caches between runs (first run is cold)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail if slower than the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    width, height = (int(x) for x in args.resolution.split("x"))
+
+    from fakes import FakeServices
+    services = FakeServices(MEDIA_DIR, width, height, fps=args.fps, upload_fail_every=args.upload_fail_every).start()
+
+    # Point the pipeline at the fakes before it is imported
+    os.environ["PEXELS_API_URL"] = f"{services.url}/videos/search"
+    os.environ["TRENDS_RSS_URL"] = f"{services.url}/trends/rss"
+    os.environ.setdefault("PEXELS_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="shorts_bench_")
+    reports = []
+    try:
+        for i in range(args.runs):
+            if not args.warm and i > 0:
+                shutil.rmtree(workdir, ignore_errors=True)
+                os.makedirs(workdir)
+            served_before, failures_before = services.bytes_served, services.upload_failures
+            report = run_once(args, services, workdir)
+            report["bytes_served"] = services.bytes_served - served_before
+            report["upload_chunk_failures"] = services.upload_failures - failures_before
+            if args.upload_fail_every and not report["video_id"]:
+                raise Exception("Upload did not complete after failed chunks")
+            reports.append(report)
+            print(f"\n=== Run {i + 1}/{args.runs} ({config_key(args)}) ===")
+            print_report(report)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        services.stop()
+
+    # Best run per stage is the least noisy number to compare
+    best = min(reports, key=lambda r: r["total_wall_s"])
+    key = config_key(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"config": key, "runs": reports}, f, indent=2)
+
+    baselines = load_baselines()
+    if args.save_baseline:
+        baselines[key] = best
+        with open(BASELINES_FILE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline saved for {key}")
+
+    if args.compare:
+        if key not in baselines:
+            print(f"\n⚠️ No baseline for {key}")
+            return 1
+        regressions = compare(baselines[key], best, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
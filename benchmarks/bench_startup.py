@@ -0,0 +1,136 @@
+"""Startup benchmark: how long it takes to import the pipeline's entry modules.
+
+Every measurement runs in a fresh interpreter with `python -X importtime`, so
+nothing is shared between runs. Also reports which heavy libraries an import
+pulls in (they should only load when the stage that needs them runs).
+Baselines are stored in benchmarks/startup_baselines.json:
+
+    python3 benchmarks/bench_startup.py --save-baseline
+    python3 benchmarks/bench_startup.py --compare
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINES_FILE = os.path.join(ROOT, "benchmarks", "startup_baselines.json")
+
+MODULES = ["shorts_generator", "scheduler", "batch", "renderers", "youtube_uploader"]
+# Libraries that must not be loaded just by importing the pipeline
+HEAVY = ["moviepy", "google.generativeai", "googleapiclient", "edge_tts", "PIL", "numpy"]
+
+PROBE = (
+    "import sys, json; import {module}; "
+    "print(json.dumps([m for m in {heavy!r} if m in sys.modules]))"
+)
+
+
+def measure(module):
+    """Imports module in a fresh interpreter; returns (import seconds, heavy libraries loaded)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise Exception(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+
+    # "import time: self [us] | cumulative | imported package"; the module's own line is its total
+    total_us = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            total_us = int(parts[1])
+    if total_us is None:
+        raise Exception(f"No import time reported for {module}")
+    return total_us / 1e6, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(modules, runs):
+    report = {}
+    for module in modules:
+        times, heavy = [], []
+        for _ in range(runs):
+            seconds, heavy = measure(module)
+            times.append(seconds)
+        report[module] = {
+            "median_s": round(statistics.median(times), 4),
+            "min_s": round(min(times), 4),
+            "heavy_loaded": heavy,
+        }
+    return report
+
+
+def load_baselines():
+    if os.path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def compare(baseline, report, tolerance):
+    """Returns a list of regressions: slower imports (> tolerance and > 50 ms) and newly loaded heavy libraries."""
+    regressions = []
+    for module, m in report.items():
+        base = baseline.get(module)
+        if not base:
+            continue
+        if m["median_s"] > base["median_s"] * (1 + tolerance) and m["median_s"] - base["median_s"] > 0.05:
+            regressions.append(f"{module}: {m['median_s']:.3f}s vs baseline {base['median_s']:.3f}s")
+        new_heavy = sorted(set(m["heavy_loaded"]) - set(base["heavy_loaded"]))
+        if new_heavy:
+            regressions.append(f"{module}: now imports {', '.join(new_heavy)}")
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{'module':<18} {'median s':>9} {'min s':>8}  heavy libraries loaded")
+    for module, m in report.items():
+        print(f"{module:<18} {m['median_s']:>9.3f} {m['min_s']:>8.3f}  {', '.join(m['heavy_loaded']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail if slower than the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.modules, args.runs)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baselines = load_baselines()
+    if args.save_baseline:
+        baselines.update(report)
+        with open(BASELINES_FILE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print("\n💾 Baseline saved")
+
+    if args.compare:
+        missing = [m for m in report if m not in baselines]
+        if missing:
+            print(f"\n⚠️ No baseline for {', '.join(missing)}")
+            return 1
+        regressions = compare(baselines, report, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
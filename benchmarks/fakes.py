@@ -0,0 +1,273 @@
+"""Local stand-ins for Pexels, Google Trends, Gemini, Edge TTS and YouTube used by the benchmarks."""
+import os
+import json
+import zlib
+import asyncio
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from renderers import ffmpeg_binary
+
+# Rough speaking rate of the real voice at +25%
+SECONDS_PER_WORD = 0.32
+
+TOPICS = ["Lionel Messi", "Taylor Swift", "Keanu Reeves", "Patrick Mahomes", "Zendaya", "Black Holes"]
+
+
+def make_clip(path, width, height, duration=10, fps=30):
+    """Generates a synthetic MP4 test pattern (cached on disk)."""
+    if not os.path.exists(path):
+        subprocess.run([
+            ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}',
+            '-t', str(duration), '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            # moov first, like Pexels files (lets the pipeline fetch just a prefix)
+            '-movflags', '+faststart',
+            path
+        ], check=True)
+    return path
+
+
+def make_tone(path, duration):
+    return [
+        ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'sine=frequency=220:sample_rate=24000:duration={duration:.3f}',
+        '-ac', '1', '-c:a', 'libmp3lame', '-b:a', '48k', path
+    ]
+
+
+def rss_feed(topics):
+    items = "".join(f"<item><title>{t}</title></item>" for t in topics)
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+class FakeServices:
+    """One local HTTP server speaking just enough Pexels, Trends RSS and upload to run the pipeline."""
+
+    def __init__(self, media_dir, width=1080, height=1920, clips=3, clip_duration=10, fps=30, upload_fail_every=0):
+        self.media_dir = media_dir
+        os.makedirs(media_dir, exist_ok=True)
+        self.clip_meta = {"width": width, "height": height, "fps": fps}
+        # Clip i lasts (i + 1) * clip_duration, so the planner has durations to choose from
+        self.clips = [
+            (make_clip(os.path.join(media_dir, f"clip_{width}x{height}_{fps}_{(i + 1) * clip_duration}s.mp4"),
+                       width, height, (i + 1) * clip_duration, fps), (i + 1) * clip_duration)
+            for i in range(clips)
+        ]
+        self.uploads = []
+        # Resumable upload sessions: id -> {"size", "received", "video_id"}
+        self.upload_sessions = {}
+        # Answer every Nth upload chunk with a 503 (0 = never) to exercise retries
+        self.upload_fail_every = upload_fail_every
+        self.upload_chunks = 0
+        self.upload_failures = 0
+        self.upload_queue = None
+        self.bytes_served = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, body, content_type, status=200, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with services.lock:
+                    services.bytes_served += len(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/videos/search":
+                    self.send_body(json.dumps(services.search(parse_qs(url.query))).encode(), "application/json")
+                elif url.path.startswith("/files/"):
+                    path = os.path.join(services.media_dir, os.path.basename(url.path))
+                    if not os.path.exists(path):
+                        return self.send_body(b"not found", "text/plain", 404)
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                    # Single "bytes=a-b" / "bytes=a-" ranges, like a CDN
+                    requested = self.headers.get("Range", "")
+                    if requested.startswith("bytes="):
+                        first, _, last = requested[6:].partition("-")
+                        start, end = int(first), min(int(last) if last else len(body) - 1, len(body) - 1)
+                        headers = {"Accept-Ranges": "bytes", "Content-Range": f"bytes {start}-{end}/{len(body)}"}
+                        self.send_body(body[start:end + 1], "video/mp4", 206, headers)
+                    else:
+                        self.send_body(body, "video/mp4", headers={"Accept-Ranges": "bytes"})
+                elif url.path == "/trends/rss":
+                    body = rss_feed(TOPICS)
+                    etag = f'"{zlib.crc32(body):08x}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_body(b"", "application/rss+xml", 304, {"ETag": etag})
+                    else:
+                        self.send_body(body, "application/rss+xml", headers={"ETag": etag})
+                else:
+                    self.send_body(b"not found", "text/plain", 404)
+
+            def read_body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                data = b""
+                while len(data) < length:
+                    data += self.rfile.read(min(length - len(data), 1024 * 1024))
+                return data
+
+            def do_POST(self):
+                # Resumable upload, step 1: create a session (body is the video resource)
+                url = urlparse(self.path)
+                if url.path != "/upload/youtube/v3/videos" or parse_qs(url.query).get("uploadType") != ["resumable"]:
+                    return self.send_body(b"not found", "text/plain", 404)
+                json.loads(self.read_body() or b"{}")
+                with services.lock:
+                    session_id = str(len(services.upload_sessions) + 1)
+                    services.upload_sessions[session_id] = {
+                        "size": int(self.headers["X-Upload-Content-Length"]), "received": 0, "video_id": None
+                    }
+                self.send_body(b"", "text/plain", headers={"Location": f"{services.url}/upload/session/{session_id}"})
+
+            def do_PUT(self):
+                # Resumable upload, step 2: chunks ("bytes a-b/size") and status queries ("bytes */size")
+                session_id = os.path.basename(urlparse(self.path).path)
+                data = self.read_body()
+                status, body, headers = services.receive_chunk(session_id, self.headers.get("Content-Range", ""), data)
+                self.send_body(body, "application/json" if status == 201 else "text/plain", status, headers)
+
+        return Handler
+
+    def receive_chunk(self, session_id, content_range, data):
+        """Applies one resumable-upload PUT; returns (status, body, headers)."""
+        with self.lock:
+            session = self.upload_sessions.get(session_id)
+            if session is None:
+                return 404, b"not found", {}
+            if data:
+                self.upload_chunks += 1
+                if self.upload_fail_every and self.upload_chunks % self.upload_fail_every == 0:
+                    self.upload_failures += 1
+                    return 503, b"backend error", {}
+                start = int(content_range.split()[1].split("-")[0])
+                # Only contiguous bytes are kept, like the real service
+                if start == session["received"]:
+                    session["received"] += len(data)
+            if session["received"] >= session["size"] and session["video_id"] is None:
+                self.uploads.append(session["size"])
+                session["video_id"] = f"fake{len(self.uploads)}"
+            if session["video_id"]:
+                return 201, json.dumps({"id": session["video_id"]}).encode(), {}
+            received = session["received"]
+        return 308, b"", ({"Range": f"bytes=0-{received - 1}"} if received else {})
+
+    def search(self, params):
+        """Pexels-shaped search response pointing at the synthetic clips."""
+        query = params.get("query", [""])[0]
+        meta = self.clip_meta
+        videos = []
+        for i, (path, duration) in enumerate(self.clips):
+            videos.append({
+                "id": zlib.crc32(f"{query}|{i}".encode()) % 10_000_000,
+                "width": meta["width"],
+                "height": meta["height"],
+                "duration": duration,
+                "video_files": [{
+                    "id": i,
+                    "quality": "hd",
+                    "file_type": "video/mp4",
+                    "width": meta["width"],
+                    "height": meta["height"],
+                    "fps": meta["fps"],
+                    "link": f"{self.url}/files/{os.path.basename(path)}"
+                }]
+            })
+        return {"videos": videos}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def uploader(self, chunk_size=1024 * 1024, **kwargs):
+        """A real YouTubeUploader talking to the fake resumable-upload endpoint (no OAuth)."""
+        import requests
+        from youtube_uploader import YouTubeUploader
+        return YouTubeUploader(
+            chunk_size=chunk_size, http=requests.Session(),
+            upload_url=f"{self.url}/upload/youtube/v3/videos", **kwargs
+        )
+
+    def upload_video(self, file_path, title, description, tags, category_id="22", channel=None):
+        """Drop-in for youtube_uploader.upload_video: same upload queue, fake endpoint for every channel."""
+        from youtube_uploader import UploadQueue
+        if self.upload_queue is None:
+            self.upload_queue = UploadQueue(uploaders={"default": self.uploader()})
+        return self.upload_queue.submit(file_path, title, description, tags, category_id=category_id).result()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Canned GenerativeModel: answers the topic, script and metadata prompts."""
+
+    def __init__(self, scenes=6, words_per_scene=12):
+        self.scenes = scenes
+        self.words_per_scene = words_per_scene
+        self.calls = 0
+
+    def script(self):
+        filler = "this is an amazing fact that will absolutely blow your mind today".split()
+        return [
+            {
+                "text": " ".join((filler * 2)[:self.words_per_scene]),
+                "visual_query": f"query {i % 3}"
+            }
+            for i in range(self.scenes)
+        ]
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        metadata = {
+            "title": "Benchmark Short #Shorts",
+            "description": "Synthetic benchmark run.",
+            "tags": ["benchmark", "shorts"]
+        }
+        if "trending topics" in prompt and "JSON LIST" in prompt:
+            return FakeResponse(json.dumps(TOPICS))
+        if "trending topics" in prompt:
+            return FakeResponse(TOPICS[self.calls % len(TOPICS)])
+        if "ONE JSON object" in prompt:
+            return FakeResponse(json.dumps({"script": self.script(), "metadata": metadata}))
+        if "script" in prompt and "metadata" not in prompt:
+            return FakeResponse("```json\n" + json.dumps(self.script()) + "\n```")
+        return FakeResponse(json.dumps(metadata))
+
+
+async def fake_synthesize(text, path, voice=None, rate=None):
+    """Stands in for tts_engine.synthesize: a tone mp3 of realistic length with even word timings."""
+    words = text.split()
+    duration = max(1.0, len(words) * SECONDS_PER_WORD + 0.3)
+    proc = await asyncio.create_subprocess_exec(
+        *make_tone(path, duration), stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise Exception(f"fake TTS failed: {stderr.decode()[-500:]}")
+
+    step = (duration - 0.3) / max(1, len(words))
+    timings = [{"word": w, "start": j * step, "end": (j + 1) * step} for j, w in enumerate(words)]
+    return {"path": path, "duration": duration, "words": timings}
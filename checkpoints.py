@@ -0,0 +1,56 @@
+import os
+import json
+import time
+
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+
+
+def scene_files(script_data, *keys):
+    """Collects the file paths stored under the given keys of each scene."""
+    return [scene[key] for scene in script_data for key in keys if scene.get(key)]
+
+
+class JobCheckpoints:
+    """Persists each pipeline stage's output under jobs/<job_id>/ so a failed job can resume."""
+
+    def __init__(self, job_id, root=JOBS_DIR):
+        self.job_id = job_id
+        self.dir = os.path.join(root, job_id)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, stage):
+        return os.path.join(self.dir, f"{stage}.json")
+
+    def save(self, stage, value, files=None):
+        """Saves a stage's output; files are paths the output depends on (checked on load)."""
+        record = {
+            "stage": stage,
+            "saved_at": time.time(),
+            "value": value,
+            "files": files or []
+        }
+        tmp_path = self.path(stage) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self.path(stage))
+
+    def load(self, stage):
+        """Returns a stage's saved output, or None if there is no valid checkpoint."""
+        if not os.path.exists(self.path(stage)):
+            return None
+        try:
+            with open(self.path(stage), 'r') as f:
+                record = json.load(f)
+        except Exception as e:
+            print(f"  ⚠️ Ignoring unreadable checkpoint {self.path(stage)}: {e}")
+            return None
+
+        missing = [p for p in record.get("files", []) if not os.path.exists(p)]
+        if missing:
+            print(f"  ⚠️ Checkpoint '{stage}' is stale (missing {missing[0]}), re-running.")
+            return None
+        return record["value"]
+
+    def completed(self):
+        """Names of stages with a checkpoint on disk."""
+        return [f[:-5] for f in os.listdir(self.dir) if f.endswith(".json")]
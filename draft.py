@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+from renderers import (
+    WIDTH, FPS, FADE_IN, MAX_DURATION, FFmpegRenderer, ffmpeg_binary, renderable_scenes, scene_duration
+)
+from subtitles import word_timings, SUBTITLE_FONT, FONT_SIZE, STROKE_WIDTH, MAX_WIDTH, PADDING
+from encoder_profiles import ENCODER_PROFILES
+
+# Proxy frame size for drafts (same 9:16 framing, 1/16 of the pixels)
+DRAFT_RESOLUTION = os.getenv("DRAFT_RESOLUTION", "270x480")
+# Contact sheet columns (one keyframe per scene, taken mid-scene)
+CONTACT_SHEET_COLUMNS = int(os.getenv("CONTACT_SHEET_COLUMNS", "4"))
+# Default validation thresholds
+DRAFT_MIN_DURATION_S = float(os.getenv("DRAFT_MIN_DURATION_S", "10"))
+# Voiceover past MAX_DURATION that may be trimmed off the end
+DRAFT_MAX_TRIM_S = float(os.getenv("DRAFT_MAX_TRIM_S", "2"))
+# Allowed difference between the planned and the rendered length
+DRAFT_DURATION_TOLERANCE_S = 0.5
+# A scene that is black for more than this share of its length is broken footage
+DRAFT_MAX_BLACK_SHARE = 0.5
+# ASS subtitles are drawn at a fixed size between 10 px margins (see subtitles.write_ass)
+ASS_SAFE_WIDTH = WIDTH - 20
+
+
+class DraftRejected(Exception):
+    """The draft failed validation; the full render was not started."""
+
+
+def draft_size(resolution=DRAFT_RESOLUTION):
+    width, height = (int(x) for x in resolution.lower().split("x"))
+    return width, height
+
+
+def draft_encoder():
+    """Fastest x264 settings; proxies are looked at, not published."""
+    return dict(ENCODER_PROFILES["draft"], name="draft", threads=None, maxrate_kbps=None)
+
+
+def scene_starts(scenes):
+    """[(start, duration)] of each scene on the final timeline (scenes past MAX_DURATION are dropped)."""
+    starts = []
+    offset = 0
+    for scene in scenes:
+        if offset >= MAX_DURATION:
+            break
+        duration = scene_duration(scene)
+        starts.append((offset, min(duration, MAX_DURATION - offset)))
+        offset += duration
+    return starts
+
+
+def contact_sheet(preview_path, starts, sheet_path, columns=CONTACT_SHEET_COLUMNS):
+    """Tiles one mid-scene frame per scene into sheet_path, in the same decode that probes the preview.
+
+    Returns (preview duration in seconds, [(black_start, black_end)]).
+    """
+    frames = [int((start + duration / 2) * FPS) for start, duration in starts]
+    columns = max(1, min(columns, len(frames)))
+    rows = -(-len(frames) // columns)
+    select = "+".join(f"eq(n\\,{frame})" for frame in frames)
+    cmd = [
+        ffmpeg_binary(), '-y', '-hide_banner', '-i', preview_path,
+        '-vf', f"blackdetect=d=0.2:pix_th=0.10,select='{select}',tile={columns}x{rows}:nb_frames={len(frames)}:padding=4",
+        '-an', '-fps_mode', 'vfr', '-update', '1', sheet_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg contact sheet failed: {result.stderr.strip()[-2000:]}")
+
+    # ffmpeg logs the input duration and every black interval on stderr
+    match = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", result.stderr)
+    duration = int(match[1]) * 3600 + int(match[2]) * 60 + float(match[3]) if match else None
+    black = [(float(s), float(e)) for s, e in re.findall(r"black_start:([\d.]+) black_end:([\d.]+)", result.stderr)]
+    return duration, black
+
+
+def render_draft(script_data, output_path, assets_dir, subtitle_mode="image", resolution=DRAFT_RESOLUTION):
+    """Renders the scene list at proxy resolution with the fast preset, plus a contact sheet.
+
+    Always uses the ffmpeg filtergraph with ASS subtitles (the same word timings
+    as either subtitle mode). Returns the draft: {"preview_path", "sheet_path",
+    "duration", "black", "scenes", "subtitle_mode", "render_s"}.
+    """
+    scenes = renderable_scenes(script_data)
+    if not scenes:
+        raise DraftRejected("No renderable scenes")
+
+    base = os.path.splitext(output_path)[0]
+    preview_path, sheet_path = base + ".draft.mp4", base + ".sheet.jpg"
+    renderer = FFmpegRenderer(assets_dir, draft_encoder(), draft_size(resolution))
+    started = time.perf_counter()
+    renderer.run(renderer.build_command(scenes, preview_path, os.path.join(assets_dir, "draft.ass")))
+    starts = scene_starts(scenes)
+    duration, black = contact_sheet(preview_path, starts, sheet_path)
+    return {
+        "preview_path": preview_path,
+        "sheet_path": sheet_path,
+        "duration": duration,
+        "black": black,
+        "scenes": starts,
+        "subtitle_mode": subtitle_mode,
+        "render_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def clipped_words(words, subtitle_mode="image"):
+    """Subtitle words wider than the frame (cut off at the edges in the final video)."""
+    from PIL import ImageFont
+
+    # Image mode shrinks a long word down to 20 px before giving up (see SubtitleRenderer)
+    if subtitle_mode == "ass":
+        font, limit = ImageFont.truetype(SUBTITLE_FONT, FONT_SIZE), ASS_SAFE_WIDTH
+    else:
+        font, limit = ImageFont.truetype(SUBTITLE_FONT, 20), MAX_WIDTH - 2 * PADDING
+    clipped = []
+    for word in dict.fromkeys(w.upper() for w in words):
+        left, _, right, _ = font.getbbox(word, stroke_width=STROKE_WIDTH)
+        if right - left > limit:
+            clipped.append(word)
+    return clipped
+
+
+def validate_draft(script_data, draft):
+    """Default draft check; returns a list of problems (empty: go ahead with the full render).
+
+    Looks for missing scenes, subtitles that fall after the voiceover or off the
+    frame, overlong or too short videos, a preview that doesn't match the plan,
+    and black (broken) footage.
+    """
+    problems = []
+    scenes = renderable_scenes(script_data)
+    if len(scenes) < len(script_data):
+        problems.append(f"{len(script_data) - len(scenes)} of {len(script_data)} scenes have no footage or voiceover")
+
+    words = []
+    for i, scene in enumerate(scenes):
+        duration = scene_duration(scene)
+        if duration < FADE_IN * 2:
+            problems.append(f"Scene {i+1}: voiceover is only {duration:.2f}s")
+        timed = word_timings(scene, duration)
+        if scene.get('words') and len(timed) < len(scene['words']):
+            problems.append(f"Scene {i+1}: {len(scene['words']) - len(timed)} subtitle words start after the voiceover ends")
+        words.extend(word for word, _, _ in timed)
+
+    clipped = clipped_words(words, draft.get("subtitle_mode", "image"))
+    if clipped:
+        problems.append(f"Subtitles too wide for the frame: {', '.join(clipped[:5])}")
+
+    planned = sum(scene_duration(scene) for scene in scenes)
+    if planned > MAX_DURATION + DRAFT_MAX_TRIM_S:
+        problems.append(f"Voiceover is {planned:.1f}s, the last {planned - MAX_DURATION:.1f}s would be trimmed")
+    if planned < DRAFT_MIN_DURATION_S:
+        problems.append(f"Video is only {planned:.1f}s long")
+    if draft.get("duration") is not None and abs(draft["duration"] - min(planned, MAX_DURATION)) > DRAFT_DURATION_TOLERANCE_S:
+        problems.append(f"Preview is {draft['duration']:.1f}s, planned {min(planned, MAX_DURATION):.1f}s")
+
+    for i, (start, duration) in enumerate(draft.get("scenes", [])):
+        black = sum(max(0, min(end, start + duration) - max(b_start, start)) for b_start, end in draft.get("black", []))
+        if duration and black / duration > DRAFT_MAX_BLACK_SHARE:
+            problems.append(f"Scene {i+1}: footage is black for {black:.1f}s of {duration:.1f}s")
+    return problems
+
+
+if __name__ == "__main__":
+    from checkpoints import JobCheckpoints
+
+    parser = argparse.ArgumentParser(description="Render a proxy draft and contact sheet of a checkpointed job")
+    parser.add_argument("--job-id", required=True, help="Job whose 'assets' checkpoint to draft")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--resolution", default=DRAFT_RESOLUTION)
+    parser.add_argument("--subtitles", default=os.getenv("SUBTITLE_MODE", "image"), choices=["image", "ass"])
+    args = parser.parse_args()
+
+    script_data = JobCheckpoints(args.job_id).load("assets")
+    if script_data is None:
+        print(f"❌ Job {args.job_id} has no valid 'assets' checkpoint")
+        sys.exit(2)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        draft = render_draft(script_data, os.path.join(args.output_dir, f"short_{args.job_id}.mp4"),
+                             tmp, args.subtitles, args.resolution)
+    print(f"📝 Draft: {draft['preview_path']}, contact sheet: {draft['sheet_path']} ({draft['render_s']:.1f}s)")
+    problems = validate_draft(script_data, draft)
+    for problem in problems:
+        print(f"  ⚠️ {problem}")
+    print("❌ Draft rejected" if problems else "✅ Draft OK")
+    sys.exit(1 if problems else 0)
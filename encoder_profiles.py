@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+from renderers import WIDTH, HEIGHT, FPS, MAX_DURATION, ffmpeg_binary
+
+# Named x264 profiles ("balanced" is what libx264 does without options: medium, CRF 23)
+ENCODER_PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 30},
+    "fast": {"preset": "veryfast", "crf": 25},
+    "balanced": {"preset": "medium", "crf": 23},
+    "quality": {"preset": "slow", "crf": 20},
+}
+# Profile name, or "auto" to pick preset/CRF/threads from the budgets below and the calibration
+ENCODER_PROFILE = os.getenv("ENCODER_PROFILE", "balanced")
+# Auto mode targets (0 = no limit): seconds for the final encode, and output size in MB
+ENCODE_TIME_BUDGET_S = float(os.getenv("ENCODE_TIME_BUDGET_S", "0"))
+ENCODE_SIZE_CAP_MB = float(os.getenv("ENCODE_SIZE_CAP_MB", "0"))
+# Measured throughput of this host (written by `python3 encoder_profiles.py --calibrate`)
+ENCODER_CALIBRATION_FILE = os.getenv("ENCODER_CALIBRATION_FILE", "encoder_calibration.json")
+
+# Extra renditions encoded in the same pass as the main video (name -> size, length cap, x264 profile).
+# Omitted fields follow the main video; "maxrate_kbps" caps the bitrate.
+OUTPUT_VARIANTS = {
+    "720p": {"width": 720, "height": 1280, "profile": "fast", "maxrate_kbps": 1500},
+    "cut30": {"max_duration": 30},
+}
+# Variants to produce for every video, e.g. "720p,cut30" (written as short_<job>.<name>.mp4)
+RENDER_VARIANTS = [name.strip() for name in os.getenv("RENDER_VARIANTS", "").split(",") if name.strip()]
+
+# Fastest to slowest
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow"]
+# Auto mode never goes below the default CRF (bigger files) and raises it at most this far
+AUTO_BASE_CRF = 23
+AUTO_MAX_CRF = 35
+# Slowest preset auto mode uses when there is no time budget
+AUTO_DEFAULT_PRESET = "medium"
+# ffmpeg's AAC default for stereo output
+AUDIO_KBPS = 128
+# Headroom under the size cap for the estimate's error and the container
+SIZE_CAP_MARGIN = 0.9
+
+
+def encoder_settings(profile=ENCODER_PROFILE, time_budget_s=ENCODE_TIME_BUDGET_S, size_cap_mb=ENCODE_SIZE_CAP_MB):
+    """What a renderer should encode with; resolved to concrete x264 options per video (see resolve_profile)."""
+    if profile != "auto" and profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{profile}'. Choose from: auto, {', '.join(ENCODER_PROFILES)}")
+    return {"profile": profile, "time_budget_s": time_budget_s or None, "size_cap_mb": size_cap_mb or None}
+
+
+def load_calibration(path=ENCODER_CALIBRATION_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"  ⚠️ Encoder calibration {path} unreadable: {e}")
+        return None
+
+
+def thread_speedup(calibration, threads):
+    """Throughput with `threads` relative to the calibrated thread count (measured scaling efficiency)."""
+    calibrated = calibration["threads"]
+    efficiency = calibration.get("thread_efficiency", 1.0)
+    threads = max(1, min(threads, calibrated))
+    return (1 + efficiency * (threads - 1)) / (1 + efficiency * (calibrated - 1))
+
+
+def estimate(calibration, preset, crf, duration, threads):
+    """(encode seconds, output MB) predicted from the calibration for one preset/CRF."""
+    measured = calibration["presets"][preset]
+    encode_fps = measured["encode_fps"] * thread_speedup(calibration, threads)
+    # Rule of thumb for x264: +6 CRF halves the bitrate
+    kbps = measured["kbps"] * 2 ** ((calibration["crf"] - crf) / 6) + AUDIO_KBPS
+    return duration * FPS / encode_fps, kbps * duration / 8 / 1024
+
+
+def select_profile(duration, time_budget_s=None, size_cap_mb=None, threads=None, calibration=None):
+    """Picks x264 options for a video of `duration` seconds from this host's measured throughput.
+
+    The slowest preset that fits the time budget on all calibrated threads is used (slower
+    presets compress better), then the fewest threads that still fit it, leaving the other
+    cores to concurrent jobs; without a budget all calibrated threads are used. Then the
+    lowest CRF (>= AUTO_BASE_CRF) whose estimated size fits the size cap. With a size cap,
+    -maxrate also enforces it. threads forces a thread count. Returns None without a calibration.
+    """
+    calibration = calibration or load_calibration()
+    if not calibration:
+        return None
+    max_threads = threads or calibration["threads"]
+    presets = [p for p in PRESETS if p in calibration["presets"]]
+    if not time_budget_s:
+        presets = [p for p in presets if PRESETS.index(p) <= PRESETS.index(AUTO_DEFAULT_PRESET)] or presets
+
+    def fits(preset, n):
+        return not time_budget_s or estimate(calibration, preset, AUTO_BASE_CRF, duration, n)[0] <= time_budget_s
+
+    preset = presets[0]
+    for candidate in presets:
+        if fits(candidate, max_threads):
+            preset = candidate
+    if not fits(preset, max_threads):
+        print(f"  ⚠️ No preset encodes {duration:.0f}s within {time_budget_s:.0f}s on this host, using {preset}.")
+
+    if threads or not time_budget_s:
+        threads = max_threads
+    else:
+        threads = next((n for n in range(1, max_threads + 1) if fits(preset, n)), max_threads)
+
+    crf = AUTO_BASE_CRF
+    maxrate_kbps = None
+    if size_cap_mb:
+        target_mb = size_cap_mb * SIZE_CAP_MARGIN
+        while crf < AUTO_MAX_CRF and estimate(calibration, preset, crf, duration, threads)[1] > target_mb:
+            crf += 1
+        maxrate_kbps = max(100, int(target_mb * 1024 * 8 / duration - AUDIO_KBPS))
+
+    seconds, size_mb = estimate(calibration, preset, crf, duration, threads)
+    return {
+        "name": "auto", "preset": preset, "crf": crf, "threads": threads, "maxrate_kbps": maxrate_kbps,
+        "estimated_s": round(seconds, 1), "estimated_mb": round(size_mb, 1),
+    }
+
+
+def resolve_profile(settings=None, duration=MAX_DURATION, threads=None):
+    """Concrete x264 options for one video: {"name", "preset", "crf", "threads", "maxrate_kbps"}."""
+    settings = settings or encoder_settings()
+    name = settings["profile"]
+    if name == "auto":
+        profile = select_profile(
+            min(duration, MAX_DURATION) or MAX_DURATION,
+            settings.get("time_budget_s"), settings.get("size_cap_mb"), threads
+        )
+        if profile:
+            return profile
+        print(f"  ⚠️ No encoder calibration ({ENCODER_CALIBRATION_FILE}), using 'balanced'. "
+              "Run: python3 encoder_profiles.py --calibrate")
+        name = "balanced"
+    return dict(ENCODER_PROFILES[name], name=name, threads=threads, maxrate_kbps=None)
+
+
+def resolve_variants(names, encoder=None, duration=MAX_DURATION):
+    """Output variants for a renderer: [{"name", "width", "height", "max_duration", "encoder"}].
+
+    encoder is the main video's resolved profile; variants without a profile of their own reuse it.
+    """
+    variants = []
+    for name in names:
+        if name not in OUTPUT_VARIANTS:
+            raise ValueError(f"Unknown output variant '{name}'. Choose from: {', '.join(OUTPUT_VARIANTS)}")
+        spec = OUTPUT_VARIANTS[name]
+        max_duration = min(spec.get("max_duration", MAX_DURATION), MAX_DURATION)
+        if spec.get("profile"):
+            variant_encoder = resolve_profile(encoder_settings(spec["profile"]), min(duration, max_duration))
+        else:
+            variant_encoder = dict(encoder or resolve_profile(encoder_settings("balanced")))
+        if spec.get("maxrate_kbps"):
+            variant_encoder["maxrate_kbps"] = spec["maxrate_kbps"]
+        variants.append({
+            "name": name,
+            "width": spec.get("width", WIDTH),
+            "height": spec.get("height", HEIGHT),
+            "max_duration": max_duration,
+            "encoder": variant_encoder,
+        })
+    return variants
+
+
+def describe(profile):
+    text = f"{profile['name']} ({profile['preset']}, CRF {profile['crf']}"
+    if profile.get('threads'):
+        text += f", {profile['threads']} threads"
+    if profile.get('maxrate_kbps'):
+        text += f", max {profile['maxrate_kbps']} kb/s"
+    if profile.get('estimated_s') is not None:
+        text += f", est. {profile['estimated_s']}s / {profile['estimated_mb']} MB"
+    return text + ")"
+
+
+def calibration_source(path, seconds):
+    """A camera-like 1080x1920 test clip (moving pattern plus grain), nearly lossless."""
+    subprocess.run([
+        ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size={WIDTH}x{HEIGHT}:rate={FPS}',
+        '-vf', 'noise=alls=12:allf=t+u', '-t', str(seconds),
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '10', '-pix_fmt', 'yuv420p', path
+    ], check=True)
+    return path
+
+
+def measure(source, preset, crf, threads, frames):
+    """Encodes source once; returns (encode fps, video kb/s)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.mp4")
+        start = time.perf_counter()
+        subprocess.run([
+            ffmpeg_binary(), '-y', '-loglevel', 'error', '-i', source, '-an', '-frames:v', str(frames),
+            '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+            '-threads', str(threads), output
+        ], check=True)
+        elapsed = time.perf_counter() - start
+        kbps = os.path.getsize(output) * 8 / 1024 / (frames / FPS)
+    return frames / elapsed, kbps
+
+
+def calibrate(path=ENCODER_CALIBRATION_FILE, source=None, seconds=3, presets=PRESETS, crf=AUTO_BASE_CRF):
+    """Measures encode speed and bitrate of every preset on this host and saves them to path."""
+    threads = os.cpu_count() or 1
+    frames = int(seconds * FPS)
+    with tempfile.TemporaryDirectory() as tmp:
+        if not source:
+            print(f"🎛️ Generating a {seconds}s {WIDTH}x{HEIGHT} calibration clip...")
+            source = calibration_source(os.path.join(tmp, "source.mp4"), seconds)
+
+        results = {}
+        for preset in presets:
+            encode_fps, kbps = measure(source, preset, crf, threads, frames)
+            results[preset] = {"encode_fps": round(encode_fps, 2), "kbps": round(kbps)}
+            print(f"  {preset:<10} {encode_fps:>7.1f} fps  {kbps:>7.0f} kb/s")
+
+        # Thread scaling, measured once on a mid-speed preset
+        efficiency = 1.0
+        if threads > 1:
+            single_fps, _ = measure(source, "veryfast", crf, 1, frames)
+            full_fps = results.get("veryfast", {}).get("encode_fps") or measure(source, "veryfast", crf, threads, frames)[0]
+            efficiency = max(0.05, min(1.0, (full_fps / single_fps - 1) / (threads - 1)))
+
+    calibration = {
+        "host": socket.gethostname(),
+        "calibrated_at": time.time(),
+        "resolution": f"{WIDTH}x{HEIGHT}",
+        "fps": FPS,
+        "crf": crf,
+        "threads": threads,
+        "thread_efficiency": round(efficiency, 3),
+        "presets": results,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"💾 Calibration saved to {path}")
+    return calibration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="x264 encoder profiles: calibrate this host or preview a selection")
+    parser.add_argument("--calibrate", action="store_true", help="Measure every preset and save the results")
+    parser.add_argument("--source", help="Clip to calibrate on (default: generated test pattern)")
+    parser.add_argument("--seconds", type=float, default=3, help="Length of the calibration encode")
+    parser.add_argument("--presets", nargs="+", default=PRESETS, choices=PRESETS)
+    parser.add_argument("--profile", default="auto", help="Profile to preview: auto or a name")
+    parser.add_argument("--duration", type=float, default=45, help="Video length to preview a selection for")
+    parser.add_argument("--time-budget", type=float, default=ENCODE_TIME_BUDGET_S)
+    parser.add_argument("--size-cap", type=float, default=ENCODE_SIZE_CAP_MB)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate(source=args.source, seconds=args.seconds, presets=args.presets)
+    settings = encoder_settings(args.profile, args.time_budget, args.size_cap)
+    print(f"🎚️ {args.duration:.0f}s video: {describe(resolve_profile(settings, args.duration, args.threads))}")
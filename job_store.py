@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import datetime
+import threading
+
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    topic TEXT,
+    topic_key TEXT,
+    status TEXT NOT NULL,
+    day TEXT NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    video_id TEXT,
+    stage_durations TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_day ON jobs(day);
+CREATE INDEX IF NOT EXISTS idx_jobs_topic_key_day ON jobs(topic_key, day);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_topic(topic):
+    """Key used to compare topics: lowercase, punctuation stripped, whitespace collapsed."""
+    if not topic:
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+
+class JobStore:
+    """SQLite (WAL) job history shared safely by concurrent threads and processes."""
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        self.local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """One connection per thread; WAL lets readers run while another process writes."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def record_job(self, job_id, status, topic=None, started_at=None, finished_at=None,
+                   video_id=None, stage_durations=None):
+        """Inserts or updates a job record (one row per job id)."""
+        finished_at = finished_at or time.time()
+        day = datetime.date.fromtimestamp(finished_at).isoformat()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(job_id, topic, topic_key, status, day, started_at, finished_at, video_id, stage_durations) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, topic, normalize_topic(topic), status, day, started_at, finished_at,
+                 video_id, json.dumps(stage_durations or {}))
+            )
+
+    def used_topics(self, days=1):
+        """Topics of successful jobs in the last N days (today included)."""
+        since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        rows = self.connect().execute(
+            "SELECT topic FROM jobs WHERE day >= ? AND status = 'ok' AND topic IS NOT NULL "
+            "GROUP BY topic_key ORDER BY MAX(finished_at)",
+            (since,)
+        ).fetchall()
+        return [row["topic"] for row in rows]
+
+    def was_used(self, topic, days=1):
+        """Fast check for one topic (by normalized key) in the last N days."""
+        since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        row = self.connect().execute(
+            "SELECT 1 FROM jobs WHERE topic_key = ? AND day >= ? AND status = 'ok' LIMIT 1",
+            (normalize_topic(topic), since)
+        ).fetchone()
+        return row is not None
+
+    def daily_report(self, day=None):
+        """Aggregates one day's jobs: counts by status, topics and average stage durations."""
+        day = day or datetime.date.today().isoformat()
+        rows = self.connect().execute(
+            "SELECT topic, status, stage_durations FROM jobs WHERE day = ? ORDER BY finished_at", (day,)
+        ).fetchall()
+
+        stage_totals = {}
+        for row in rows:
+            for stage, duration in json.loads(row["stage_durations"] or "{}").items():
+                total, count = stage_totals.get(stage, (0.0, 0))
+                stage_totals[stage] = (total + duration, count + 1)
+
+        return {
+            "date": day,
+            "count": sum(1 for r in rows if r["status"] == "ok"),
+            "failed": sum(1 for r in rows if r["status"] != "ok"),
+            "topics": [r["topic"] for r in rows if r["status"] == "ok" and r["topic"]],
+            "avg_stage_s": {s: round(t / c, 2) for s, (t, c) in stage_totals.items()}
+        }
+
+    def get_meta(self, key, default=None):
+        row = self.connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_daily_stats(self, path="daily_stats.json"):
+        """One-time import of the legacy daily_stats.json (topics only, no timings)."""
+        if self.get_meta("imported_daily_stats") or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                stats = json.load(f)
+            day = stats["date"]
+            finished_at = datetime.datetime.fromisoformat(day).timestamp()
+            for i, topic in enumerate(stats.get("topics", [])):
+                self.record_job(f"legacy-{day}-{i}", "ok", topic=topic, finished_at=finished_at)
+            count = len(stats.get("topics", []))
+        except Exception as e:
+            print(f"  ⚠️ Could not import {path}: {e}")
+            count = 0
+        self.set_meta("imported_daily_stats", "1")
+        return count
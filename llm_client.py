@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+
+# Responses are reused for identical prompts within this many seconds
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+# Concurrent generate_content calls across all jobs in this process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+# Extra requests allowed when a response fails to parse/validate
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "2"))
+
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+
+def strip_fences(text):
+    """Removes a surrounding markdown code fence (```json ... ```), if any."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        if text.lower().startswith("json"):
+            text = text[4:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def validate_script(data):
+    """Script: a non-empty list of {'text', 'visual_query'} objects."""
+    if not isinstance(data, list) or not data:
+        raise ValueError("Script data is not a non-empty list")
+    for item in data:
+        if not isinstance(item, dict):
+            raise ValueError("Script items are not dictionaries")
+        if not item.get('text') or not item.get('visual_query'):
+            raise ValueError("Missing 'text' or 'visual_query' keys")
+    return data
+
+
+def validate_metadata(data):
+    """Metadata: {'title', 'description', 'tags': [...]}."""
+    if not isinstance(data, dict):
+        raise ValueError("Metadata is not an object")
+    if not data.get('title') or not isinstance(data.get('description'), str):
+        raise ValueError("Missing 'title' or 'description'")
+    if not isinstance(data.get('tags'), list):
+        raise ValueError("'tags' is not a list")
+    return data
+
+
+def validate_package(data):
+    """Combined response: {'script': [...], 'metadata': {...}}. Bad metadata is dropped, not fatal."""
+    if not isinstance(data, dict):
+        raise ValueError("Response is not an object")
+    script = validate_script(data.get('script'))
+    try:
+        metadata = validate_metadata(data.get('metadata'))
+    except ValueError:
+        metadata = None
+    return {"script": script, "metadata": metadata}
+
+
+class LLMClient:
+    """Single entry point for Gemini calls: response cache, bounded concurrency and parse retries."""
+
+    def __init__(self, model, cache=None, ttl=LLM_CACHE_TTL, max_concurrency=LLM_MAX_CONCURRENCY,
+                 parse_retries=LLM_PARSE_RETRIES):
+        self.model = model
+        self.cache = cache
+        self.ttl = ttl
+        self.parse_retries = max(0, parse_retries)
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    @property
+    def model_name(self):
+        return getattr(self.model, "model_name", type(self.model).__name__)
+
+    def _request(self, prompt, config, metrics):
+        with self.slots:
+            if metrics is not None:
+                metrics.incr("llm_calls")
+            if config:
+                response = self.model.generate_content(prompt, generation_config=config)
+            else:
+                response = self.model.generate_content(prompt)
+        return response.text
+
+    def _cached(self, key):
+        if self.cache is None or not key:
+            return None
+        entry = self.cache.get_fresh(key, self.ttl)
+        if not entry:
+            return None
+        with open(entry['path'], 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _store(self, key, text):
+        if self.cache is None or not key:
+            return
+        tmp_path = self.cache.path_for(f"{key}_{os.getpid()}_{threading.get_ident()}", ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.cache.put(key, tmp_path, ext=".txt", meta={"created": time.time()})
+
+    def generate(self, prompt, parse=None, config=None, use_cache=True, metrics=None):
+        """Returns parse(response_text) (the raw text if parse is None).
+
+        A cached response for the same (model, prompt, config) is used while fresh.
+        Only valid responses are cached; a response that fails parse() is requested
+        again up to parse_retries times (API errors are not retried here).
+        """
+        parse = parse or (lambda text: text)
+        key = self.cache.make_key(self.model_name, prompt, config) if self.cache is not None and use_cache else None
+
+        cached = self._cached(key)
+        if cached is not None:
+            try:
+                value = parse(cached)
+                if metrics is not None:
+                    metrics.incr("llm_cache_hits")
+                return value
+            except Exception:
+                pass
+
+        error = None
+        for attempt in range(self.parse_retries + 1):
+            if attempt:
+                if metrics is not None:
+                    metrics.incr("llm_parse_retries")
+                print(f"  🔁 Invalid LLM response ({error}), asking again ({attempt}/{self.parse_retries})...")
+            text = self._request(prompt, config, metrics)
+            try:
+                value = parse(text)
+            except Exception as e:
+                error = e
+                continue
+            self._store(key, text)
+            return value
+        raise ValueError(f"LLM response still invalid after {self.parse_retries + 1} attempts: {error}")
+
+    def generate_json(self, prompt, validate=None, use_cache=True, metrics=None):
+        """Requests JSON output and returns it parsed and validated."""
+        def parse(text):
+            data = json.loads(strip_fences(text))
+            return validate(data) if validate else data
+        return self.generate(prompt, parse=parse, config=JSON_CONFIG, use_cache=use_cache, metrics=metrics)
@@ -0,0 +1,284 @@
+import os
+import glob
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# One JSON record per stage (and per job) is appended here
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join("metrics", "pipeline.jsonl"))
+# Prometheus textfile-collector output (rewritten after every stage)
+PROMETHEUS_FILE = os.getenv("PROMETHEUS_FILE", os.path.join("metrics", "pipeline.prom"))
+# Duration histogram buckets in seconds
+DURATION_BUCKETS = [0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600]
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of stage records, exportable in Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stage_count = defaultdict(int)
+        self.stage_sum = defaultdict(float)
+        self.stage_last = {}
+        self.stage_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.counters = defaultdict(float)
+        self.jobs = defaultdict(int)
+
+    def observe_stage(self, record):
+        stage, status, duration = record["stage"], record["status"], record["duration_s"]
+        with self.lock:
+            self.stage_count[(stage, status)] += 1
+            self.stage_sum[(stage, status)] += duration
+            self.stage_last[stage] = duration
+            buckets = self.stage_buckets[stage]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            for name, value in record["counters"].items():
+                self.counters[(name, stage)] += value
+
+    def observe_job(self, status):
+        with self.lock:
+            self.jobs[status] += 1
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP shorts_stage_duration_seconds Pipeline stage wall time.",
+            "# TYPE shorts_stage_duration_seconds histogram",
+        ]
+        with self.lock:
+            totals = defaultdict(lambda: [0, 0.0])
+            for (stage, status), count in self.stage_count.items():
+                totals[stage][0] += count
+                totals[stage][1] += self.stage_sum[(stage, status)]
+            for stage, buckets in sorted(self.stage_buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'shorts_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'shorts_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {totals[stage][0]}')
+                lines.append(f'shorts_stage_duration_seconds_sum{{stage="{stage}"}} {totals[stage][1]:.3f}')
+                lines.append(f'shorts_stage_duration_seconds_count{{stage="{stage}"}} {totals[stage][0]}')
+
+            lines += ["# HELP shorts_stage_runs_total Stage runs by status.", "# TYPE shorts_stage_runs_total counter"]
+            for (stage, status), count in sorted(self.stage_count.items()):
+                lines.append(f'shorts_stage_runs_total{{stage="{stage}",status="{status}"}} {count}')
+
+            lines += ["# HELP shorts_stage_last_duration_seconds Most recent stage wall time.",
+                      "# TYPE shorts_stage_last_duration_seconds gauge"]
+            for stage, duration in sorted(self.stage_last.items()):
+                lines.append(f'shorts_stage_last_duration_seconds{{stage="{stage}"}} {duration:.3f}')
+
+            typed = set()
+            for (name, stage), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE shorts_{name}_total counter")
+                    typed.add(name)
+                lines.append(f'shorts_{name}_total{{stage="{stage}"}} {value:g}')
+
+            lines += ["# HELP shorts_jobs_total Finished jobs by status.", "# TYPE shorts_jobs_total counter"]
+            for status, count in sorted(self.jobs.items()):
+                lines.append(f'shorts_jobs_total{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=PROMETHEUS_FILE):
+        """Writes the metrics atomically (node_exporter textfile collector format)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics on a background thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+
+
+def _statm_rss_mb(pid="self"):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def current_rss_mb(include_children=False):
+    """Resident set size of this process right now (Linux), in MB.
+
+    With include_children, running child processes (ffmpeg readers/writers) are added.
+    """
+    try:
+        rss = _statm_rss_mb()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if include_children:
+        for path in glob.glob("/proc/self/task/*/children"):
+            try:
+                with open(path) as f:
+                    pids = f.read().split()
+            except OSError:
+                continue
+            for pid in pids:
+                try:
+                    rss += _statm_rss_mb(pid)
+                except OSError:
+                    pass  # exited meanwhile
+    return rss
+
+
+class RSSSampler:
+    """Samples RSS in the background to find the peak while the block runs."""
+
+    def __init__(self, interval=0.05, include_children=False):
+        self.interval = interval
+        self.include_children = include_children
+        self.peak = 0
+        self.stop_event = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss_mb(self.include_children)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb(self.include_children))
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss_mb(self.include_children))
+
+
+class PipelineMetrics:
+    """Collects structured per-stage records for one job.
+
+    Stages are wrapped in stage(); code running inside a stage adds to its
+    counters with incr() (bytes downloaded, cache hits, API calls, ...).
+    Work that may outlive the stage (background fetches past a deadline)
+    names its stage explicitly, so it never adds to the next stage's counters.
+    Records are appended as JSON lines to sink_path (if given) and fed to
+    the process-wide registry.
+    """
+
+    def __init__(self, job_id=None, sink_path=None):
+        self.job_id = job_id
+        self.sink_path = sink_path
+        self.records = []
+        # Running stage name, and the counters of every stage that hasn't finished
+        self.current = None
+        self.open_stages = {}
+        self.lock = threading.Lock()
+
+    def current_stage(self):
+        with self.lock:
+            return self.current
+
+    def incr(self, name, value=1, stage=None):
+        """Adds to the counters of stage (default: the running stage); dropped once that stage has finished."""
+        with self.lock:
+            counters = self.open_stages.get(stage or self.current)
+            if counters is not None:
+                counters[name] = counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        with self.lock:
+            self.open_stages[name] = {}
+            self.current = name
+        started = time.time()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            with self.lock:
+                counters = self.open_stages.pop(name, {})
+                if self.current == name:
+                    self.current = None
+            self.emit({
+                "type": "stage",
+                "job_id": self.job_id,
+                "stage": name,
+                "status": status,
+                "started_at": started,
+                "duration_s": round(time.perf_counter() - start, 3),
+                "counters": counters
+            })
+
+    def observe(self, kind, stage=None, **fields):
+        """Emits a free-form record (e.g. kind="scene" with per-scene peak memory), tagged with its stage.
+
+        stage defaults to the running stage; records from outside any stage have none.
+        """
+        stage = stage or self.current_stage()
+        self.emit({"type": kind, "job_id": self.job_id, **({"stage": stage} if stage else {}), **fields})
+
+    def emit(self, record):
+        self.records.append(record)
+        if record["type"] == "stage":
+            registry.observe_stage(record)
+        elif record["type"] == "job":
+            registry.observe_job(record["status"])
+
+        if self.sink_path:
+            # Called from stage()'s finally: a failed export must never fail (or mask) the stage
+            try:
+                os.makedirs(os.path.dirname(self.sink_path) or ".", exist_ok=True)
+                with open(self.sink_path, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+                registry.write_prometheus()
+            except Exception as e:
+                print(f"  ⚠️ Could not export metrics: {e}")
+
+    def summary(self):
+        """Per-stage durations and counters of this job (latest run of each stage)."""
+        stages = {}
+        for record in self.records:
+            if record["type"] == "stage":
+                stages[record["stage"]] = {
+                    "duration_s": record["duration_s"],
+                    "status": record["status"],
+                    **record["counters"]
+                }
+        return stages
+
+    def finish(self, status, **fields):
+        """Emits the job-level record (total duration and per-stage summary)."""
+        stage_records = [r for r in self.records if r["type"] == "stage"]
+        record = {
+            "type": "job",
+            "job_id": self.job_id,
+            "status": status,
+            "duration_s": round(sum(r["duration_s"] for r in stage_records), 3),
+            "stages": self.summary(),
+            **fields
+        }
+        self.emit(record)
+        return record
@@ -0,0 +1,121 @@
+import os
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from renderers import WIDTH, HEIGHT, FPS, fit_filter, ffmpeg_binary
+
+# Canonical intermediate: editing-resolution frames, short GOPs and fastdecode,
+# so every later decode/seek is cheap and predictable
+NORMALIZED_PROFILE = {
+    "width": WIDTH,
+    "height": HEIGHT,
+    "fps": FPS,
+    "crf": 18,
+    "preset": "veryfast",
+    "tune": "fastdecode",
+    "gop": FPS,
+}
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", "2"))
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """sha256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def profile_id(profile):
+    return "{width}x{height}_{fps}fps_crf{crf}_{preset}_{tune}_g{gop}".format(**profile)
+
+
+class ClipNormalizer:
+    """Transcodes downloaded footage once into the canonical profile, cached by source hash and profile."""
+
+    def __init__(self, cache, profile=NORMALIZED_PROFILE, workers=NORMALIZE_WORKERS):
+        self.cache = cache
+        self.profile = profile
+        self.workers = max(1, workers)
+        # (path, size, mtime) -> sha256, so cached sources are hashed once per process
+        self.hashes = {}
+        self.lock = threading.Lock()
+
+    def source_hash(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        with self.lock:
+            if key in self.hashes:
+                return self.hashes[key]
+        digest = file_hash(path)
+        with self.lock:
+            self.hashes[key] = digest
+        return digest
+
+    def cache_key(self, source_path):
+        return f"norm_{self.source_hash(source_path)[:32]}_{profile_id(self.profile)}"
+
+    def transcode(self, source_path, output_path, max_duration=None):
+        p = self.profile
+        cmd = [
+            ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-i', source_path,
+            # Partially downloaded sources are only decoded as far as they go
+            *(['-t', f"{max_duration:.3f}"] if max_duration else []),
+            '-an',
+            '-vf', fit_filter(p['width'], p['height'], p['fps']),
+            '-c:v', 'libx264', '-preset', p['preset'], '-tune', p['tune'],
+            '-crf', str(p['crf']), '-g', str(p['gop']), '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',
+            output_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg normalize failed: {result.stderr.strip()[-2000:]}")
+        return output_path
+
+    def normalize(self, source_path, max_duration=None):
+        """Returns the path of the normalized version of source_path (transcoding on a cache miss)."""
+        return self.normalize_with_status(source_path, max_duration)[0]
+
+    def normalize_with_status(self, source_path, max_duration=None):
+        """Like normalize(), but returns (path, served_from_cache).
+
+        max_duration limits the transcode for footage fetched only in part (see planner.py);
+        such a file is always fetched for the same duration, so its hash still identifies the output.
+        """
+        key = self.cache_key(source_path)
+        entry = self.cache.get(key)
+        if entry:
+            return entry['path'], True
+
+        tmp_path = self.cache.path_for(f"{key}_{os.getpid()}_{threading.get_ident()}", ".tmp.mp4")
+        try:
+            self.transcode(source_path, tmp_path, max_duration)
+            return self.cache.put(key, tmp_path, ext=".mp4", meta={"profile": self.profile}), False
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def normalize_scenes(self, script_data):
+        """Points every scene's 'video_path' at its normalized clip (original kept as 'source_path')."""
+        def work(item):
+            i, scene = item
+            if scene.get('normalized') or not scene.get('video_path'):
+                return scene
+            try:
+                scene['source_path'] = scene['video_path']
+                scene['video_path'], scene['normalized_from_cache'] = self.normalize_with_status(
+                    scene['video_path'], scene.get('footage_covers_s')
+                )
+                scene['normalized'] = True
+            except Exception as e:
+                print(f"  ⚠️ Scene {i+1} normalize failed, using original footage: {e}")
+                scene['video_path'] = scene['source_path']
+            return scene
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(work, enumerate(script_data)))
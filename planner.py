@@ -0,0 +1,197 @@
+import os
+import random
+import struct
+
+from renderers import WIDTH, HEIGHT, FPS
+
+# Footage should outlast the voiceover by this much (fade, rounding, B-frame reordering)
+FOOTAGE_MARGIN_S = 1.0
+# Renditions scoring within this much of the best are picked at random, to vary the footage
+SCORE_TOLERANCE = 0.25
+# Range requests are only worth it when they skip at least this fraction of the file
+PREFIX_MIN_SAVING = float(os.getenv("PREFIX_MIN_SAVING", "0.2"))
+# First request of a prefix download: enough for ftyp + the top-level box layout
+PROBE_BYTES = 64 * 1024
+
+
+def needed_duration(scene):
+    """Seconds of footage a scene needs (its voiceover plus a safety margin)."""
+    return (scene.get('audio_duration') or 0) + FOOTAGE_MARGIN_S
+
+
+def rendition_score(video, video_file, duration):
+    """Lower is better: penalizes looping, upscaling, low fps, cropping and decode/download cost."""
+    width, height = video_file.get('width') or 0, video_file.get('height') or 0
+    fps = video_file.get('fps') or FPS
+    clip_duration = video.get('duration') or 0
+
+    score = 0.0
+    # Too short means vfx.Loop / -stream_loop: the worst outcome
+    if clip_duration < duration:
+        score += 10 * (1 - clip_duration / duration)
+    # Extra seconds cost bytes (when the whole file must be fetched) and decode time
+    score += 0.2 * max(0, clip_duration - duration) / duration
+    # Upscaling loses quality
+    if width < WIDTH:
+        score += 3 * (WIDTH - width) / WIDTH
+    # Judder below the output frame rate
+    if fps < FPS:
+        score += 2 * (FPS - fps) / FPS
+    # Landscape footage is mostly cropped away
+    if width > height:
+        score += 2
+    # Decode cost relative to the output (4K / 60 fps sources are expensive)
+    score += 0.5 * max(0, width * height * fps / (WIDTH * HEIGHT * FPS) - 1)
+    return score
+
+
+def plan_footage(videos, duration):
+    """Picks the (video, video_file) whose duration, fps and resolution best fit the scene.
+
+    Only plain MP4 renditions with known dimensions are considered. Returns None if there are none.
+    """
+    options = []
+    for video in videos:
+        for video_file in video.get('video_files', []):
+            if video_file.get('file_type', 'video/mp4') != 'video/mp4' or not video_file.get('width'):
+                continue
+            options.append((rendition_score(video, video_file, duration), video, video_file))
+    if not options:
+        return None
+
+    best = min(score for score, _, _ in options)
+    close = [(video, video_file) for score, video, video_file in options if score <= best + SCORE_TOLERANCE]
+    return random.choice(close)
+
+
+# --- MP4 layout (enough of ISO BMFF to map a time to a byte offset) ---
+
+def iter_boxes(data, start=0, end=None):
+    """Yields (type, payload_start, box_end) for the boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type.decode("latin-1"), pos + header, pos + size
+        pos += size
+
+
+def top_level_layout(data):
+    """Top-level boxes found in a file prefix: [(type, box_start, box_end)]."""
+    layout = []
+    pos = 0
+    for box_type, payload, box_end in iter_boxes(data):
+        header = payload - pos
+        layout.append((box_type, payload - header, box_end))
+        pos = box_end
+    return layout
+
+
+def _child(data, start, end, box_type):
+    for child_type, payload, box_end in iter_boxes(data, start, end):
+        if child_type == box_type:
+            return payload, box_end
+    return None
+
+
+def _track_prefix_end(data, start, end, seconds):
+    """Byte offset just past the last sample a track needs to play `seconds` (None if unparsable)."""
+    mdia = _child(data, start, end, "mdia")
+    if not mdia:
+        return None
+    mdhd = _child(data, *mdia, "mdhd")
+    minf = _child(data, *mdia, "minf")
+    stbl = minf and _child(data, *minf, "stbl")
+    if not mdhd or not stbl:
+        return None
+
+    version = data[mdhd[0]]
+    timescale = struct.unpack(">I", data[mdhd[0] + (20 if version == 1 else 12):][:4])[0]
+    target = seconds * timescale
+
+    boxes = {t: (p, e) for t, p, e in iter_boxes(data, *stbl)}
+    if "stts" not in boxes or "stsc" not in boxes or "stsz" not in boxes:
+        return None
+
+    # Samples decoded before the target time (stts: runs of count x delta)
+    p = boxes["stts"][0]
+    entries = struct.unpack(">I", data[p + 4:p + 8])[0]
+    samples, t = 0, 0
+    for i in range(entries):
+        count, delta = struct.unpack(">II", data[p + 8 + 8 * i:p + 16 + 8 * i])
+        if delta and t + count * delta > target:
+            samples += int((target - t) // delta) + 1
+            break
+        samples += count
+        t += count * delta
+
+    # Sample sizes
+    p = boxes["stsz"][0]
+    sample_size, sample_count = struct.unpack(">II", data[p + 4:p + 12])
+    last = min(samples, sample_count) - 1
+    if last < 0:
+        return None
+    if sample_size:
+        sizes = None
+    else:
+        sizes = struct.unpack(f">{sample_count}I", data[p + 12:p + 12 + 4 * sample_count])
+
+    # Chunk offsets
+    if "stco" in boxes:
+        p = boxes["stco"][0]
+        count = struct.unpack(">I", data[p + 4:p + 8])[0]
+        offsets = struct.unpack(f">{count}I", data[p + 8:p + 8 + 4 * count])
+    elif "co64" in boxes:
+        p = boxes["co64"][0]
+        count = struct.unpack(">I", data[p + 4:p + 8])[0]
+        offsets = struct.unpack(f">{count}Q", data[p + 8:p + 8 + 8 * count])
+    else:
+        return None
+
+    # Chunk holding the last needed sample (stsc: runs of chunks with the same samples-per-chunk)
+    p = boxes["stsc"][0]
+    runs = struct.unpack(">I", data[p + 4:p + 8])[0]
+    stsc = [struct.unpack(">III", data[p + 8 + 12 * i:p + 20 + 12 * i])[:2] for i in range(runs)]
+    remaining = last
+    for i, (first_chunk, per_chunk) in enumerate(stsc):
+        next_chunk = stsc[i + 1][0] if i + 1 < len(stsc) else len(offsets) + 1
+        run_samples = (next_chunk - first_chunk) * per_chunk
+        if remaining < run_samples:
+            chunk = first_chunk + remaining // per_chunk
+            first_sample = last - remaining % per_chunk
+            if sizes is None:
+                used = (last - first_sample + 1) * sample_size
+            else:
+                used = sum(sizes[first_sample:last + 1])
+            return offsets[chunk - 1] + used
+        remaining -= run_samples
+    return None
+
+
+def mp4_prefix_size(moov, seconds):
+    """Bytes from the start of the file needed to play the first `seconds` of every track.
+
+    moov must be the file's bytes from offset 0 through the end of the moov box
+    (chunk offsets are absolute). Returns None if the layout can't be mapped.
+    """
+    moov_box = next(((p, e) for t, p, e in iter_boxes(moov) if t == "moov"), None)
+    if not moov_box:
+        return None
+    ends = []
+    for box_type, payload, box_end in iter_boxes(moov, *moov_box):
+        if box_type == "trak":
+            track_end = _track_prefix_end(moov, payload, box_end, seconds)
+            if track_end is None:
+                return None
+            ends.append(track_end)
+    return max(ends) if ends else None
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+from job_store import normalize_topic
+from metrics import PipelineMetrics, METRICS_FILE
+from shorts_generator import TOPIC_DEDUP_DAYS
+
+# Seconds between prefetch rounds while the scheduler is idle
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "1800"))
+# Likely next topics to keep warm
+PREFETCH_CANDIDATES = int(os.getenv("PREFETCH_CANDIDATES", "2"))
+# Download bandwidth for prefetching in KB/s (0 = unlimited), so it never starves a running job
+PREFETCH_BANDWIDTH_KBPS = int(os.getenv("PREFETCH_BANDWIDTH_KBPS", "2048"))
+# Disk budget for prefetched (not yet used) footage and voiceovers
+PREFETCH_MAX_MB = int(os.getenv("PREFETCH_MAX_MB", "512"))
+# Prefetched topics nobody used are dropped after this many seconds (keep it under LLM_CACHE_TTL,
+# so a job for a prefetched topic still gets the cached script)
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", str(12 * 3600)))
+PREFETCH_INDEX = os.path.join(os.getenv("CACHE_DIR", "cache"), "prefetch.json")
+
+
+class RateLimiter:
+    """Blocking byte-rate limiter shared by the threads of one prefetch round."""
+
+    def __init__(self, bytes_per_s):
+        self.bytes_per_s = bytes_per_s
+        self.next_free = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n):
+        """Called after n bytes arrived; sleeps as long as they came in faster than the rate."""
+        cost = n / self.bytes_per_s
+        with self.lock:
+            now = time.monotonic()
+            # A link slower than the rate already spent `cost` receiving them
+            self.next_free = max(self.next_free, now - cost) + cost
+            delay = self.next_free - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def cache_key(path):
+    """Cache key of a file stored in a DiskCache (its name without the extension)."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class Prefetcher:
+    """Warms the LLM, TTS and footage caches for the likely next topics while the scheduler is idle.
+
+    Each round pulls the trend feeds, picks a few candidate topics and runs the
+    script, voiceover and footage stages for them on a throwaway job (downloads
+    capped at PREFETCH_BANDWIDTH_KBPS). A job for one of those topics then finds
+    its script, voiceovers and footage in the caches. Cache entries a round added
+    are tracked in cache/prefetch.json; take() hands a warm topic to the next job,
+    and entries nobody read within PREFETCH_TTL are removed again.
+    """
+
+    def __init__(self, bot, path=PREFETCH_INDEX, candidates=PREFETCH_CANDIDATES,
+                 max_bytes=PREFETCH_MAX_MB * 1024 * 1024, ttl=PREFETCH_TTL,
+                 bandwidth_kbps=PREFETCH_BANDWIDTH_KBPS):
+        self.bot = bot
+        self.path = path
+        self.candidates = max(1, candidates)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bandwidth_kbps = bandwidth_kbps
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.entries = self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"  ⚠️ Prefetch index {self.path} unreadable, starting fresh: {e}")
+        return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def prefetched_bytes(self):
+        with self.lock:
+            return sum(entry["bytes"] for entry in self.entries.values())
+
+    def expire(self, now=None):
+        """Drops prefetched topics older than the TTL, deleting the cache entries no job has read since."""
+        now = now or time.time()
+        freed = 0
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if now - e["warmed_at"] > self.ttl]:
+                entry = self.entries.pop(key)
+                for cache, keys in ((self.bot.footage_cache, entry["footage_keys"]),
+                                    (self.bot.audio_cache, entry["tts_keys"])):
+                    for cache_key_ in keys:
+                        cached = cache.peek(cache_key_)
+                        if cached and cached["last_used"] <= entry["warmed_at"]:
+                            freed += cache.discard(cache_key_)
+                print(f"  🗑️ Prefetched topic '{entry['topic']}' expired unused")
+            self._save()
+        return freed
+
+    def warm(self, topic):
+        """Generates the script, voiceovers and footage for topic into the caches; returns its index entry."""
+        job_id = f"prefetch-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        job_bot = self.bot.for_job(job_id)
+        job_bot.metrics = metrics = PipelineMetrics(job_id, METRICS_FILE)
+        if self.bandwidth_kbps:
+            job_bot.download_limiter = RateLimiter(self.bandwidth_kbps * 1024)
+        # Only entries this round adds count as prefetched (and may be expired later)
+        known_footage = self.bot.footage_cache.keys()
+        known_tts = self.bot.audio_cache.keys()
+        started = time.perf_counter()
+        try:
+            package = job_bot.generate_script_package(topic)
+            if not package:
+                raise Exception("no script")
+            script_data = job_bot.generate_voiceovers(package["script"])
+            script_data = job_bot.download_stock_assets(script_data)
+        finally:
+            job_bot.remove_job_assets()
+
+        footage_keys = sorted({cache_key(s["video_path"]) for s in script_data if s.get("video_path")} - known_footage)
+        tts_keys = sorted({cache_key(s["audio_path"]) for s in script_data if s.get("audio_path")} - known_tts)
+        size = sum((self.bot.footage_cache.peek(k) or {}).get("size", 0) for k in footage_keys)
+        size += sum((self.bot.audio_cache.peek(k) or {}).get("size", 0) for k in tts_keys)
+        metrics.observe("prefetch", topic=topic, duration_s=round(time.perf_counter() - started, 3), bytes=size,
+                        footage_entries=len(footage_keys), tts_entries=len(tts_keys))
+        return {
+            "topic": topic,
+            "warmed_at": time.time(),
+            "scenes": len(script_data),
+            "footage_keys": footage_keys,
+            "tts_keys": tts_keys,
+            "bytes": size,
+        }
+
+    def run_round(self, idle=lambda: True, exclude=None):
+        """One prefetch round: expire, pick candidates from the trend feeds and warm them while idle.
+
+        Returns the topics warmed.
+        """
+        self.expire()
+        with self.lock:
+            known = [entry["topic"] for entry in self.entries.values()]
+        wanted = self.candidates - len(known)
+        if wanted <= 0 or not idle():
+            return []
+
+        print(f"[{datetime.datetime.now()}] 🔮 Prefetching {wanted} likely topics...")
+        topics = self.bot.select_trending_topics(wanted, exclude=list(exclude or []) + known)
+        warmed = []
+        for topic in topics:
+            if not idle() or self.stopped.is_set():
+                print("  ⏸️ Prefetch paused: a job is running")
+                break
+            if self.prefetched_bytes() >= self.max_bytes:
+                print(f"  ⚠️ Prefetch disk budget ({self.max_bytes / 1024 / 1024:.0f} MB) used up")
+                break
+            try:
+                entry = self.warm(topic)
+            except Exception as e:
+                print(f"  ⚠️ Prefetch of '{topic}' failed: {e}")
+                continue
+            with self.lock:
+                self.entries[normalize_topic(topic)] = entry
+                self._save()
+            warmed.append(topic)
+            print(f"  🔥 Prefetched '{topic}': {entry['scenes']} scenes, {entry['bytes'] / 1024 / 1024:.1f} MB")
+        return warmed
+
+    def take(self, exclude=None):
+        """Hands the oldest warm topic (not used recently, not in exclude) to a job; None if there is none."""
+        skip = {normalize_topic(t) for t in exclude or []}
+        try:
+            skip |= {normalize_topic(t) for t in self.bot.job_store.used_topics(days=TOPIC_DEDUP_DAYS)}
+        except Exception as e:
+            print(f"  ⚠️ Job history unavailable: {e}")
+        with self.lock:
+            self.expire()
+            ready = sorted((e for k, e in self.entries.items() if k not in skip), key=lambda e: e["warmed_at"])
+            for key in [k for k in self.entries if k in skip]:
+                # Used by another job in the meantime: its entries are ordinary cache entries now
+                del self.entries[key]
+            if not ready:
+                self._save()
+                return None
+            entry = self.entries.pop(normalize_topic(ready[0]["topic"]))
+            self._save()
+        print(f"  🔥 Using prefetched topic '{entry['topic']}'")
+        return entry["topic"]
+
+    def stop(self):
+        self.stopped.set()
+
+    def run_forever(self, idle, exclude=lambda: [], interval=PREFETCH_INTERVAL):
+        """Runs a round every interval seconds while idle() is true, until stop() is called."""
+        while not self.stopped.wait(interval):
+            try:
+                self.run_round(idle, exclude())
+            except Exception as e:
+                print(f"[{datetime.datetime.now()}] ⚠️ Prefetch round failed: {e}")
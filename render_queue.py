@@ -0,0 +1,345 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import ipaddress
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from renderers import WIDTH, HEIGHT, FPS
+
+# Queue database, on the pipeline host's local disk. SQLite locking isn't safe across machines
+# or on network filesystems, so render hosts reach the queue over HTTP (see serve()).
+RENDER_QUEUE_DB = os.getenv("RENDER_QUEUE_DB", "render_queue.db")
+# Queue server address for render workers, e.g. http://pipeline-host:8765
+RENDER_QUEUE_URL = os.getenv("RENDER_QUEUE_URL", "")
+# Address `python3 render_queue.py` serves the queue on (other hosts need e.g. 0.0.0.0:8765 and a token)
+RENDER_QUEUE_BIND = os.getenv("RENDER_QUEUE_BIND", "127.0.0.1:8765")
+# Shared secret workers send to the queue server (empty: no authentication, loopback binds only)
+RENDER_QUEUE_TOKEN = os.getenv("RENDER_QUEUE_TOKEN", "")
+# A claimed job is requeued if its worker doesn't renew the lease within this many seconds
+RENDER_LEASE_S = int(os.getenv("RENDER_LEASE_S", "120"))
+# Claims per job before it is marked failed (a job that keeps killing workers)
+RENDER_MAX_ATTEMPTS = int(os.getenv("RENDER_MAX_ATTEMPTS", "3"))
+
+MANIFEST_VERSION = 1
+# Scene fields a worker needs to render (paths are made absolute)
+MANIFEST_SCENE_KEYS = ("text", "words", "audio_path", "audio_duration", "video_path", "normalized")
+MANIFEST_PATH_KEYS = ("audio_path", "video_path")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_jobs (
+    job_id TEXT PRIMARY KEY,
+    manifest TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON render_jobs(status, created_at);
+"""
+
+
+def build_manifest(script_data, output_path, backend, subtitle_mode="image", parallel=False, low_memory=False,
+                   encoder=None, variants=()):
+    """Everything a render worker needs: scenes (clips, audio, word timings) and the output profile.
+
+    encoder holds encoder settings (see encoder_profiles.encoder_settings) and variants
+    output variant names; both are resolved by the worker.
+    """
+    scenes = []
+    for scene in script_data:
+        entry = {key: scene[key] for key in MANIFEST_SCENE_KEYS if key in scene}
+        for key in MANIFEST_PATH_KEYS:
+            if entry.get(key):
+                entry[key] = os.path.abspath(entry[key])
+        scenes.append(entry)
+    return {
+        "version": MANIFEST_VERSION,
+        "scenes": scenes,
+        "output_path": os.path.abspath(output_path),
+        "profile": {
+            "backend": backend,
+            "subtitle_mode": subtitle_mode,
+            "parallel": bool(parallel),
+            "low_memory": bool(low_memory),
+            "encoder": encoder,
+            "variants": list(variants),
+            "width": WIDTH,
+            "height": HEIGHT,
+            "fps": FPS,
+        },
+    }
+
+
+class RenderFailed(Exception):
+    """The render job failed on every attempt (or was never picked up in time)."""
+
+
+class RenderQueue:
+    """SQLite render job queue with leases, owned by the pipeline host.
+
+    Only processes on the pipeline host open the database; render workers on
+    other hosts use RemoteRenderQueue against serve(). Job states: queued ->
+    leased -> done | failed. A leased job whose lease runs out (worker died or
+    lost its host) goes back to queued until it has been claimed
+    RENDER_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, path=RENDER_QUEUE_DB, lease_s=RENDER_LEASE_S, max_attempts=RENDER_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+        self.local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """One connection per thread (rollback journal: the database never leaves local disk)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self.local.conn = conn
+        return conn
+
+    def enqueue(self, job_id, manifest):
+        """Queues a render (re-queuing a job id resets it, e.g. when a pipeline is resumed)."""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO render_jobs (job_id, manifest, status, attempts, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', 0, ?, ?)",
+                (job_id, json.dumps(manifest), now, now)
+            )
+        return job_id
+
+    def requeue_expired(self):
+        """Returns jobs with a lapsed lease to the queue (or fails them after max_attempts); returns the count."""
+        now = time.time()
+        with self.connect() as conn:
+            failed = conn.execute(
+                "UPDATE render_jobs SET status = 'failed', error = 'lease expired', worker = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE render_jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ?",
+                (now, now)
+            ).rowcount
+        return requeued + failed
+
+    def claim(self, worker):
+        """Leases the oldest queued job to worker; returns {"job_id", "manifest", "attempt"} or None."""
+        self.requeue_expired()
+        now = time.time()
+        with self.connect() as conn:
+            # One statement, so two workers can never claim the same job
+            row = conn.execute(
+                "UPDATE render_jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = (SELECT job_id FROM render_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "RETURNING job_id, manifest, attempts",
+                (worker, now + self.lease_s, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row["job_id"], "manifest": json.loads(row["manifest"]), "attempt": row["attempts"]}
+
+    def renew(self, job_id, worker):
+        """Extends worker's lease on job_id; False if the lease was lost (the job was requeued)."""
+        now = time.time()
+        with self.connect() as conn:
+            return conn.execute(
+                "UPDATE render_jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_s, now, job_id, worker)
+            ).rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """Publishes a job's result; False if worker no longer held the lease."""
+        with self.connect() as conn:
+            return conn.execute(
+                "UPDATE render_jobs SET status = 'done', result = ?, error = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), job_id, worker)
+            ).rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Gives a failed job back to the queue, or marks it failed after max_attempts."""
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE render_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "worker = NULL, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, str(error)[:2000], time.time(), job_id, worker)
+            )
+
+    def get(self, job_id):
+        row = self.connect().execute("SELECT * FROM render_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["manifest"] = json.loads(job["manifest"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def wait(self, job_id, timeout=None, poll=1.0):
+        """Blocks until job_id is rendered and returns its result; raises RenderFailed on failure or timeout."""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise RenderFailed(f"Render job {job_id} is not in the queue")
+            if job["status"] == "done":
+                return job["result"]
+            if job["status"] == "failed":
+                raise RenderFailed(f"Render job {job_id} failed after {job['attempts']} attempts: {job['error']}")
+            if deadline and time.time() > deadline:
+                raise RenderFailed(f"Render job {job_id} not finished after {timeout}s (status: {job['status']})")
+            time.sleep(poll)
+
+    def stats(self):
+        """Job count per status."""
+        rows = self.connect().execute("SELECT status, COUNT(*) AS n FROM render_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class RemoteRenderQueue:
+    """Worker-side RenderQueue client that talks to serve() over HTTP."""
+
+    def __init__(self, url, token=RENDER_QUEUE_TOKEN, timeout=30):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.lease_s = self.call("config")["lease_s"]
+
+    def call(self, action, **params):
+        request = urllib.request.Request(
+            f"{self.url}/{action}", data=json.dumps(params).encode("utf-8"), method="POST",
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)["result"]
+        except urllib.error.HTTPError as e:
+            raise Exception(f"Render queue {action} failed: HTTP {e.code} {e.read().decode(errors='replace')[:200]}")
+
+    def claim(self, worker):
+        return self.call("claim", worker=worker)
+
+    def renew(self, job_id, worker):
+        return self.call("renew", job_id=job_id, worker=worker)
+
+    def complete(self, job_id, worker, result):
+        return self.call("complete", job_id=job_id, worker=worker, result=result)
+
+    def fail(self, job_id, worker, error):
+        self.call("fail", job_id=job_id, worker=worker, error=str(error))
+
+    def get(self, job_id):
+        return self.call("get", job_id=job_id)
+
+    def requeue_expired(self):
+        return self.call("requeue_expired")
+
+    def stats(self):
+        return self.call("stats")
+
+
+class RenderQueueHandler(BaseHTTPRequestHandler):
+    """JSON-over-POST API for RemoteRenderQueue: POST /<action> with the method's arguments."""
+
+    ACTIONS = {
+        "config": lambda queue, p: {"lease_s": queue.lease_s},
+        "claim": lambda queue, p: queue.claim(p["worker"]),
+        "renew": lambda queue, p: queue.renew(p["job_id"], p["worker"]),
+        "complete": lambda queue, p: queue.complete(p["job_id"], p["worker"], p["result"]),
+        "fail": lambda queue, p: queue.fail(p["job_id"], p["worker"], p["error"]),
+        "get": lambda queue, p: queue.get(p["job_id"]),
+        "requeue_expired": lambda queue, p: queue.requeue_expired(),
+        "stats": lambda queue, p: queue.stats(),
+    }
+
+    def do_POST(self):
+        action = self.ACTIONS.get(self.path.strip("/"))
+        if action is None:
+            return self.respond(404, {"error": f"unknown action {self.path}"})
+        if self.server.token and self.headers.get("Authorization") != f"Bearer {self.server.token}":
+            return self.respond(403, {"error": "bad token"})
+        try:
+            params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            result = action(self.server.queue, params)
+        except (KeyError, ValueError) as e:
+            return self.respond(400, {"error": f"bad request: {e}"})
+        self.respond(200, {"result": result})
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(queue, bind=RENDER_QUEUE_BIND, token=RENDER_QUEUE_TOKEN):
+    """HTTP server exposing queue to render workers; call serve_forever() (or run it in a thread).
+
+    Without a token only loopback addresses are allowed: anyone who can reach the
+    server could otherwise claim, complete or fail render jobs.
+    """
+    host, port = bind.rsplit(":", 1)
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve the render queue on {bind} without RENDER_QUEUE_TOKEN")
+    server = ThreadingHTTPServer((host, int(port)), RenderQueueHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    server.token = token
+    return server
+
+
+def open_queue(location, lease_s=RENDER_LEASE_S):
+    """RemoteRenderQueue for an http(s):// URL, otherwise the local database at location."""
+    if location.startswith(("http://", "https://")):
+        return RemoteRenderQueue(location)
+    return RenderQueue(location, lease_s=lease_s)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the render queue to render workers on other hosts")
+    parser.add_argument("--db", default=RENDER_QUEUE_DB, help="Queue database (local disk)")
+    parser.add_argument("--bind", default=RENDER_QUEUE_BIND, help="host:port to listen on")
+    parser.add_argument("--lease", type=int, default=RENDER_LEASE_S, help="Lease length in seconds")
+    args = parser.parse_args()
+
+    try:
+        server = serve(RenderQueue(args.db, lease_s=args.lease), args.bind)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+    print(f"📡 Render queue {args.db} listening on {args.bind}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
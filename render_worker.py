@@ -0,0 +1,160 @@
+import os
+import time
+import socket
+import argparse
+import datetime
+import threading
+
+from render_queue import open_queue, RENDER_QUEUE_DB, RENDER_QUEUE_URL, RENDER_LEASE_S
+from renderers import planned_duration, variant_path
+from encoder_profiles import resolve_profile, resolve_variants, describe
+from shorts_generator import YouTubeShortsBot
+
+# Seconds between queue polls when there is nothing to render
+RENDER_POLL_INTERVAL = float(os.getenv("RENDER_POLL_INTERVAL", "2"))
+
+
+def default_worker_id():
+    return os.getenv("RENDER_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class RenderWorker:
+    """Claims render jobs from the queue, renders them and publishes the results.
+
+    Run one per render host (or per core budget). Workers on other hosts than
+    the pipeline reach the queue through its HTTP server (RemoteRenderQueue).
+    Clip, audio and output paths in the manifests must be reachable from every
+    host (shared storage).
+    """
+
+    def __init__(self, queue=None, worker_id=None):
+        self.queue = queue or open_queue(RENDER_QUEUE_URL or RENDER_QUEUE_DB)
+        self.worker_id = worker_id or default_worker_id()
+        # Only used for its renderers and the shared subtitle cache
+        self.bot = YouTubeShortsBot()
+        self.stopped = threading.Event()
+
+    def stop(self):
+        """Makes run_forever return after the current job."""
+        self.stopped.set()
+
+    def keep_lease(self, job_id, done, lost):
+        """Renews the lease every third of its length until done is set (sets lost if it was taken away)."""
+        while not done.wait(self.queue.lease_s / 3):
+            try:
+                renewed = self.queue.renew(job_id, self.worker_id)
+            except Exception as e:
+                # Queue unreachable for now; the next renewal may still make it in time
+                print(f"  ⚠️ Lease renewal for {job_id} failed: {e}")
+                continue
+            if not renewed:
+                lost.set()
+                return
+
+    def render(self, job_id, manifest):
+        """Renders one manifest to its output path; returns the result published to the queue."""
+        profile = manifest["profile"]
+        job_bot = self.bot.for_job(f"render-{job_id}")
+        job_bot.subtitle_mode = profile.get("subtitle_mode", "image")
+        # Resolved here, so "auto" uses this host's calibration
+        duration = planned_duration(manifest["scenes"])
+        encoder = resolve_profile(profile.get("encoder"), duration)
+        variants = resolve_variants(profile.get("variants", []), encoder, duration)
+        renderer = job_bot.get_renderer(profile["backend"], profile.get("parallel"), profile.get("low_memory"), encoder)
+        print(f"  🎞️ Render backend: {renderer.name}, encoder: {describe(encoder)}")
+
+        output_path = manifest["output_path"]
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Written next to the target and renamed, so readers never see a partial file
+        tmp_path = os.path.splitext(output_path)[0] + f".{self.worker_id}.part.mp4"
+        renames = [(tmp_path, output_path)] + [
+            (variant_path(tmp_path, variant), variant_path(output_path, variant)) for variant in variants
+        ]
+        started = time.perf_counter()
+        try:
+            renderer.render(manifest["scenes"], tmp_path, variants)
+            # Variants first: the main file appearing is what marks the render as finished
+            for src, dst in reversed(renames):
+                os.replace(src, dst)
+        finally:
+            for src, _ in renames:
+                if os.path.exists(src):
+                    os.unlink(src)
+            job_bot.remove_job_assets()
+
+        return {
+            "video_path": output_path,
+            "worker": self.worker_id,
+            "renderer": renderer.name,
+            "encoder": encoder,
+            "variants": {variant["name"]: variant_path(output_path, variant) for variant in variants},
+            "render_s": round(time.perf_counter() - started, 3),
+            "output_bytes": os.path.getsize(output_path),
+            "scene_stats": getattr(renderer, "scene_stats", []),
+        }
+
+    def run_one(self):
+        """Claims and renders one job; returns False if the queue was empty."""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+
+        job_id = job["job_id"]
+        print(f"[{datetime.datetime.now()}] 🎞️ Rendering {job_id} (attempt {job['attempt']})...")
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(job_id, done, lost), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.render(job_id, job["manifest"])
+        except Exception as e:
+            print(f"[{datetime.datetime.now()}] ❌ Render {job_id} failed: {e}")
+            self.queue.fail(job_id, self.worker_id, e)
+            return True
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if lost.is_set() or not self.queue.complete(job_id, self.worker_id, result):
+            # Another worker owns the job now; its result will be published instead
+            print(f"[{datetime.datetime.now()}] ⚠️ Lease on {job_id} was lost, result discarded")
+        else:
+            print(f"[{datetime.datetime.now()}] ✅ Rendered {job_id} in {result['render_s']:.1f}s")
+        return True
+
+    def run_forever(self, poll=RENDER_POLL_INTERVAL, max_jobs=None):
+        """Renders jobs until stop() is called or max_jobs have been handled (forever if None)."""
+        handled = 0
+        while not self.stopped.is_set() and (max_jobs is None or handled < max_jobs):
+            try:
+                claimed = self.run_one()
+            except Exception as e:
+                print(f"[{datetime.datetime.now()}] ⚠️ Render queue unavailable: {e}")
+                claimed = False
+            if claimed:
+                handled += 1
+            else:
+                self.stopped.wait(poll)
+        return handled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render worker: renders jobs queued by the pipeline")
+    parser.add_argument("--queue", default=RENDER_QUEUE_URL or RENDER_QUEUE_DB,
+                        help="Queue server URL (http://host:port) or, on the pipeline host, the queue database")
+    parser.add_argument("--worker-id", default=None, help="Name of this worker (default: host-pid)")
+    parser.add_argument("--lease", type=int, default=RENDER_LEASE_S, help="Lease length in seconds (local database only)")
+    parser.add_argument("--poll", type=float, default=RENDER_POLL_INTERVAL, help="Idle poll interval")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs")
+    parser.add_argument("--requeue-lost", action="store_true", help="Requeue jobs with expired leases and exit")
+    parser.add_argument("--stats", action="store_true", help="Print job counts per status and exit")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue, lease_s=args.lease)
+    if args.requeue_lost:
+        print(f"↩️ Requeued {queue.requeue_expired()} render jobs with expired leases")
+    elif args.stats:
+        print(queue.stats())
+    else:
+        worker = RenderWorker(queue, args.worker_id)
+        print(f"👷 Render worker {worker.worker_id} polling {args.queue}")
+        worker.run_forever(args.poll, args.max_jobs)
@@ -0,0 +1,563 @@
+import os
+import gc
+import time
+import subprocess
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+# MoviePy is imported by the code that uses it (it takes ~0.4s to import)
+from subtitles import word_timings, write_ass, ass_filter
+from metrics import RSSSampler, current_rss_mb
+
+WIDTH = 1080
+HEIGHT = 1920
+FPS = 24
+FADE_IN = 0.2
+MAX_DURATION = 58  # Shorts limit
+
+# Identical codec parameters for every output, so per-scene segments can be stream-copied together
+VIDEO_CODEC_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-r', str(FPS)]
+AUDIO_CODEC_ARGS = ['-c:a', 'aac', '-ar', '44100', '-ac', '2']
+
+# Parallel mode: scene segments rendered in a process pool sized to the machine
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+
+def rate_control_args(encoder):
+    """x264 CRF/maxrate options of a resolved encoder profile (see encoder_profiles.py).
+
+    The preset and thread count are passed separately; None keeps libx264's defaults.
+    """
+    if not encoder:
+        return []
+    args = ['-crf', str(encoder['crf'])]
+    if encoder.get('maxrate_kbps'):
+        args += ['-maxrate', f"{encoder['maxrate_kbps']}k", '-bufsize', f"{2 * encoder['maxrate_kbps']}k"]
+    return args
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_binary():
+    """The ffmpeg executable MoviePy would use (FFMPEG_BINARY or the imageio-ffmpeg build), without importing MoviePy."""
+    binary = os.getenv("FFMPEG_BINARY", "ffmpeg-imageio")
+    if binary == "ffmpeg-imageio":
+        from imageio_ffmpeg import get_ffmpeg_exe
+        return get_ffmpeg_exe()
+    return binary
+
+
+def variant_path(output_path, variant):
+    """Where an output variant of output_path is written (short_x.mp4 -> short_x.720p.mp4)."""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}.{variant['name']}{ext}"
+
+
+def fit_filter(width=WIDTH, height=HEIGHT, fps=FPS):
+    """ffmpeg filter chain that center-crops to the target aspect ratio, scales and sets the frame rate."""
+    ratio = f"{width}/{height}"
+    return (
+        f"crop='if(gt(iw/ih,{ratio}),ih*{ratio},iw)':'if(gt(iw/ih,{ratio}),ih,iw/({ratio}))',"
+        f"scale={width}:{height},setsar=1,fps={fps}"
+    )
+
+
+def scene_duration(scene):
+    """Voiceover duration of a scene (from TTS metadata, or probed from the audio file)."""
+    if scene.get('audio_duration'):
+        return scene['audio_duration']
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    return ffmpeg_parse_infos(scene['audio_path'])['duration']
+
+
+def renderable_scenes(script_data):
+    """Scenes that have both footage and a voiceover on disk."""
+    scenes = []
+    for i, scene in enumerate(script_data):
+        video_path = scene.get('video_path')
+        if not video_path or not os.path.exists(video_path):
+            print(f"  ⚠️ Missing video for scene {i+1}, skipping.")
+            continue
+        if not scene.get('audio_path') or not os.path.exists(scene['audio_path']):
+            print(f"  ⚠️ Missing voiceover for scene {i+1}, skipping.")
+            continue
+        scenes.append(scene)
+    return scenes
+
+
+def planned_duration(script_data):
+    """Length of the rendered short in seconds (renderable scenes, capped at MAX_DURATION)."""
+    return min(sum(scene_duration(scene) for scene in renderable_scenes(script_data)), MAX_DURATION)
+
+
+class MoviePyRenderer:
+    """Decodes, composites and encodes frames in Python with MoviePy."""
+
+    name = "moviepy"
+
+    def __init__(self, assets_dir, subtitle_renderer, subtitle_mode="image", encoder=None):
+        self.assets_dir = assets_dir
+        # Resolved encoder profile (see encoder_profiles.py); None keeps libx264's defaults
+        self.encoder = encoder
+        self.subtitle_renderer = subtitle_renderer
+        self.subtitle_mode = subtitle_mode
+
+    def build_scene_clip(self, scene, duration, sources=None):
+        """Crops/resizes footage to 1080x1920, syncs the voiceover and overlays subtitles.
+
+        The file readers opened for the scene are appended to sources, so the caller can close them.
+        """
+        from moviepy import VideoFileClip, AudioFileClip, ImageClip, CompositeVideoClip, vfx
+
+        audio_clip = AudioFileClip(scene['audio_path'])
+        video_clip = VideoFileClip(scene['video_path'])
+        if sources is not None:
+            sources.extend([video_clip, audio_clip])
+
+        # Loop video if it's shorter than audio
+        if video_clip.duration < duration:
+            video_clip = video_clip.with_effects([vfx.Loop(duration=duration)])
+
+        # Cut video to exact audio length
+        video_clip = video_clip.subclipped(0, duration)
+        video_clip = video_clip.with_audio(audio_clip)
+
+        # Resize to Vertical (1080x1920)
+        # STRICT RESIZING: Ensure every clip is exactly 1080x1920 (normalized clips already are)
+        w, h = video_clip.size
+        if (w, h) != (WIDTH, HEIGHT):
+            target_ratio = WIDTH / HEIGHT
+            current_ratio = w/h
+
+            if current_ratio > target_ratio:
+                # Too wide, crop width
+                new_width = h * target_ratio
+                video_clip = video_clip.cropped(x1=w/2 - new_width/2, width=new_width, height=h)
+            elif current_ratio < target_ratio:
+                # Too tall (unlikely for portrait, but possible), crop height
+                new_height = w / target_ratio
+                video_clip = video_clip.cropped(y1=h/2 - new_height/2, width=w, height=new_height)
+
+            # Force resize to 1080x1920 to match standard
+            video_clip = video_clip.resized(height=HEIGHT)
+            if video_clip.w != WIDTH:
+                 video_clip = video_clip.resized(width=WIDTH)
+
+        # Subtitles (cached word rasters; ASS mode burns them in at encode time instead)
+        text_clips = []
+        if self.subtitle_mode != "ass":
+            for word, start, end in word_timings(scene, duration):
+                txt_clip = ImageClip(self.subtitle_renderer.word_image(word))
+                txt_clip = txt_clip.with_position(('center', 'center')).with_duration(end - start).with_start(start)
+                text_clips.append(txt_clip)
+
+        # Compose scene with fixed size
+        scene_clip = CompositeVideoClip([video_clip] + text_clips, size=(WIDTH, HEIGHT))
+
+        # Add Transition (Fade In)
+        # Apply fade in to all scenes for smooth entry
+        return scene_clip.with_effects([vfx.FadeIn(duration=FADE_IN)])
+
+    def render_segment(self, scene, output_path, threads=None, variants=()):
+        """Renders a single scene to its own file (used by ParallelRenderer)."""
+        duration = scene_duration(scene)
+        sources = []
+        try:
+            clip = self.build_scene_clip(scene, duration, sources)
+
+            subtitle_filter = None
+            if self.subtitle_mode == "ass":
+                ass_path = write_ass(word_timings(scene, duration), os.path.splitext(output_path)[0] + ".ass")
+                subtitle_filter = ass_filter(ass_path)
+
+            if variants:
+                self.write_outputs(clip, output_path, variants, subtitle_filter, threads or self.threads)
+            else:
+                ffmpeg_params = ['-pix_fmt', 'yuv420p', '-ac', '2'] + rate_control_args(self.encoder)
+                if subtitle_filter:
+                    ffmpeg_params += ['-vf', subtitle_filter]
+                clip.write_videofile(
+                    output_path, codec='libx264', audio_codec='aac', fps=FPS, audio_fps=44100,
+                    preset=self.preset, threads=threads or self.threads, ffmpeg_params=ffmpeg_params, logger=None
+                )
+            clip.close()
+        finally:
+            close_clips(sources)
+        return output_path
+
+    def write_outputs(self, clip, output_path, variants, subtitle_filter=None, threads=None):
+        """Encodes clip to output_path and every output variant in one pass over its frames.
+
+        Each frame is composited once and piped to one ffmpeg encoder per output
+        (variants are scaled by their encoder). The audio is encoded once and
+        stream-copied into every output.
+        """
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        audio_path = os.path.splitext(output_path)[0] + ".audio.m4a"
+        clip.audio.write_audiofile(audio_path, fps=44100, codec='aac', ffmpeg_params=['-ac', '2'], logger=None)
+        outputs = [(output_path, self.encoder, None, clip.duration)] + [
+            (variant_path(output_path, variant), variant['encoder'], variant, min(variant['max_duration'], clip.duration))
+            for variant in variants
+        ]
+        writers = []
+        try:
+            for path, encoder, variant, duration in outputs:
+                filters = [subtitle_filter] if subtitle_filter else []
+                if variant and (variant['width'], variant['height']) != tuple(clip.size):
+                    filters.append(fit_filter(variant['width'], variant['height']))
+                params = ['-pix_fmt', 'yuv420p', '-shortest'] + rate_control_args(encoder)
+                if filters:
+                    params += ['-vf', ",".join(filters)]
+                writer = FFMPEG_VideoWriter(
+                    path, clip.size, FPS, codec='libx264', audiofile=audio_path, audio_codec='copy',
+                    preset=encoder['preset'] if encoder else "medium",
+                    threads=threads or (encoder or {}).get('threads'), ffmpeg_params=params
+                )
+                # Shorter cuts get fewer frames; -shortest trims their audio to match
+                writers.append((writer, int(round(duration * FPS))))
+
+            for n, frame in enumerate(clip.iter_frames(fps=FPS, dtype="uint8")):
+                for writer, frames in writers:
+                    if n < frames:
+                        writer.write_frame(frame)
+                    elif n == frames:
+                        writer.close()
+        finally:
+            for writer, _ in writers:
+                writer.close()
+            if os.path.exists(audio_path):
+                os.unlink(audio_path)
+        return output_path
+
+    @property
+    def preset(self):
+        return self.encoder['preset'] if self.encoder else "medium"
+
+    @property
+    def threads(self):
+        return self.encoder.get('threads') if self.encoder else None
+
+    def warm_up(self, scenes):
+        """Rasterizes every subtitle word up front so worker processes only read the cache."""
+        if self.subtitle_mode != "ass":
+            for scene in scenes:
+                for word, _, _ in word_timings(scene, scene_duration(scene)):
+                    self.subtitle_renderer.word_image(word)
+
+    def render(self, script_data, output_path, variants=()):
+        sources = []
+        try:
+            return self._render(script_data, output_path, sources, variants)
+        finally:
+            close_clips(sources)
+
+    def _render(self, script_data, output_path, sources, variants=()):
+        from moviepy import concatenate_videoclips
+
+        final_clips = []
+        timed_words = []
+        offset = 0
+
+        for i, scene in enumerate(renderable_scenes(script_data)):
+            print(f"  ✂️ Processing Scene {i+1}...")
+            duration = scene_duration(scene)
+            final_clips.append(self.build_scene_clip(scene, duration, sources))
+            timed_words.extend((word, offset + start, offset + end) for word, start, end in word_timings(scene, duration))
+            offset += duration
+
+        if not final_clips:
+            raise Exception("No clips were generated.")
+
+        print("Creating Final Composite...")
+        # Use compose method to fix glitches
+        final_video = concatenate_videoclips(final_clips, method="compose")
+
+        # Enforce 58s Max Duration (Shorts Limit)
+        if final_video.duration > MAX_DURATION:
+            print(f"⚠️ Video duration {final_video.duration}s exceeds {MAX_DURATION}s. Trimming.")
+            final_video = final_video.subclipped(0, MAX_DURATION)
+
+        subtitle_filter = None
+        if self.subtitle_mode == "ass" and timed_words:
+            subtitle_filter = ass_filter(write_ass(timed_words, os.path.join(self.assets_dir, "subtitles.ass")))
+
+        if variants:
+            print(f"  🔀 Encoding {len(variants) + 1} outputs from one pass...")
+            return self.write_outputs(final_video, output_path, variants, subtitle_filter, self.threads)
+
+        ffmpeg_params = rate_control_args(self.encoder)
+        if subtitle_filter:
+            ffmpeg_params += ['-vf', subtitle_filter]
+
+        final_video.write_videofile(
+            output_path, codec='libx264', audio_codec='aac', fps=FPS, preset=self.preset,
+            threads=self.threads, ffmpeg_params=ffmpeg_params or None
+        )
+        return output_path
+
+
+class FFmpegRenderer:
+    """Renders the whole short with one native ffmpeg filtergraph (no frames pass through Python)."""
+
+    name = "ffmpeg"
+
+    def __init__(self, assets_dir, encoder=None, size=(WIDTH, HEIGHT)):
+        self.assets_dir = assets_dir
+        # Resolved encoder profile (see encoder_profiles.py); None keeps libx264's defaults
+        self.encoder = encoder
+        # Output frame size (smaller for draft proxies, see draft.py)
+        self.size = size
+
+    @staticmethod
+    def scene_filters(index, duration, size=(WIDTH, HEIGHT)):
+        """Video/audio filter chains for one scene: crop to 9:16, scale, loop/trim, fade in."""
+        v_in, a_in = 2 * index, 2 * index + 1
+        video = (
+            f"[{v_in}:v]{fit_filter(*size)},"
+            f"trim=duration={duration:.3f},setpts=PTS-STARTPTS,"
+            f"fade=t=in:st=0:d={FADE_IN}[v{index}]"
+        )
+        audio = (
+            f"[{a_in}:a]aresample=44100,apad,"
+            f"atrim=duration={duration:.3f},asetpts=PTS-STARTPTS[a{index}]"
+        )
+        return video, audio
+
+    def encode_args(self, encoder, threads, max_duration=MAX_DURATION):
+        """Options for one output: length cap, codecs, x264 preset/rate control and threads."""
+        encoder_args = []
+        if encoder:
+            encoder_args = ['-preset', encoder['preset'], *rate_control_args(encoder)]
+            threads = threads or encoder.get('threads')
+        return [
+            '-t', str(max_duration),
+            *VIDEO_CODEC_ARGS,
+            *encoder_args,
+            *AUDIO_CODEC_ARGS,
+            *(['-threads', str(threads)] if threads else []),
+            '-movflags', '+faststart',
+        ]
+
+    def build_command(self, scenes, output_path, subtitle_path=None, threads=None, variants=()):
+        """One ffmpeg command for the scenes; each output variant gets its own encoder
+        fed from the same composed graph (split), so decoding and compositing run once."""
+        inputs = []
+        filters = []
+        concat_inputs = ""
+        timed_words = []
+        offset = 0
+
+        for i, scene in enumerate(scenes):
+            duration = scene_duration(scene)
+            # -stream_loop replaces vfx.Loop: trim takes exactly what the voiceover needs
+            inputs += ['-stream_loop', '-1', '-i', scene['video_path'], '-i', scene['audio_path']]
+            filters.extend(self.scene_filters(i, duration, self.size))
+            concat_inputs += f"[v{i}][a{i}]"
+            timed_words.extend((word, offset + start, offset + end) for word, start, end in word_timings(scene, duration))
+            offset += duration
+
+        filters.append(f"{concat_inputs}concat=n={len(scenes)}:v=1:a=1[vcat][aout]")
+        if timed_words:
+            subtitle_path = subtitle_path or os.path.join(self.assets_dir, "subtitles.ass")
+            write_ass(timed_words, subtitle_path, *self.size)
+            filters.append(f"[vcat]{ass_filter(subtitle_path)}[vout]")
+        else:
+            filters.append("[vcat]null[vout]")
+
+        if offset > MAX_DURATION:
+            print(f"⚠️ Video duration {offset:.1f}s exceeds {MAX_DURATION}s. Trimming.")
+
+        video, audio = '[vout]', '[aout]'
+        variant_outputs = []
+        if variants:
+            n = len(variants) + 1
+            filters.append("[vout]split=" + str(n) + "".join(f"[vs{i}]" for i in range(n)))
+            filters.append("[aout]asplit=" + str(n) + "".join(f"[as{i}]" for i in range(n)))
+            video, audio = '[vs0]', '[as0]'
+            for i, variant in enumerate(variants, 1):
+                if (variant['width'], variant['height']) != tuple(self.size):
+                    filters.append(f"[vs{i}]{fit_filter(variant['width'], variant['height'])}[vv{i}]")
+                else:
+                    filters.append(f"[vs{i}]null[vv{i}]")
+                variant_outputs += [
+                    '-map', f'[vv{i}]', '-map', f'[as{i}]',
+                    *self.encode_args(variant['encoder'], threads, variant['max_duration']),
+                    variant_path(output_path, variant)
+                ]
+
+        return [
+            ffmpeg_binary(), '-y', '-loglevel', 'error',
+            *inputs,
+            '-filter_complex', ";".join(filters),
+            '-map', video, '-map', audio,
+            *self.encode_args(self.encoder, threads),
+            output_path,
+            *variant_outputs
+        ]
+
+    def run(self, cmd):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg failed: {result.stderr.strip()[-2000:]}")
+
+    def render_segment(self, scene, output_path, threads=None, variants=()):
+        """Renders a single scene to its own file (used by ParallelRenderer)."""
+        subtitle_path = os.path.splitext(output_path)[0] + ".ass"
+        self.run(self.build_command([scene], output_path, subtitle_path, threads, variants))
+        return output_path
+
+    def warm_up(self, scenes):
+        pass
+
+    def render(self, script_data, output_path, variants=()):
+        scenes = renderable_scenes(script_data)
+        if not scenes:
+            raise Exception("No clips were generated.")
+
+        print(f"  ⚡ Rendering {len(scenes)} scenes with a native ffmpeg filtergraph"
+              f"{f' ({len(variants) + 1} outputs)' if variants else ''}...")
+        self.run(self.build_command(scenes, output_path, variants=variants))
+        return output_path
+
+
+def concat_segments(segment_paths, output_path, assets_dir, max_duration=MAX_DURATION):
+    """Joins segments with identical codec parameters by stream copy (no re-encode), capped at max_duration."""
+    list_path = os.path.join(assets_dir, "segments.txt")
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [
+        ffmpeg_binary(), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-c', 'copy', '-t', str(max_duration),
+        '-movflags', '+faststart',
+        output_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg concat failed: {result.stderr.strip()[-2000:]}")
+    return output_path
+
+
+def concat_variants(segment_paths, output_path, assets_dir, variants):
+    """Joins each variant's segments (see variant_path); a cut only has segments up to its length."""
+    for variant in variants:
+        paths = [variant_path(path, variant) for path in segment_paths]
+        paths = [path for path in paths if os.path.exists(path)]
+        concat_segments(paths, variant_path(output_path, variant), assets_dir, variant['max_duration'])
+
+
+def segment_variants(variants, offset):
+    """Variants that still need a scene starting at offset seconds (shorter cuts end earlier)."""
+    return [variant for variant in variants if variant['max_duration'] > offset]
+
+
+def close_clips(clips):
+    """Closes MoviePy file clips (terminating their ffmpeg reader processes)."""
+    for clip in clips:
+        try:
+            clip.close()
+        except Exception:
+            pass
+
+
+def _render_segment_job(scene_renderer, scene, output_path, threads, variants=()):
+    """Process pool entry point (module level so it can be pickled)."""
+    return scene_renderer.render_segment(scene, output_path, threads, variants)
+
+
+class ParallelRenderer:
+    """Renders each scene to a segment in a process pool, then stream-copies the segments together."""
+
+    def __init__(self, scene_renderer, assets_dir, workers=RENDER_WORKERS):
+        self.scene_renderer = scene_renderer
+        self.assets_dir = assets_dir
+        self.workers = max(1, workers)
+        self.name = f"{scene_renderer.name}+parallel"
+
+    def render(self, script_data, output_path, variants=()):
+        scenes = renderable_scenes(script_data)
+        if not scenes:
+            raise Exception("No clips were generated.")
+
+        workers = min(self.workers, len(scenes))
+        # Split the cores between concurrent encoders instead of oversubscribing
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"  ⚡ Rendering {len(scenes)} scene segments in {workers} processes ({threads} threads each)...")
+
+        self.scene_renderer.warm_up(scenes)
+        segment_paths = [os.path.join(self.assets_dir, f"segment_{i}.mp4") for i in range(len(scenes))]
+        offsets = [0]
+        for scene in scenes[:-1]:
+            offsets.append(offsets[-1] + scene_duration(scene))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_render_segment_job, self.scene_renderer, scene, path, threads,
+                            segment_variants(variants, offset))
+                for scene, path, offset in zip(scenes, segment_paths, offsets)
+            ]
+            for future in futures:
+                future.result()
+
+        print("  🔗 Joining segments (stream copy)...")
+        concat_variants(segment_paths, output_path, self.assets_dir, variants)
+        return concat_segments(segment_paths, output_path, self.assets_dir)
+
+
+class SequentialRenderer:
+    """Low-memory mode: renders and flushes one scene at a time, then stream-copies the segments together.
+
+    Only one scene's readers, subtitle clips and frame buffers are alive at any moment,
+    so peak memory no longer grows with the number of scenes. Per-scene peak RSS
+    (this process plus its ffmpeg children) is kept in scene_stats.
+    """
+
+    def __init__(self, scene_renderer, assets_dir):
+        self.scene_renderer = scene_renderer
+        self.assets_dir = assets_dir
+        self.name = f"{scene_renderer.name}+lowmem"
+        self.scene_stats = []
+
+    def render(self, script_data, output_path, variants=()):
+        scenes = renderable_scenes(script_data)
+        if not scenes:
+            raise Exception("No clips were generated.")
+
+        print(f"  🪶 Rendering {len(scenes)} scenes one at a time (low memory)...")
+        # The encoder profile's thread count (see select_profile) wins; all cores only without a profile
+        threads = None if getattr(self.scene_renderer, "encoder", None) else os.cpu_count()
+        self.scene_stats = []
+        segment_paths = []
+        offset = 0
+        for i, scene in enumerate(scenes):
+            if offset >= MAX_DURATION:
+                print(f"  ⚠️ Scenes after {MAX_DURATION}s are trimmed anyway, skipping {len(scenes) - i}.")
+                break
+            path = os.path.join(self.assets_dir, f"segment_{i}.mp4")
+            start = time.perf_counter()
+            with RSSSampler(include_children=True) as rss:
+                self.scene_renderer.render_segment(scene, path, threads, segment_variants(variants, offset))
+            # Drop the scene's clips and frame buffers before the next one is opened
+            gc.collect()
+            stats = {
+                "scene": i + 1,
+                "duration_s": round(time.perf_counter() - start, 3),
+                "peak_rss_mb": round(rss.peak, 1),
+                "rss_after_mb": round(current_rss_mb(include_children=True), 1),
+            }
+            self.scene_stats.append(stats)
+            print(f"  ✂️ Scene {i+1}: {stats['duration_s']}s, peak {stats['peak_rss_mb']} MB")
+            segment_paths.append(path)
+            offset += scene_duration(scene)
+
+        print("  🔗 Joining segments (stream copy)...")
+        concat_variants(segment_paths, output_path, self.assets_dir, variants)
+        return concat_segments(segment_paths, output_path, self.assets_dir)
+
+
+RENDERERS = {
+    MoviePyRenderer.name: MoviePyRenderer,
+    FFmpegRenderer.name: FFmpegRenderer,
+}
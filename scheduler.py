@@ -1,106 +1,249 @@
 import time
-import subprocess
+import queue
 import logging
 import datetime
-import sys
+import argparse
+import threading
 import os
 import json
-import re
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(
-    filename='scheduler.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Imported once for the lifetime of the scheduler (no interpreter per job)
+from shorts_generator import YouTubeShortsBot, ConfigError, run_pipeline, new_job_id, validate_config
+from checkpoints import JobCheckpoints
+from draft import DraftRejected
+from metrics import registry
+from prefetch import Prefetcher, PREFETCH_INTERVAL
 
-STATS_FILE = 'daily_stats.json'
+# Interval in seconds between job triggers (4 hours = 14400 seconds)
+INTERVAL = int(os.getenv("SCHEDULER_INTERVAL", "14400"))
+
+# Bounded worker pool per pipeline stage, so job N+1's downloads/TTS overlap job N's render
+STAGE_WORKERS = {
+    "llm": int(os.getenv("SCHEDULER_LLM_WORKERS", "2")),
+    "download": int(os.getenv("SCHEDULER_DOWNLOAD_WORKERS", "2")),
+    "tts": int(os.getenv("SCHEDULER_TTS_WORKERS", "1")),
+    "render": int(os.getenv("SCHEDULER_RENDER_WORKERS", "1")),
+    "upload": int(os.getenv("SCHEDULER_UPLOAD_WORKERS", "1")),
+}
+MAX_ACTIVE_JOBS = int(os.getenv("SCHEDULER_MAX_ACTIVE_JOBS", "3"))
+# Failed jobs are resumed from their last checkpoint this many times (a rejected draft is final)
+JOB_RETRIES = int(os.getenv("SCHEDULER_JOB_RETRIES", "2"))
+# Warm the caches for likely next topics while no job is running (see prefetch.py)
+SCHEDULER_PREFETCH = os.getenv("SCHEDULER_PREFETCH", "1") == "1"
+# Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (0 = off; metrics/pipeline.prom is always written)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+def setup_logging():
+    """Logs to scheduler.log (configured when a scheduler starts, not on import)."""
+    logging.basicConfig(
+        filename='scheduler.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+def report_previous_days(store):
+    """Logs a daily report for every finished day not reported yet (job history lives in the job store)."""
+    today = datetime.date.today().isoformat()
+    last = store.get_meta("last_report_day")
+    if last is None:
+        store.set_meta("last_report_day", today)
+        return
+    day = datetime.date.fromisoformat(last)
+    while day.isoformat() < today:
+        report = store.daily_report(day.isoformat())
+        logging.info(
+            f"📊 Daily Report ({report['date']}): {report['count']} videos uploaded, {report['failed']} failed. "
+            f"Topics: {', '.join(report['topics'])}. Avg stage seconds: {json.dumps(report['avg_stage_s'])}"
+        )
+        print(f"[{datetime.datetime.now()}] 📊 Daily Report generated for {report['date']}")
+        day += datetime.timedelta(days=1)
+    store.set_meta("last_report_day", today)
+
+class PipelineScheduler:
+    """Runs queued jobs in-process, each stage on its own bounded worker pool."""
+
+    def __init__(self, stage_workers=STAGE_WORKERS, max_active_jobs=MAX_ACTIVE_JOBS, upload=True,
+                 prefetch=SCHEDULER_PREFETCH):
+        # Fail fast on bad configuration, before any job is queued
+        validate_config(upload=upload)
+        setup_logging()
+        self.bot = YouTubeShortsBot().prepare()
+        self.upload = upload
+        self.pools = {
+            stage: ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix=f"stage-{stage}")
+            for stage, n in stage_workers.items()
+        }
+        self.jobs = queue.Queue()
+        self.active_jobs = threading.BoundedSemaphore(max(1, max_active_jobs))
+        self.active_topics = set()
+        self.topics_lock = threading.Lock()
+        # Jobs submitted and not finished yet (queued, running or requeued for a retry), under topics_lock
+        self.pending_jobs = 0
+        # Preset topics (batch mode) and finished results, by job id
+        self.job_topics = {}
+        self.results = {}
+        self.prefetcher = Prefetcher(self.bot) if prefetch else None
+
+    def idle(self):
+        """True when no job is queued or running."""
+        with self.topics_lock:
+            return self.pending_jobs == 0
+
+    def in_flight_topics(self):
+        with self.topics_lock:
+            return list(self.active_topics)
+
+    def stage(self, name, fn, *args):
+        """Runs fn on the named stage's pool and waits for its result."""
+        return self.pools[name].submit(fn, *args).result()
+
+    def run_stage(self, stage, pool, fn, *args):
+        """run_pipeline hook: runs each stage on its pool and tracks topics in flight."""
+        result = self.stage(pool, fn, *args)
+        if stage == "topic":
+            with self.topics_lock:
+                self.active_topics.add(result)
+        return result
+
+    def run_job(self, job_id, attempt=0):
+        """Runs (or resumes) one full pipeline (topic -> script -> audio -> assets -> render -> upload)."""
+        print(f"[{datetime.datetime.now()}] 🚀 Starting job {job_id} (attempt {attempt + 1})...")
+        logging.info(f"Starting job {job_id} (attempt {attempt + 1})")
+        bot = self.bot.for_job(job_id)
+        result = None
+        requeued = False
 
-def load_stats():
-    """Loads daily stats from JSON file."""
-    if os.path.exists(STATS_FILE):
         try:
-            with open(STATS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {"date": str(datetime.date.today()), "count": 0, "topics": []}
-
-def save_stats(stats):
-    """Saves daily stats to JSON file."""
-    with open(STATS_FILE, 'w') as f:
-        json.dump(stats, f)
-
-def update_stats(topic):
-    """Updates the daily stats with a new video."""
-    stats = load_stats()
-    today = str(datetime.date.today())
-    
-    # Check for new day
-    if stats["date"] != today:
-        # Log report for previous day
-        logging.info(f"📊 Daily Report ({stats['date']}): {stats['count']} videos uploaded. Topics: {', '.join(stats['topics'])}")
-        print(f"[{datetime.datetime.now()}] 📊 Daily Report generated for {stats['date']}")
-        
-        # Reset for today
-        stats = {"date": today, "count": 0, "topics": []}
-    
-    stats["count"] += 1
-    if topic:
-        stats["topics"].append(topic)
-    
-    save_stats(stats)
+            with self.topics_lock:
+                in_flight = list(self.active_topics)
+            result = run_pipeline(
+                bot, job_id, resume=attempt > 0,
+                run_stage=self.run_stage, exclude_topics=in_flight,
+                topic=self.job_topics.get(job_id), upload=self.upload
+            )
+            self.results[job_id] = result
+
+            print(f"[{datetime.datetime.now()}] ✅ Job {job_id} completed successfully.")
+            logging.info(f"Job {job_id} completed successfully (video {result['video_id']})")
+            logging.info(f"Video created about: {result['topic']}")
+            logging.info(f"Job {job_id} metrics: {json.dumps(result['metrics'])}")
+            report_previous_days(self.bot.job_store)
+            bot.remove_job_assets()
+
+        except Exception as e:
+            print(f"[{datetime.datetime.now()}] ❌ Job {job_id} failed: {e}")
+            logging.error(f"Job {job_id} failed: {e}")
+            if attempt < JOB_RETRIES and not isinstance(e, DraftRejected):
+                # Checkpoints are kept: the retry only re-runs the failed stage onwards
+                logging.info(f"Requeueing job {job_id} for resume")
+                self.jobs.put((job_id, attempt + 1))
+                requeued = True
+            else:
+                # Give up: release the topic this job had claimed (preset, or picked by its topic stage)
+                claimed = self.job_topics.get(job_id) or JobCheckpoints(job_id).load("topic")
+                with self.topics_lock:
+                    self.active_topics.discard(claimed)
+
+        finally:
+            if result:
+                with self.topics_lock:
+                    self.active_topics.discard(result['topic'])
+            if not requeued:
+                with self.topics_lock:
+                    self.pending_jobs -= 1
+            self.active_jobs.release()
+            self.jobs.task_done()
+
+    def submit(self, job_id=None, topic=None):
+        """Queues a new job (with a preset topic, trend selection is skipped)."""
+        job_id = job_id or new_job_id()
+        if topic:
+            self.job_topics[job_id] = topic
+        with self.topics_lock:
+            if topic:
+                self.active_topics.add(topic)
+            self.pending_jobs += 1
+        self.jobs.put((job_id, 0))
+        return job_id
+
+    def dispatch_forever(self):
+        """Starts queued jobs as soon as a job slot is free."""
+        while True:
+            job_id, attempt = self.jobs.get()
+            self.active_jobs.acquire()
+            threading.Thread(target=self.run_job, args=(job_id, attempt), name=f"job-{job_id}", daemon=True).start()
+
+    def run_forever(self, interval=INTERVAL, prefetch_interval=PREFETCH_INTERVAL):
+        threading.Thread(target=self.dispatch_forever, name="dispatcher", daemon=True).start()
+        if self.prefetcher:
+            threading.Thread(
+                target=self.prefetcher.run_forever, args=(self.idle, self.in_flight_topics, prefetch_interval),
+                name="prefetcher", daemon=True
+            ).start()
+        while True:
+            # A prefetched topic starts with its script, voiceovers and footage already cached
+            topic = self.prefetcher.take(self.in_flight_topics()) if self.prefetcher else None
+            self.submit(topic=topic)
+            print(f"[{datetime.datetime.now()}] 💤 Next job in {interval/3600} hours...")
+            time.sleep(interval)
+
+    def run_batch(self, topics):
+        """Runs one job per topic concurrently (shared bot, caches and stage pools); returns their results.
+
+        Returns {job_id: result} for the jobs that succeeded.
+        """
+        job_ids = [self.submit(topic=topic) for topic in topics]
+        threading.Thread(target=self.dispatch_forever, name="dispatcher", daemon=True).start()
+        # Failed jobs are requeued before they are marked done, so this also waits for retries
+        self.jobs.join()
+        return {job_id: self.results[job_id] for job_id in job_ids if job_id in self.results}
+
+    def run_once(self):
+        """Runs a single job in the foreground (resuming it on failure up to JOB_RETRIES times)."""
+        self.submit(topic=self.prefetcher.take() if self.prefetcher else None)
+        while not self.jobs.empty():
+            job_id, attempt = self.jobs.get()
+            self.active_jobs.acquire()
+            self.run_job(job_id, attempt)
+
 
 def run_job():
-    """Runs the shorts generator script."""
-    print(f"[{datetime.datetime.now()}] 🚀 Starting new job...")
-    logging.info("Starting new job")
-    
-    try:
-        # Run the script and capture output
-        result = subprocess.run(
-            [sys.executable, "shorts_generator.py"], 
-            capture_output=True, 
-            text=True
-        )
-        
-        if result.returncode == 0:
-            print(f"[{datetime.datetime.now()}] ✅ Job completed successfully.")
-            logging.info("Job completed successfully")
-            
-            # Extract topic from output
-            output = result.stdout
-            topic = "Unknown"
-            # Look for "Star Found: <name>" or "Trend Found (RSS): <name>"
-            match = re.search(r"Star Found: (.*)", output)
-            if not match:
-                match = re.search(r"Trend Found \(RSS\): (.*)", output)
-            
-            if match:
-                topic = match.group(1).strip()
-            
-            logging.info(f"Video created about: {topic}")
-            update_stats(topic)
-            
-        else:
-            print(f"[{datetime.datetime.now()}] ❌ Job failed.")
-            logging.error(f"Job failed with return code {result.returncode}")
-            logging.error(f"Error Output: {result.stderr}")
-            
-    except Exception as e:
-        print(f"[{datetime.datetime.now()}] ❌ Scheduler Error: {e}")
-        logging.error(f"Scheduler Error: {e}")
+    """Runs a single pipeline job in-process."""
+    PipelineScheduler().run_once()
+
 
 if __name__ == "__main__":
-    # Interval in seconds (4 hours = 14400 seconds)
-    INTERVAL = 14400 
-    
-    print("🕒 YouTube Shorts Scheduler Started")
-    print(f"⏱️  Interval: {INTERVAL/3600} hours")
-    logging.info("Scheduler started")
-    
-    while True:
-        run_job()
-        
-        print(f"[{datetime.datetime.now()}] 💤 Sleeping for {INTERVAL/3600} hours...")
-        time.sleep(INTERVAL)
+    parser = argparse.ArgumentParser(description="YouTube Shorts Scheduler")
+    parser.add_argument("--interval", type=int, default=INTERVAL, help="Seconds between job triggers")
+    parser.add_argument("--max-active-jobs", type=int, default=MAX_ACTIVE_JOBS, help="Jobs allowed in flight at once")
+    for stage, n in STAGE_WORKERS.items():
+        parser.add_argument(f"--{stage}-workers", type=int, default=n, help=f"Concurrency of the {stage} stage")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Serve Prometheus /metrics on this port")
+    parser.add_argument("--once", action="store_true", help="Run a single job and exit")
+    parser.add_argument("--no-prefetch", action="store_true", help="Don't warm caches between jobs")
+    parser.add_argument("--prefetch-interval", type=int, default=PREFETCH_INTERVAL, help="Seconds between prefetch rounds")
+    parser.add_argument("--prefetch-once", action="store_true", help="Run one prefetch round and exit")
+    args = parser.parse_args()
+
+    stage_workers = {stage: getattr(args, f"{stage}_workers") for stage in STAGE_WORKERS}
+    try:
+        scheduler = PipelineScheduler(stage_workers, args.max_active_jobs,
+                                      prefetch=SCHEDULER_PREFETCH and not args.no_prefetch)
+    except ConfigError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+    if args.metrics_port:
+        registry.serve(args.metrics_port)
+        print(f"📈 Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
+
+    if args.prefetch_once:
+        print(f"🔥 Prefetched: {(scheduler.prefetcher or Prefetcher(scheduler.bot)).run_round()}")
+    elif args.once:
+        scheduler.run_once()
+    else:
+        print("🕒 YouTube Shorts Scheduler Started")
+        print(f"⏱️  Interval: {args.interval/3600} hours")
+        print(f"⚙️  Stage workers: {stage_workers}")
+        logging.info("Scheduler started")
+        scheduler.run_forever(args.interval, args.prefetch_interval)
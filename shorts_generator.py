@@ -1,51 +1,276 @@
 import os
+import copy
+import time
+import datetime
+import shutil
 import random
 import requests
 import json
-from time import sleep
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from asset_cache import DiskCache, FootageCache, AudioCache, ResponseCache
+from subtitles import SubtitleRenderer
+from normalizer import ClipNormalizer
+from metrics import PipelineMetrics, METRICS_FILE
+from job_store import JobStore, normalize_topic
+from trends import TrendFetcher
+from planner import (
+    PROBE_BYTES, PREFIX_MIN_SAVING, needed_duration, plan_footage, top_level_layout, mp4_prefix_size
+)
+from llm_client import LLMClient, validate_script, validate_metadata, validate_package
+from render_queue import RenderQueue, build_manifest
+import tts_engine
 
 import asyncio
-import edge_tts
-import xml.etree.ElementTree as ET
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Libraries for Video Editing
-from moviepy import (
-    VideoFileClip, AudioFileClip, TextClip, CompositeVideoClip, 
-    concatenate_videoclips, vfx
+# Video Editing backends (MoviePy compositing or native ffmpeg filtergraph)
+# Heavy libraries (MoviePy, Gemini, Edge TTS, Google API client, PIL) are imported
+# by the stage that first needs them, so importing this module stays cheap
+from renderers import RENDERERS, ParallelRenderer, SequentialRenderer, ffmpeg_binary, planned_duration, variant_path
+from encoder_profiles import (
+    OUTPUT_VARIANTS, RENDER_VARIANTS, encoder_settings, resolve_profile, resolve_variants, describe
 )
+from draft import DraftRejected, render_draft, validate_draft
 
 # --- CONFIGURATION ---
-# IMPORTANT: Set your API Keys here or in environment variables
-# Note: IMAGEMAGICK_BINARY configuration is handled differently in MoviePy 2.0+
-# and is usually auto-detected or set via environment variables.
-PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not PEXELS_API_KEY or not GEMINI_API_KEY:
-    raise ValueError("Missing API Keys in .env file")
+# IMPORTANT: Set your API Keys (PEXELS_API_KEY, GEMINI_API_KEY) in .env or the environment.
+# They are read when used and checked by validate_config() before a run starts.
+GEMINI_MODEL = "gemini-flash-latest"
+
+# Service endpoints (overridable, e.g. to point the benchmark at local fakes)
+PEXELS_API_URL = os.getenv("PEXELS_API_URL", "https://api.pexels.com/videos/search")
+
+# Don't reuse a topic published within this many days
+TOPIC_DEDUP_DAYS = int(os.getenv("TOPIC_DEDUP_DAYS", "3"))
+
+# Number of parallel Pexels downloads (one worker per scene is usually plenty)
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+HTTP_TIMEOUT = 30  # seconds
+
+# Persistent caches live outside the per-run scratch dir (assets/)
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+FOOTAGE_CACHE_MAX_MB = int(os.getenv("FOOTAGE_CACHE_MAX_MB", "2048"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "256"))
+SUBTITLE_CACHE_MAX_MB = int(os.getenv("SUBTITLE_CACHE_MAX_MB", "64"))
+NORMALIZED_CACHE_MAX_MB = int(os.getenv("NORMALIZED_CACHE_MAX_MB", "4096"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "16"))
+
+# Ask for script and metadata in one Gemini call (metadata stage then needs no request)
+LLM_COMBINED = os.getenv("LLM_COMBINED", "1") == "1"
+
+# Transcode footage once to 1080x1920@24fps before editing (cached by source hash)
+NORMALIZE_CLIPS = os.getenv("NORMALIZE_CLIPS", "1") == "1"
+
+# Subtitle engine: "image" (cached word rasters composited by MoviePy)
+# or "ass" (one ASS track burned in by the encoder)
+SUBTITLE_MODE = os.getenv("SUBTITLE_MODE", "image")
+
+# Render backend: "moviepy" or "ffmpeg" (can also be chosen per create_video call)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "moviepy")
+# Render scenes as separate segments in a process pool, joined by stream copy
+RENDER_PARALLEL = os.getenv("RENDER_PARALLEL", "0") == "1"
+# Render and flush one scene at a time (bounded memory; takes precedence over RENDER_PARALLEL)
+RENDER_LOW_MEMORY = os.getenv("RENDER_LOW_MEMORY", "0") == "1"
+# Hand renders to render workers through the render queue (see render_worker.py)
+RENDER_REMOTE = os.getenv("RENDER_REMOTE", "0") == "1"
+# Seconds to wait for a render worker before failing the stage
+RENDER_REMOTE_TIMEOUT = int(os.getenv("RENDER_REMOTE_TIMEOUT", "3600"))
+# Render a low-resolution draft and validate it before the full render (see draft.py)
+RENDER_DRAFT = os.getenv("RENDER_DRAFT", "0") == "1"
+# Channel to upload to (credentials in tokens/<channel>.json; empty = token.json)
+YOUTUBE_CHANNEL = os.getenv("YOUTUBE_CHANNEL", "")
+
+SUBTITLE_MODES = ("image", "ass")
+
+
+class ConfigError(ValueError):
+    """Missing or invalid configuration (raised by validate_config before any work starts)."""
+
+
+def validate_config(upload=True, render_backend=RENDER_BACKEND, subtitle_mode=SUBTITLE_MODE):
+    """Checks API keys, render settings, ffmpeg and (when uploading) YouTube credentials.
+
+    Raises ConfigError listing every problem found.
+    """
+    problems = []
+    for name in ("PEXELS_API_KEY", "GEMINI_API_KEY"):
+        if not os.getenv(name):
+            problems.append(f"{name} is not set (add it to .env)")
+    if render_backend not in RENDERERS:
+        problems.append(f"Unknown render backend '{render_backend}' (choose from: {', '.join(RENDERERS)})")
+    if subtitle_mode not in SUBTITLE_MODES:
+        problems.append(f"Unknown subtitle mode '{subtitle_mode}' (choose from: {', '.join(SUBTITLE_MODES)})")
+    try:
+        encoder_settings()
+    except ValueError as e:
+        problems.append(str(e))
+    for name in RENDER_VARIANTS:
+        if name not in OUTPUT_VARIANTS:
+            problems.append(f"Unknown output variant '{name}' (choose from: {', '.join(OUTPUT_VARIANTS)})")
+    try:
+        binary = ffmpeg_binary()
+        if not (os.path.exists(binary) or shutil.which(binary)):
+            problems.append(f"ffmpeg not found at '{binary}'")
+    except Exception as e:
+        problems.append(f"ffmpeg not found: {e}")
+    token_file = os.path.join("tokens", f"{YOUTUBE_CHANNEL}.json") if YOUTUBE_CHANNEL else "token.json"
+    if upload and not os.path.exists(token_file) and not os.path.exists("client_secrets.json"):
+        problems.append(f"YouTube credentials missing (need {token_file} or client_secrets.json)")
+    if problems:
+        raise ConfigError("Invalid configuration:\n  - " + "\n  - ".join(problems))
 
 
 class YouTubeShortsBot:
-    def __init__(self):
-        # Configure Gemini
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-flash-latest')
-
+    def __init__(self, download_workers=DOWNLOAD_WORKERS, subtitle_mode=SUBTITLE_MODE,
+                 render_backend=RENDER_BACKEND, render_parallel=RENDER_PARALLEL,
+                 normalize_clips=NORMALIZE_CLIPS, low_memory=RENDER_LOW_MEMORY, remote_render=RENDER_REMOTE,
+                 encoder=None, draft=RENDER_DRAFT, variants=None, channel=YOUTUBE_CHANNEL):
+        # No side effects here: the Gemini client, caches and job store are created on
+        # first use (see shared()), and prepare() sets up the working directories
         self.assets_dir = "assets"
         self.output_dir = "output"
+
+        # Pooled HTTP session shared by all download workers
+        self.download_workers = max(1, download_workers)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.download_workers,
+            pool_maxsize=self.download_workers
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.subtitle_mode = subtitle_mode
+        self.normalize_clips = normalize_clips
+        self.render_backend = render_backend
+        self.render_parallel = render_parallel
+        self.low_memory = low_memory
+        self.remote_render = remote_render
+        # Encoder settings (encoder_profiles.encoder_settings(); None = ENCODER_PROFILE and ENCODE_* env)
+        self.encoder = encoder
+        # Extra output variants rendered alongside the main video (names from OUTPUT_VARIANTS)
+        self.variants = list(RENDER_VARIANTS if variants is None else variants)
+        # Draft before the full render; draft_validator(script_data, draft) returns a list of
+        # problems, and any problem stops the job before the full render starts
+        self.draft = draft
+        self.draft_validator = validate_draft
+        # Uploads go through youtube_uploader's bounded upload queue, to this channel
+        self.channel = channel or None
+
+        # Structured per-stage metrics (run_pipeline installs a per-job instance)
+        self.metrics = PipelineMetrics()
+        # Optional bandwidth cap for downloads: an object with consume(n_bytes), e.g. prefetch.RateLimiter
+        self.download_limiter = None
+
+        # Lazily created resources, shared with the per-job copies made by for_job()
+        self._shared = {}
+        self._shared_lock = threading.RLock()
+
+    def shared(self, name, factory):
+        """Returns the shared resource `name`, creating it with factory() on first use."""
+        with self._shared_lock:
+            if name not in self._shared:
+                self._shared[name] = factory()
+            return self._shared[name]
+
+    @property
+    def model(self):
+        """Gemini model (google.generativeai is only imported when a prompt is first sent)."""
+        def create():
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            return genai.GenerativeModel(GEMINI_MODEL)
+        return self.shared("model", create)
+
+    @model.setter
+    def model(self, model):
+        with self._shared_lock:
+            self._shared["model"] = model
+
+    @property
+    def llm(self):
+        """All Gemini calls go through one client (response cache, concurrency limit, parse retries)."""
+        return self.shared("llm", lambda: LLMClient(self.model, cache=ResponseCache(
+            os.path.join(CACHE_DIR, "llm"),
+            max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024
+        )))
+
+    @property
+    def footage_cache(self):
+        """Reusable stock footage (survives cleanup_assets())."""
+        return self.shared("footage_cache", lambda: FootageCache(
+            os.path.join(CACHE_DIR, "footage"),
+            max_bytes=FOOTAGE_CACHE_MAX_MB * 1024 * 1024
+        ))
+
+    @property
+    def audio_cache(self):
+        return self.shared("audio_cache", lambda: AudioCache(
+            os.path.join(CACHE_DIR, "tts"),
+            max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024
+        ))
+
+    @property
+    def trend_fetcher(self):
+        """Trend feeds are fetched concurrently and revalidated with ETag/If-Modified-Since."""
+        return self.shared("trend_fetcher", lambda: TrendFetcher(
+            os.path.join(CACHE_DIR, "trends"), session=self.session
+        ))
+
+    @property
+    def subtitle_renderer(self):
+        """Rendered subtitle words are reused across scenes and runs."""
+        return self.shared("subtitle_renderer", lambda: SubtitleRenderer(cache=DiskCache(
+            os.path.join(CACHE_DIR, "subtitles"),
+            max_bytes=SUBTITLE_CACHE_MAX_MB * 1024 * 1024
+        )))
+
+    @property
+    def normalizer(self):
+        return self.shared("normalizer", lambda: ClipNormalizer(DiskCache(
+            os.path.join(CACHE_DIR, "normalized"),
+            max_bytes=NORMALIZED_CACHE_MAX_MB * 1024 * 1024
+        )))
+
+    @property
+    def job_store(self):
+        """Job history (topics used, stage durations) shared by all pipelines."""
+        return self.shared("job_store", JobStore)
+
+    @property
+    def render_queue(self):
+        """Queue shared with the render workers (only used with remote_render)."""
+        return self.shared("render_queue", RenderQueue)
+
+    def prepare(self):
+        """Once per process, before the first job: creates the working dirs,
+        imports legacy daily stats and removes old scratch files."""
         os.makedirs(self.assets_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        # Cleanup old assets
+        self.job_store.import_daily_stats()
         self.cleanup_assets()
+        return self
+
+    def for_job(self, job_id):
+        """Returns a bot for one job: own scratch dir, shared session, model and caches."""
+        job_bot = copy.copy(self)
+        job_bot.assets_dir = os.path.join(self.assets_dir, job_id)
+        os.makedirs(job_bot.assets_dir, exist_ok=True)
+        os.makedirs(job_bot.output_dir, exist_ok=True)
+        return job_bot
+
+    def remove_job_assets(self):
+        """Deletes a job's scratch dir (see for_job)."""
+        shutil.rmtree(self.assets_dir, ignore_errors=True)
 
     def cleanup_assets(self):
-        """Removes all files from the assets directory."""
+        """Removes all per-run scratch files from the assets directory (the footage cache is kept)."""
         print("🧹 Cleaning up old assets...")
         for filename in os.listdir(self.assets_dir):
             file_path = os.path.join(self.assets_dir, filename)
@@ -55,57 +280,55 @@ class YouTubeShortsBot:
             except Exception as e:
                 print(f"Failed to delete {file_path}. Reason: {e}")
 
-    def get_trending_topic(self, region='US'):
-        """Fetches trending topics (Daily/Ent/Sports), filters used ones, and selects via Gemini."""
-        print("🔍 Searching for fresh trends (Daily + Ent + Sports)...")
+    def fresh_trends(self, regions=None, exclude=None):
+        """Fetches trending topics (Daily/Ent/Sports for each region) and drops used ones.
+
+        regions is a list of geos or a single geo such as 'US'.
+        Returns (fresh_items in random order, used_topics).
+        """
+        if isinstance(regions, str):
+            regions = [regions]
+        # 1. Load History (Topics used in the last TOPIC_DEDUP_DAYS days)
+        used_topics = []
         try:
-            # 1. Load History (Topics used today)
-            used_topics = []
-            if os.path.exists('daily_stats.json'):
-                try:
-                    with open('daily_stats.json', 'r') as f:
-                        stats = json.load(f)
-                        if stats.get("date") == str(datetime.date.today()):
-                            used_topics = stats.get("topics", [])
-                            print(f"  🚫 Excluding used topics: {used_topics}")
-                except:
-                    pass
-
-            # 2. Fetch Multiple RSS Feeds
-            urls = [
-                f"https://trends.google.com/trending/rss?geo={region}",        # Daily Trends
-                f"https://trends.google.com/trending/rss?geo={region}&cat=e", # Entertainment
-                f"https://trends.google.com/trending/rss?geo={region}&cat=s"  # Sports
-            ]
-            
-            all_items = []
-            for url in urls:
-                try:
-                    response = requests.get(url)
-                    if response.status_code == 200:
-                        root = ET.fromstring(response.content)
-                        items = root.findall('.//item')
-                        for item in items:
-                            title = item.find('title').text
-                            # Basic cleanup
-                            if title:
-                                all_items.append(title.strip())
-                except Exception as e:
-                    print(f"  ⚠️ Failed to fetch {url}: {e}")
-
-            if not all_items:
-                raise Exception("No items found in any RSS feed")
-
-            # 3. Filter & Randomize
-            # Remove duplicates and used topics
-            unique_items = list(set(all_items))
-            fresh_items = [item for item in unique_items if item not in used_topics]
-            
-            if not fresh_items:
-                print("  ⚠️ All trends used! Falling back to full list.")
-                fresh_items = unique_items
+            used_topics = self.job_store.used_topics(days=TOPIC_DEDUP_DAYS)
+            if used_topics:
+                print(f"  🚫 Excluding used topics: {used_topics}")
+        except Exception as e:
+            print(f"  ⚠️ Job history unavailable: {e}")
+
+        # Topics claimed by jobs still in flight
+        if exclude:
+            used_topics = used_topics + [t for t in exclude if t not in used_topics]
+
+        # 2. Fetch all feeds (Daily/Ent/Sports per region) concurrently, deduplicated by normalized key
+        all_items = self.trend_fetcher.fetch(regions, metrics=self.metrics)
+
+        if not all_items:
+            raise Exception("No items found in any RSS feed")
 
-            random.shuffle(fresh_items)
+        # 3. Filter & Randomize
+        used_keys = {normalize_topic(t) for t in used_topics}
+        fresh_items = [item for item in all_items if normalize_topic(item) not in used_keys]
+        
+        if not fresh_items:
+            print("  ⚠️ All trends used! Falling back to full list.")
+            fresh_items = list(all_items)
+
+        random.shuffle(fresh_items)
+        return fresh_items, used_topics
+
+    def get_trending_topic(self, regions=None, exclude=None, region=None):
+        """Fetches trending topics (Daily/Ent/Sports for each region), filters used ones, and selects via Gemini.
+
+        regions may be a single geo ('US'); region= is the deprecated name for it.
+        """
+        if region is not None:
+            warnings.warn("get_trending_topic(region=...) is deprecated, use regions=", DeprecationWarning, stacklevel=2)
+            regions = regions or region
+        print("🔍 Searching for fresh trends (Daily + Ent + Sports)...")
+        try:
+            fresh_items, used_topics = self.fresh_trends(regions, exclude)
             trends_list = ", ".join(fresh_items[:25]) # Top 25 random fresh items
             
             print(f"  📊 Analyzing batch: {trends_list[:100]}...")
@@ -120,8 +343,8 @@ class YouTubeShortsBot:
                 "Return ONLY the name of the person or topic."
             )
             
-            response = self.model.generate_content(prompt)
-            topic = response.text.strip()
+            # Selection must reflect the current trends, so it is never served from cache
+            topic = self.llm.generate(prompt, use_cache=False, metrics=self.metrics).strip()
             
             # Cleanup
             if '"' in topic: topic = topic.replace('"', '')
@@ -134,11 +357,49 @@ class YouTubeShortsBot:
             print(f"⚠️ Trend search failed: {e}. Using fallback.")
             return "Dwayne Johnson"
 
-    def generate_script(self, topic):
-        """Generates a structured JSON script with visual cues using Gemini."""
-        print(f"📝 Writing script for: {topic}...")
-        
+    def select_trending_topics(self, count, regions=None, exclude=None):
+        """Picks `count` distinct topics from a single trend fetch (one Gemini call for all of them)."""
+        print(f"🔍 Selecting {count} fresh trends (Daily + Ent + Sports)...")
+        fresh_items, used_topics = self.fresh_trends(regions, exclude)
+        trends_list = ", ".join(fresh_items[:max(25, 3 * count)])
+
         prompt = (
+            f"From this list of trending topics: [{trends_list}], "
+            f"pick the {count} most famous Hollywood actors, Musicians, or Football players (Soccer/NFL), "
+            "one topic each. Prioritize global megastars. "
+            "If there are not enough famous people, fill up with the most interesting/viral topics from the list. "
+            f"Do NOT pick any of these: {used_topics}. "
+            f"Return a JSON LIST of {count} strings (names of the people or topics)."
+        )
+
+        def validate(data):
+            if not isinstance(data, list) or not all(isinstance(t, str) and t.strip() for t in data):
+                raise ValueError("Topics are not a list of strings")
+            return [t.strip() for t in data]
+
+        picked = []
+        try:
+            picked = self.llm.generate_json(prompt, validate, use_cache=False, metrics=self.metrics)
+        except Exception as e:
+            print(f"⚠️ Topic selection failed: {e}. Using the trend list.")
+
+        # Distinct by normalized key; top up from the trend list if the model returned too few
+        used_keys = {normalize_topic(t) for t in used_topics}
+        topics = []
+        for topic in picked + fresh_items:
+            key = normalize_topic(topic)
+            if key and key not in used_keys:
+                used_keys.add(key)
+                topics.append(topic)
+            if len(topics) == count:
+                break
+
+        print(f"🌟 Trends Selected: {topics}")
+        return topics
+
+    @staticmethod
+    def script_prompt(topic):
+        return (
             f"Create a high-performing, dynamic YouTube Shorts script about '{topic}'. "
             "The script must adhere to a strict structure designed for maximum retention: "
             "1. Scene 1 must be a **Strong Hook** (a shocking statement or immediate question). "
@@ -154,220 +415,390 @@ class YouTubeShortsBot:
             "Total duration under 50 seconds."
         )
 
+    def generate_script(self, topic):
+        """Generates a structured JSON script with visual cues using Gemini."""
+        print(f"📝 Writing script for: {topic}...")
         try:
-            response = self.model.generate_content(prompt)
-            raw_text = response.text.strip()
-            if raw_text.startswith("```json"): raw_text = raw_text[7:]
-            if raw_text.startswith("```"): raw_text = raw_text[3:]
-            if raw_text.endswith("```"): raw_text = raw_text[:-3]
-            
-            script_data = json.loads(raw_text.strip())
-            
-            # Validation
-            if not isinstance(script_data, list):
-                raise ValueError("Script data is not a list")
-            for item in script_data:
-                if not isinstance(item, dict):
-                    raise ValueError("Script items are not dictionaries")
-                if 'text' not in item or 'visual_query' not in item:
-                    raise ValueError("Missing 'text' or 'visual_query' keys")
-
-            print(f"DEBUG: script_data type: {type(script_data)}")
+            script_data = self.llm.generate_json(self.script_prompt(topic), validate_script, metrics=self.metrics)
             print("✅ Script generated (JSON).")
             return script_data
-            
         except Exception as e:
             print(f"❌ Script Generation Error: {e}")
-            # print(f"DEBUG: Raw response: {raw_text}") # raw_text might not be defined if error happens before
+            return None
+
+    def generate_script_package(self, topic):
+        """Generates the script and the YouTube metadata in a single Gemini call.
+
+        Returns {"script": [...], "metadata": {...} or None}; metadata is None if the
+        model's metadata was unusable (generate_metadata then asks for it separately).
+        """
+        if not LLM_COMBINED:
+            script_data = self.generate_script(topic)
+            return {"script": script_data, "metadata": None} if script_data else None
+
+        print(f"📝 Writing script + metadata for: {topic}...")
+        prompt = (
+            f"{self.script_prompt(topic)} "
+            "Also write YouTube Shorts metadata for this script. "
+            "Return ONE JSON object (not a list) with two keys: "
+            "'script' (the JSON LIST of scene objects described above) and "
+            "'metadata' ({'title': 'Catchy Title #Shorts', "
+            "'description': 'Engaging description with keywords...', "
+            "'tags': ['tag1', 'tag2', 'tag3', 'tag4', 'tag5']})."
+        )
+        try:
+            package = self.llm.generate_json(prompt, validate_package, metrics=self.metrics)
+            print("✅ Script and metadata generated (one call).")
+            return package
+        except Exception as e:
+            print(f"❌ Script Generation Error: {e}")
             return None
 
     async def generate_audio_async(self, text, filename="voiceover.mp3"):
         """Converts script to Audio using edge-tts."""
         print("🎙️ Generating Voiceover with Edge TTS...")
         path = os.path.join(self.assets_dir, filename)
-        communicate = edge_tts.Communicate(text, "en-US-ChristopherNeural", rate="+25%")
-        await communicate.save(path)
-        return path
+        result = await tts_engine.synthesize(text, path)
+        return result['path']
 
     def generate_audio(self, text, filename="voiceover.mp3"):
         """Wrapper for async audio generation."""
         return asyncio.run(self.generate_audio_async(text, filename))
 
-    def download_stock_assets(self, script_data):
-        """Downloads stock footage for each scene in the script."""
-        print(f"🎥 Downloading assets for {len(script_data)} scenes...")
-        headers = {'Authorization': PEXELS_API_KEY}
-        
-        updated_script = []
-        
-        for i, scene in enumerate(script_data):
-            query = scene['visual_query']
-            print(f"  🎬 Scene {i+1}: Searching Pexels for '{query}'...")
-            url = f"https://api.pexels.com/videos/search?query={query}&orientation=portrait&per_page=3"
-            
-            try:
-                r = requests.get(url, headers=headers)
-                data = r.json()
-                
-                if not data['videos']:
-                    print(f"  ⚠️ No videos found for '{query}'. Using fallback 'abstract background'.")
-                    # Fallback search
-                    fallback_url = "https://api.pexels.com/videos/search?query=abstract%20background&orientation=portrait&per_page=3"
-                    r = requests.get(fallback_url, headers=headers)
-                    data = r.json()
-                
-                if not data['videos']:
-                     raise Exception("No videos found even after fallback.")
-
-                # Pick a random video from top 3 to vary it up
-                video_info = random.choice(data['videos'])
-                video_files = video_info['video_files']
-                
-                # Sort by quality (width) to get decent quality but not massive 4k if possible, or just pick first
-                # Pexels usually has 'hd' or 'sd'. Let's pick the one closest to 1080 width if possible
-                # Simple logic: pick the first one that is at least 720p
-                video_url = video_files[0]['link']
-                for v in video_files:
-                    if v['width'] >= 720 and v['width'] <= 1080:
-                        video_url = v['link']
-                        break
-                
-                print(f"  ⬇️ Downloading video for Scene {i+1}...")
-                video_data = requests.get(video_url).content
-                filename = f"scene_{i}_{random.randint(1000,9999)}.mp4"
-                path = os.path.join(self.assets_dir, filename)
-                
-                with open(path, 'wb') as handler:
-                    handler.write(video_data)
-                
-                scene['video_path'] = path
-                updated_script.append(scene)
-                
-            except Exception as e:
-                print(f"❌ Scene {i+1} Download Error: {e}")
-                # If download fails, maybe skip scene or use a default placeholder?
-                # For now, let's skip to avoid breaking everything
+    def generate_voiceovers(self, script_data):
+        """Synthesizes every scene's voiceover in one TTS session.
+
+        Sets 'audio_path', 'audio_duration' and 'words' (per-word timings) on each scene.
+        Scenes whose synthesis failed are dropped.
+        """
+        print(f"🎙️ Generating {len(script_data)} voiceovers with Edge TTS (batched)...")
+        items = [
+            (scene['text'], os.path.join(self.assets_dir, f"voice_{i}.mp3"))
+            for i, scene in enumerate(script_data)
+        ]
+        results = tts_engine.synthesize_batch(items, cache=self.audio_cache)
+
+        voiced = []
+        for i, (scene, result) in enumerate(zip(script_data, results)):
+            if isinstance(result, Exception):
+                print(f"❌ Scene {i+1} Voiceover Error: {result}")
                 continue
-                
-        return updated_script
+            self.metrics.incr("tts_cache_hits" if result.get('cached') else "tts_requests")
+            scene['audio_path'] = result['path']
+            scene['audio_duration'] = result['duration']
+            scene['words'] = result['words']
+            voiced.append(scene)
+
+        stats = self.audio_cache.stats()
+        print(f"  📦 TTS cache: {stats['hits']} hits / {stats['misses']} misses")
+        return voiced
+
+    def count_download(self, n):
+        """Records n downloaded bytes (and waits for the download limiter, if any)."""
+        self.metrics.incr("bytes_downloaded", n)
+        if self.download_limiter is not None:
+            self.download_limiter.consume(n)
+
+    def search_pexels(self, query):
+        """Searches Pexels for portrait videos matching the query."""
+        headers = {'Authorization': os.getenv("PEXELS_API_KEY")}
+        params = {'query': query, 'orientation': 'portrait', 'per_page': 3}
+        self.metrics.incr("pexels_requests")
+        r = self.session.get(
+            PEXELS_API_URL,
+            headers=headers, params=params, timeout=HTTP_TIMEOUT
+        )
+        return r.json()
+
+    def fetch_range(self, url, start, end, out=None):
+        """GETs bytes start..end (inclusive); streams them to out, or returns them if out is None."""
+        with self.session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=HTTP_TIMEOUT) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise Exception(f"Range request not honoured (HTTP {r.status_code})")
+            chunks = []
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                self.count_download(len(chunk))
+                if out is None:
+                    chunks.append(chunk)
+                else:
+                    out.write(chunk)
+        return b"".join(chunks) if out is None else None
+
+    def download_footage(self, url, path, seconds):
+        """Downloads footage, fetching only the prefix that plays `seconds` when possible.
+
+        That needs HTTP Range support and an MP4 with its moov box before the media data
+        (faststart). Returns the seconds covered, or None if the whole file was downloaded.
+        """
+        tmp_path = path + ".part"
+        try:
+            with self.session.get(url, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"},
+                                  stream=True, timeout=HTTP_TIMEOUT) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    # Range ignored: this response is the whole file
+                    with open(tmp_path, 'wb') as handler:
+                        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            handler.write(chunk)
+                            self.count_download(len(chunk))
+                    os.replace(tmp_path, path)
+                    return None
+                data = r.content
+                total = int(r.headers["Content-Range"].rsplit("/", 1)[1])
+            self.count_download(len(data))
+
+            end = total
+            moov = next((box for box in top_level_layout(data) if box[0] == "moov"), None)
+            if moov and moov[2] <= total:
+                if moov[2] > len(data):
+                    data += self.fetch_range(url, len(data), moov[2] - 1)
+                prefix = mp4_prefix_size(data[:moov[2]], seconds)
+                if prefix and prefix <= total * (1 - PREFIX_MIN_SAVING):
+                    end = max(prefix, moov[2])
+
+            with open(tmp_path, 'wb') as handler:
+                handler.write(data[:end])
+                if end > len(data):
+                    self.fetch_range(url, len(data), end - 1, out=handler)
+            os.replace(tmp_path, path)
+
+            if end < total:
+                self.metrics.incr("range_downloads")
+                self.metrics.incr("bytes_skipped", total - end)
+                return seconds
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @staticmethod
+    def footage_covers(entry):
+        """Seconds a cached footage entry can play (prefix downloads cover less than the clip)."""
+        meta = entry.get('meta', {}) if entry else {}
+        return meta.get('covers_s') or meta.get('duration') or float("inf")
+
+    def download_scene_asset(self, i, scene):
+        """Plans and downloads stock footage for a single scene. Returns None on failure.
+
+        The voiceover duration is known at this point, so the Pexels rendition is chosen to
+        fit it (see planner.py) and only the needed prefix is fetched where the server allows.
+        """
+        query = scene['visual_query']
+        needed = needed_duration(scene)
+        print(f"  🎬 Scene {i+1}: Searching Pexels for '{query}' ({needed:.1f}s needed)...")
+
+        try:
+            # Reuse footage already cached for this exact query if it is long enough (no search, no download)
+            cached_keys = [
+                key for key in self.footage_cache.candidates(query)
+                if self.footage_covers(self.footage_cache.peek(key)) >= needed
+            ]
+            if cached_keys:
+                key = random.choice(cached_keys)
+                entry = self.footage_cache.get(key)
+                if entry:
+                    self.metrics.incr("footage_cache_hits")
+                    print(f"  ♻️ Scene {i+1}: Using cached footage for '{query}'.")
+                    scene['video_path'] = entry['path']
+                    scene['footage_covers_s'] = entry['meta'].get('covers_s')
+                    return scene
+
+            data = self.search_pexels(query)
+
+            if not data['videos']:
+                print(f"  ⚠️ No videos found for '{query}'. Using fallback 'abstract background'.")
+                # Fallback search
+                data = self.search_pexels("abstract background")
+
+            if not data['videos']:
+                 raise Exception("No videos found even after fallback.")
+
+            # Best fit for the narration: long enough not to loop, ~1080 wide, >= 24 fps, not 4K/60
+            plan = plan_footage(data['videos'], needed)
+            if not plan:
+                raise Exception("No usable MP4 renditions found.")
+            video_info, video_file = plan
+
+            key = FootageCache.make_key(video_info['id'], f"{video_file['width']}x{video_file['height']}")
+            entry = self.footage_cache.get(key)
+            if entry and self.footage_covers(entry) >= needed:
+                self.metrics.incr("footage_cache_hits")
+                print(f"  ♻️ Scene {i+1}: Footage {key} already cached.")
+                path = entry['path']
+                covers = entry['meta'].get('covers_s')
+            else:
+                self.metrics.incr("footage_cache_misses")
+                print(f"  ⬇️ Downloading video for Scene {i+1} "
+                      f"({video_info.get('duration')}s, {video_file['width']}x{video_file['height']}"
+                      f"@{video_file.get('fps')})...")
+                tmp_path = self.footage_cache.path_for(f"{key}_{random.randint(1000,9999)}", ".mp4")
+                covers = self.download_footage(video_file['link'], tmp_path, needed)
+                path = self.footage_cache.put(key, tmp_path, ext=".mp4", meta={
+                    "video_id": video_info['id'],
+                    "width": video_file['width'],
+                    "height": video_file['height'],
+                    "fps": video_file.get('fps'),
+                    "duration": video_info.get('duration'),
+                    "covers_s": covers
+                })
+            self.footage_cache.remember_query(query, key)
+
+            scene['video_path'] = path
+            scene['footage_covers_s'] = covers
+            return scene
 
-    def create_video(self, script_data, output_filename="final_short.mp4"):
+        except Exception as e:
+            print(f"❌ Scene {i+1} Download Error: {e}")
+            # If download fails, maybe skip scene or use a default placeholder?
+            # For now, let's skip to avoid breaking everything
+            return None
+
+    def download_stock_assets(self, script_data):
+        """Downloads stock footage for each scene in the script (concurrently, in script order)."""
+        print(f"🎥 Downloading assets for {len(script_data)} scenes ({self.download_workers} workers)...")
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            # map() yields results in submission order, so scenes stay in script order
+            results = list(pool.map(self.download_scene_asset, range(len(script_data)), script_data))
+
+        stats = self.footage_cache.stats()
+        print(f"  📦 Footage cache: {stats['hits']} hits / {stats['misses']} misses, "
+              f"{stats['bytes'] / 1024 / 1024:.0f} MB used")
+        return [scene for scene in results if scene is not None]
+
+    def normalize_assets(self, script_data):
+        """Transcodes each scene's footage into the canonical 1080x1920@24fps intermediate (cached)."""
+        print(f"🧪 Normalizing footage for {len(script_data)} scenes...")
+        script_data = self.normalizer.normalize_scenes(script_data)
+        for scene in script_data:
+            if scene.get('normalized'):
+                self.metrics.incr("normalize_cache_hits" if scene.get('normalized_from_cache') else "normalize_transcodes")
+        stats = self.normalizer.cache.stats()
+        print(f"  📦 Normalized cache: {stats['hits']} hits / {stats['misses']} misses")
+        return script_data
+
+    def get_renderer(self, backend=None, parallel=None, low_memory=None, encoder=None):
+        """Returns the render backend instance for the given name (defaults to self.render_backend).
+
+        encoder is a resolved encoder profile (see encoder_profiles.resolve_profile).
+        """
+        backend = backend or self.render_backend
+        parallel = self.render_parallel if parallel is None else parallel
+        low_memory = self.low_memory if low_memory is None else low_memory
+        if backend not in RENDERERS:
+            raise ValueError(f"Unknown render backend '{backend}'. Choose from: {', '.join(RENDERERS)}")
+        if backend == "moviepy":
+            renderer = RENDERERS[backend](self.assets_dir, self.subtitle_renderer, self.subtitle_mode, encoder)
+        else:
+            renderer = RENDERERS[backend](self.assets_dir, encoder)
+
+        if low_memory:
+            return SequentialRenderer(renderer, self.assets_dir)
+        if parallel:
+            return ParallelRenderer(renderer, self.assets_dir)
+        return renderer
+
+    def render_remote(self, script_data, output_path, backend=None, parallel=None, low_memory=None):
+        """Queues the render as a scene manifest and waits for a render worker to publish the result."""
+        manifest = build_manifest(
+            script_data, output_path, backend or self.render_backend, self.subtitle_mode,
+            self.render_parallel if parallel is None else parallel,
+            self.low_memory if low_memory is None else low_memory,
+            # Settings, not a resolved profile: each worker resolves them with its own calibration
+            self.encoder or encoder_settings(), self.variants
+        )
+        job_id = os.path.splitext(os.path.basename(output_path))[0]
+        self.render_queue.enqueue(job_id, manifest)
+        print(f"  📤 Render job {job_id} queued, waiting for a render worker...")
+        result = self.render_queue.wait(job_id, timeout=RENDER_REMOTE_TIMEOUT)
+        self.metrics.incr("remote_renders")
+        print(f"  🎞️ Rendered by {result['worker']} ({result['renderer']}) in {result['render_s']:.1f}s")
+        return result
+
+    def check_draft(self, script_data, output_path):
+        """Renders the proxy draft and contact sheet; raises DraftRejected if the validator finds problems.
+
+        Both go to the job's scratch dir (removed with remove_job_assets).
+        """
+        print("📝 Rendering draft...")
+        draft_path = os.path.join(self.assets_dir, os.path.basename(output_path))
+        draft = render_draft(script_data, draft_path, self.assets_dir, self.subtitle_mode)
+        problems = self.draft_validator(script_data, draft)
+        self.metrics.observe("draft", render_s=draft['render_s'], duration=draft['duration'], problems=problems)
+        print(f"  📝 Draft: {draft['preview_path']}, contact sheet: {draft['sheet_path']} ({draft['render_s']:.1f}s)")
+        if problems:
+            self.metrics.incr("drafts_rejected")
+            raise DraftRejected("Draft rejected:\n  - " + "\n  - ".join(problems))
+        return draft
+
+    def create_video(self, script_data, output_filename="final_short.mp4", backend=None, parallel=None,
+                     low_memory=None):
         """Edits the video: syncs audio, adds subtitles, stitches scenes."""
         print("🎬 Editing Video (Multi-Scene)...")
         
-        final_clips = []
-        
         try:
-            for i, scene in enumerate(script_data):
-                print(f"  ✂️ Processing Scene {i+1}...")
-                
-                # Add delay to avoid Edge TTS 429 Rate Limit
-                if i > 0:
-                    sleep(2)
-
-                # 1. Generate Audio for this scene
-                audio_path = self.generate_audio(scene['text'], filename=f"voice_{i}.mp3")
-                audio_clip = AudioFileClip(audio_path)
-                duration = audio_clip.duration
-                
-                # 2. Load Video
-                video_path = scene.get('video_path')
-                if not video_path or not os.path.exists(video_path):
-                    print(f"  ⚠️ Missing video for scene {i+1}, skipping.")
-                    continue
-                    
-                video_clip = VideoFileClip(video_path)
-                
-                # Loop video if it's shorter than audio
-                if video_clip.duration < duration:
-                    video_clip = video_clip.with_effects([vfx.Loop(duration=duration)])
-                
-                # Cut video to exact audio length
-                video_clip = video_clip.subclipped(0, duration)
-                video_clip = video_clip.with_audio(audio_clip)
-
-                # Resize to Vertical (1080x1920)
-                # STRICT RESIZING: Ensure every clip is exactly 1080x1920
-                w, h = video_clip.size
-                target_ratio = 9/16
-                current_ratio = w/h
-
-                if current_ratio > target_ratio:
-                    # Too wide, crop width
-                    new_width = h * target_ratio
-                    video_clip = video_clip.cropped(x1=w/2 - new_width/2, width=new_width, height=h)
-                elif current_ratio < target_ratio:
-                    # Too tall (unlikely for portrait, but possible), crop height
-                    new_height = w / target_ratio
-                    video_clip = video_clip.cropped(y1=h/2 - new_height/2, width=w, height=new_height)
-                
-                # Force resize to 1080x1920 to match standard
-                video_clip = video_clip.resized(height=1920)
-                if video_clip.w != 1080:
-                     video_clip = video_clip.resized(width=1080)
-
-
-                # 3. Generate Subtitles (Simple word overlay)
-                words = scene['text'].split()
-                # Chunk size can be smaller for better sync in short scenes
-                chunk_size = 1 
-                text_clips = []
-                
-                if words:
-                    chunk_duration = duration / len(words)
-                    
-                    for j, word in enumerate(words):
-                        start_time = j * chunk_duration
-                        # Ensure we don't go past duration
-                        if start_time >= duration: break
-                        
-                        txt_clip = TextClip(
-                            text=word.upper(), 
-                            font_size=90, 
-                            color='white', 
-                            font='/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 
-                            stroke_color='black', 
-                            stroke_width=4,
-                            size=(1080, None), # Use fixed width
-                            method='caption'
-                        )
-                        txt_clip = txt_clip.with_position(('center', 'center')).with_duration(chunk_duration).with_start(start_time)
-                        text_clips.append(txt_clip)
-
-                # Compose scene with fixed size
-                scene_clip = CompositeVideoClip([video_clip] + text_clips, size=(1080, 1920))
-                
-                # Add Transition (Fade In)
-                # Apply fade in to all scenes for smooth entry
-                scene_clip = scene_clip.with_effects([vfx.FadeIn(duration=0.2)])
-                
-                final_clips.append(scene_clip)
-
-            if not final_clips:
-                raise Exception("No clips were generated.")
-
-            print("Creating Final Composite...")
-            # Use compose method to fix glitches
-            final_video = concatenate_videoclips(final_clips, method="compose")
-            
-            # Enforce 58s Max Duration (Shorts Limit)
-            if final_video.duration > 58:
-                print(f"⚠️ Video duration {final_video.duration}s exceeds 58s. Trimming.")
-                final_video = final_video.subclipped(0, 58)
+            # 1. Voiceovers for all scenes up front (one TTS session, rate limited)
+            if any(not scene.get('audio_path') for scene in script_data):
+                script_data = self.generate_voiceovers(script_data)
 
+            # 2. Editor only consumes normalized clips
+            if self.normalize_clips:
+                script_data = self.normalize_assets(script_data)
+
+            # 3. Cheap proxy render first, so a bad job stops here
             output_path = os.path.join(self.output_dir, output_filename)
-            final_video.write_videofile(output_path, codec='libx264', audio_codec='aac', fps=24)
+            if self.draft:
+                self.check_draft(script_data, output_path)
+
+            # 4. Render with the selected backend (here, or on a render worker)
+            if self.remote_render:
+                result = self.render_remote(script_data, output_path, backend, parallel, low_memory)
+                renderer_name, scene_stats = result['renderer'], result['scene_stats']
+                encoder, render_s = result['encoder'], result['render_s']
+                variant_paths = result.get('variants', {})
+            else:
+                duration = planned_duration(script_data)
+                encoder = resolve_profile(self.encoder or encoder_settings(), duration)
+                # All variants are encoded from the same decode/composite pass as the main video
+                variants = resolve_variants(self.variants, encoder, duration)
+                renderer = self.get_renderer(backend, parallel, low_memory, encoder)
+                print(f"  🎞️ Render backend: {renderer.name}, encoder: {describe(encoder)}")
+                started = time.perf_counter()
+                renderer.render(script_data, output_path, variants)
+                render_s = time.perf_counter() - started
+                renderer_name, scene_stats = renderer.name, getattr(renderer, "scene_stats", [])
+                variant_paths = {variant['name']: variant_path(output_path, variant) for variant in variants}
+            for stats in scene_stats:
+                self.metrics.observe("scene", renderer=renderer_name, **stats)
+            # Actual vs estimated encode time and size, to check the calibration
+            self.metrics.observe("encode", renderer=renderer_name, render_s=round(render_s, 3),
+                                 output_mb=round(os.path.getsize(output_path) / 1024 / 1024, 2),
+                                 variants=list(variant_paths), **encoder)
+            self.metrics.incr("output_bytes", os.path.getsize(output_path))
+            for name, path in variant_paths.items():
+                self.metrics.observe("variant", name=name, path=path, output_mb=round(os.path.getsize(path) / 1024 / 1024, 2))
+                self.metrics.incr("output_bytes", os.path.getsize(path))
+                print(f"  🔀 Variant {name}: {path}")
             print(f"✅ Video created: {output_path}")
             return output_path
 
+        except DraftRejected as e:
+            # Re-rendering the same draft gives the same verdict: fail the job instead of retrying
+            print(f"❌ {e}")
+            raise
         except Exception as e:
             print(f"❌ Editing Error: {e}")
             import traceback
             traceback.print_exc()
             return None
 
-    def generate_metadata(self, topic, script_data):
-        """Generates optimized YouTube metadata using Gemini."""
+    def generate_metadata(self, topic, script_data, metadata=None):
+        """Generates optimized YouTube metadata using Gemini (metadata from the script call is reused)."""
+        if metadata:
+            print("✅ Metadata already generated with the script.")
+            return metadata
+
         print(f"📝 Generating metadata for: {topic}...")
         
         # Create a summary of the script for context
@@ -385,15 +816,7 @@ class YouTubeShortsBot:
         )
 
         try:
-            response = self.model.generate_content(prompt)
-            raw_text = response.text.strip()
-            if raw_text.startswith("```json"): raw_text = raw_text[7:]
-            if raw_text.startswith("```"): raw_text = raw_text[3:]
-            if raw_text.endswith("```"): raw_text = raw_text[:-3]
-            
-            metadata = json.loads(raw_text.strip())
-            print(f"DEBUG: metadata type: {type(metadata)}")
-            print(f"DEBUG: metadata content: {metadata}")
+            metadata = self.llm.generate_json(prompt, validate_metadata, metrics=self.metrics)
             print("✅ Metadata generated.")
             return metadata
         except Exception as e:
@@ -406,35 +829,164 @@ class YouTubeShortsBot:
             }
 
 # --- EXECUTION BLOCK ---
-from youtube_uploader import upload_video
+from checkpoints import JobCheckpoints, scene_files
+
+
+def upload_video(file_path, title, description, tags, category_id="22", channel=None):
+    """youtube_uploader.upload_video, imported on the first upload (Google API client is slow to import)."""
+    from youtube_uploader import upload_video as upload
+    return upload(file_path, title, description, tags, category_id, channel)
+
+# Stage name -> worker pool it runs on (see scheduler.py)
+PIPELINE_STAGES = {
+    "topic": "llm",
+    "script": "llm",
+    "audio": "tts",
+    "assets": "download",
+    "render": "render",
+    "metadata": "llm",
+    "upload": "upload",
+}
+
+
+def new_job_id():
+    return datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def run_pipeline(bot, job_id, resume=False, run_stage=None, exclude_topics=None, topic=None, upload=True):
+    """Runs (or resumes) the full pipeline for one job, checkpointing every stage.
+
+    run_stage(stage, pool, fn, *args) lets the caller decide where each stage runs
+    (the scheduler uses per-stage worker pools); by default stages run inline.
+    With resume=True, stages with a valid checkpoint are skipped.
+    A preset topic skips trend selection; upload=False stops after metadata (video_id is None).
+    The video's metadata is written next to it (output/short_<job_id>.json).
+    Every stage emits a structured metrics record (see metrics.py).
+    Returns {"job_id", "topic", "video_path", "metadata", "video_id", "metrics"}.
+    """
+    checkpoints = JobCheckpoints(job_id)
+    run_stage = run_stage or (lambda stage, pool, fn, *args: fn(*args))
+    metrics = bot.metrics = PipelineMetrics(job_id, METRICS_FILE)
+    started_at = time.time()
+
+    def step(stage, fn, *args, files=None):
+        if resume:
+            value = checkpoints.load(stage)
+            if value is not None:
+                print(f"⏩ Resuming: '{stage}' already done.")
+                return value
+        with metrics.stage(stage):
+            value = run_stage(stage, PIPELINE_STAGES[stage], fn, *args)
+            if not value:
+                raise Exception(f"Stage '{stage}' failed")
+        checkpoints.save(stage, value, files(value) if files else None)
+        return value
+
+    def upload_stage(video_path, *args):
+        metrics.incr("bytes_uploaded", os.path.getsize(video_path))
+        return upload_video(video_path, *args, channel=bot.channel)
+
+    preset_topic = topic
+
+    try:
+        # 1. Get Trend
+        if preset_topic:
+            topic = step("topic", lambda: preset_topic)
+        else:
+            topic = step("topic", bot.get_trending_topic, None, exclude_topics)
 
-if __name__ == "__main__":
-    bot = YouTubeShortsBot()
-    
-    # 1. Get Trend
-    topic = bot.get_trending_topic()
-    
-    # 2. Generate Script
-    script_data = bot.generate_script(topic)
-    
-    if script_data:
-        # 3. Download Assets
-        script_data = bot.download_stock_assets(script_data)
-        
-        # 4. Create Video
-        video_path = bot.create_video(script_data)
-        
-        # 5. Generate Metadata & Upload
-        if video_path and os.path.exists(video_path):
-            metadata = bot.generate_metadata(topic, script_data)
+        # 2. Generate Script (and metadata, in the same LLM call)
+        package = step("script", bot.generate_script_package, topic)
+        script_data = package['script']
+
+        # 3. Voiceovers first: their durations drive footage selection
+        script_data = step("audio", bot.generate_voiceovers, script_data,
+                           files=lambda v: scene_files(v, 'audio_path'))
+
+        # 4. Plan and download footage that fits each scene's narration
+        script_data = step("assets", bot.download_stock_assets, script_data,
+                           files=lambda v: scene_files(v, 'video_path', 'audio_path'))
+
+        # 5. Create Video
+        video_path = step("render", bot.create_video, script_data, f"short_{job_id}.mp4",
+                          files=lambda v: [v])
+
+        # 6. Generate Metadata & Upload
+        metadata = step("metadata", bot.generate_metadata, topic, script_data, package['metadata'])
+        write_sidecar(video_path, job_id, topic, metadata)
+        video_id = None
+        if upload:
             print("🚀 Starting Upload...")
-            upload_video(
-                video_path, 
-                metadata['title'], 
-                metadata['description'], 
-                metadata['tags']
-            )
-        else:
-            print("❌ Video creation failed, skipping upload.")
-    else:
-        print("❌ Script generation failed.")
+            video_id = step("upload", upload_stage, video_path,
+                            metadata['title'], metadata['description'], metadata['tags'])
+            write_sidecar(video_path, job_id, topic, metadata, video_id)
+    except Exception:
+        record = metrics.finish("error")
+        record_job(bot, job_id, "error", started_at, record, checkpoints.load("topic"))
+        raise
+
+    record = metrics.finish("ok", topic=topic, video_id=video_id)
+    record_job(bot, job_id, "ok", started_at, record, topic, video_id)
+    return {
+        "job_id": job_id,
+        "topic": topic,
+        "video_path": video_path,
+        "metadata": metadata,
+        "video_id": video_id,
+        "metrics": record
+    }
+
+
+def write_sidecar(video_path, job_id, topic, metadata, video_id=None):
+    """Writes the video's topic and YouTube metadata next to it (short_<job_id>.json)."""
+    sidecar = {"job_id": job_id, "topic": topic, "video_id": video_id, **metadata}
+    path = os.path.splitext(video_path)[0] + ".json"
+    with open(path + ".tmp", 'w') as f:
+        json.dump(sidecar, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def record_job(bot, job_id, status, started_at, metrics_record, topic=None, video_id=None):
+    """Appends the job to the shared job history (never fails the pipeline)."""
+    try:
+        durations = {stage: m["duration_s"] for stage, m in metrics_record["stages"].items()}
+        bot.job_store.record_job(
+            job_id, status, topic=topic, started_at=started_at,
+            video_id=video_id, stage_durations=durations
+        )
+    except Exception as e:
+        print(f"⚠️ Could not record job {job_id}: {e}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate and upload one YouTube Short")
+    parser.add_argument("--job-id", help="Job id (checkpoints are stored under jobs/<job-id>/)")
+    parser.add_argument("--resume", action="store_true", help="Skip stages with a valid checkpoint")
+    args = parser.parse_args()
+
+    if args.resume and not args.job_id:
+        parser.error("--resume needs --job-id")
+
+    try:
+        validate_config()
+    except ConfigError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+
+    job_id = args.job_id or new_job_id()
+    print(f"🆔 Job: {job_id}")
+    bot = YouTubeShortsBot().prepare()
+    job_bot = bot.for_job(job_id)
+
+    try:
+        result = run_pipeline(job_bot, job_id, resume=args.resume)
+        job_bot.remove_job_assets()
+        print(f"✅ Done: {result['video_id']}")
+        print(json.dumps(result['metrics'], indent=2))
+    except Exception as e:
+        print(f"❌ {e}")
+        print(f"↩️ Resume with: python3 shorts_generator.py --job-id {job_id} --resume")
+        raise SystemExit(1)
@@ -0,0 +1,156 @@
+import os
+import hashlib
+import threading
+
+# PIL and numpy are imported on first use, so importing the pipeline stays fast
+
+# "Shorts-style" big, bold subtitles
+SUBTITLE_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'
+FONT_SIZE = 90
+STROKE_WIDTH = 4
+TEXT_COLOR = (255, 255, 255, 255)
+STROKE_COLOR = (0, 0, 0, 255)
+MAX_WIDTH = 1080
+PADDING = 10
+
+
+def word_timings(scene, duration):
+    """Returns [(word, start, end)] for a scene, in seconds from the scene start.
+
+    Uses the TTS word boundaries when the scene has them; otherwise splits the
+    duration evenly across the words of the text. Each word stays on screen
+    until the next one starts so there is no flicker between words.
+    """
+    words = scene.get('words')
+    if words:
+        timings = []
+        for j, w in enumerate(words):
+            if w['start'] >= duration:
+                break
+            end = words[j + 1]['start'] if j + 1 < len(words) else duration
+            timings.append((w['word'], w['start'], min(end, duration)))
+        return timings
+
+    text_words = scene['text'].split()
+    if not text_words:
+        return []
+    chunk_duration = duration / len(text_words)
+    return [(word, j * chunk_duration, (j + 1) * chunk_duration) for j, word in enumerate(text_words)]
+
+
+class SubtitleRenderer:
+    """Rasterizes subtitle words once and reuses them across scenes (memory) and runs (disk cache)."""
+
+    def __init__(self, cache=None, font=SUBTITLE_FONT, font_size=FONT_SIZE, stroke_width=STROKE_WIDTH):
+        self.cache = cache
+        self.font = font
+        self.font_size = font_size
+        self.stroke_width = stroke_width
+        self.images = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def key(self, word):
+        payload = f"{word}|{self.font}|{self.font_size}|{self.stroke_width}|{TEXT_COLOR}|{STROKE_COLOR}"
+        return "sub_" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _rasterize(self, word):
+        """Renders a word as a tightly cropped RGBA image, shrinking the font if it would not fit MAX_WIDTH."""
+        from PIL import Image, ImageDraw, ImageFont
+
+        size = self.font_size
+        while True:
+            font = ImageFont.truetype(self.font, size)
+            left, top, right, bottom = font.getbbox(word, stroke_width=self.stroke_width)
+            if right - left + 2 * PADDING <= MAX_WIDTH or size <= 20:
+                break
+            size -= 5
+
+        img = Image.new("RGBA", (right - left + 2 * PADDING, bottom - top + 2 * PADDING), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.text(
+            (PADDING - left, PADDING - top), word, font=font, fill=TEXT_COLOR,
+            stroke_width=self.stroke_width, stroke_fill=STROKE_COLOR
+        )
+        return img
+
+    def word_image(self, word):
+        """Returns the RGBA numpy array for a subtitle word."""
+        import numpy as np
+        from PIL import Image
+
+        word = word.upper()
+        key = self.key(word)
+        with self.lock:
+            if key in self.images:
+                return self.images[key]
+
+            entry = self.cache.get(key) if self.cache is not None else None
+            if entry:
+                img = Image.open(entry['path']).convert("RGBA")
+            else:
+                img = self._rasterize(word)
+                if self.cache is not None:
+                    tmp_path = self.cache.path_for(key, ".png.tmp")
+                    img.save(tmp_path, format="PNG")
+                    self.cache.put(key, tmp_path, ext=".png")
+
+            self.images[key] = np.array(img)
+            return self.images[key]
+
+
+def _ass_time(seconds):
+    """Formats seconds as an ASS timestamp (H:MM:SS.cc)."""
+    cs = int(round(seconds * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def write_ass(timed_words, path, width=1080, height=1920):
+    """Writes a burn-in ASS subtitle track from [(word, start, end)] on the final video timeline."""
+    from PIL import ImageFont
+
+    scale = height / 1920
+    font_name = ImageFont.truetype(SUBTITLE_FONT, FONT_SIZE).getname()[0]
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{round(FONT_SIZE * scale)},&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+        f"-1,0,0,0,100,100,0,0,1,{max(1, round(STROKE_WIDTH * scale))},0,5,10,10,10,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for word, start, end in timed_words:
+        text = word.upper().replace("{", "(").replace("}", ")")
+        lines.append(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{text}")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def ass_filter(path):
+    """Returns the ffmpeg filter that burns an ASS file in (with the subtitle font's directory)."""
+    def escape(p):
+        return p.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+    return f"ass='{escape(path)}':fontsdir='{escape(os.path.dirname(SUBTITLE_FONT))}'"
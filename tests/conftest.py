@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    """Runs every test in its own directory (pipelines write metrics/, assets/, ... relative to it)."""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,103 @@
+import os
+import multiprocessing
+
+from asset_cache import DiskCache, FootageCache
+
+
+def write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b"x" * size)
+    return str(path)
+
+
+def test_lru_eviction_keeps_the_size_cap(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=250)
+    for key in ("a", "b"):
+        cache.put(key, write(tmp_path / key, 100))
+    assert cache.get("a")  # b is now least recently used
+    cache.put("c", write(tmp_path / "c", 100))
+
+    assert cache.peek("b") is None and not os.path.exists(cache.path_for("b"))
+    assert cache.peek("a") and cache.peek("c")
+    assert cache.stats()["bytes"] == 200
+
+
+def test_missing_file_counts_as_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1000)
+    os.unlink(cache.put("a", write(tmp_path / "a", 10)))
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_caches_sharing_a_directory_merge_their_entries(tmp_path):
+    root = str(tmp_path / "cache")
+    first, second = FootageCache(root, max_bytes=250), FootageCache(root, max_bytes=250)
+    first.put("a", write(tmp_path / "a", 100))
+    first.remember_query("Ocean Waves", "a")
+    second.put("b", write(tmp_path / "b", 100))
+    second.remember_query("city", "b")
+
+    # Neither write lost the other's entry, and either instance sees both
+    assert first.keys() == second.keys() == {"a", "b"}
+    assert first.candidates("ocean waves") == ["a"]
+    assert DiskCache(root, max_bytes=250).stats()["entries"] == 2
+
+    # The cap counts entries added by the other instance
+    second.put("c", write(tmp_path / "c", 100))
+    assert first.keys() == {"b", "c"}
+    assert sorted(os.listdir(root)) == ["b", "c", "index.json", "index.lock"]
+
+
+def put_many(root, worker, count):
+    cache = DiskCache(root, max_bytes=10 ** 9)
+    for i in range(count):
+        path = os.path.join(root, f"src_{worker}_{i}")
+        with open(path, 'wb') as f:
+            f.write(b"x")
+        cache.put(f"{worker}_{i}", path)
+
+
+def test_concurrent_processes_lose_no_entries(tmp_path):
+    root = str(tmp_path / "cache")
+    DiskCache(root, max_bytes=10 ** 9)
+    processes = [multiprocessing.Process(target=put_many, args=(root, worker, 25)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert DiskCache(root, max_bytes=10 ** 9).stats()["entries"] == 100
+
+
+def test_expired_response_is_a_miss_and_deleted(tmp_path):
+    from asset_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "llm"), max_bytes=1000)
+    cache.put("old", write(tmp_path / "old", 10), ext=".txt", meta={"created": 0})
+    cache.put("new", write(tmp_path / "new", 10), ext=".txt", meta={"created": 2 ** 40})
+
+    assert cache.get_fresh("old", ttl=3600) is None
+    assert cache.peek("old") is None and not os.path.exists(cache.path_for("old", ".txt"))
+    assert cache.get_fresh("new", ttl=3600)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_footage_is_not_replaced_by_a_shorter_prefix(tmp_path):
+    cache = FootageCache(str(tmp_path / "footage"), max_bytes=10 ** 6)
+    path = cache.put("pexels_1_1080x1920", write(tmp_path / "a", 500), ".mp4", meta={"covers_s": 8.0})
+
+    # A second job downloaded a shorter prefix of the same rendition meanwhile
+    assert cache.put("pexels_1_1080x1920", write(tmp_path / "b", 300), ".mp4", meta={"covers_s": 5.0}) == path
+    assert os.path.getsize(path) == 500 and not os.path.exists(tmp_path / "b")
+    assert cache.peek("pexels_1_1080x1920")["meta"]["covers_s"] == 8.0
+
+    # The whole file covers more than any prefix
+    cache.put("pexels_1_1080x1920", write(tmp_path / "c", 900), ".mp4", meta={"covers_s": None})
+    assert os.path.getsize(path) == 900
+    assert cache.peek("pexels_1_1080x1920")["meta"]["covers_s"] is None
+
+
+def test_plain_entries_are_replaced(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    cache.put("a", write(tmp_path / "a", 10))
+    cache.put("a", write(tmp_path / "a", 20))
+    assert cache.peek("a")["size"] == 20
@@ -0,0 +1,7 @@
+from batch import read_topics
+
+
+def test_topics_file_skips_blank_lines_and_comments(tmp_path):
+    path = tmp_path / "topics.txt"
+    path.write_text("# tonight\nTaylor Swift\n\n  Black Holes  \n#Zendaya\n")
+    assert read_topics(str(path)) == ["Taylor Swift", "Black Holes"]
@@ -0,0 +1,58 @@
+import os
+import sys
+import argparse
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import shorts_generator
+import trends
+import tts_engine
+import bench_pipeline
+from fakes import FakeServices
+
+
+def bench_args(**overrides):
+    args = dict(scenes=1, resolution="96x160", fps=24, backend="ffmpeg", parallel=False, subtitles="ass",
+                low_memory=False, remote_workers=0, encoder="draft", time_budget=0, size_cap=0, draft=False,
+                variants=[], upload_fail_every=0, runs=1, warm=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    # run_once swaps in the fakes for good; put the real functions back afterwards
+    monkeypatch.setattr(tts_engine, "synthesize", tts_engine.synthesize)
+    monkeypatch.setattr(shorts_generator, "upload_video", shorts_generator.upload_video)
+    services = FakeServices(str(tmp_path / "media"), width=96, height=160, clips=1, clip_duration=5, fps=24).start()
+    monkeypatch.setattr(shorts_generator, "PEXELS_API_URL", f"{services.url}/videos/search")
+    monkeypatch.setattr(trends, "TRENDS_RSS_URL", f"{services.url}/trends/rss")
+    yield services
+    services.stop()
+
+
+def test_pipeline_runs_offline_end_to_end(services, tmp_path):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    report = bench_pipeline.run_once(bench_args(), services, str(workdir))
+
+    assert set(report["stages"]) == {"topic", "script", "audio", "assets", "render", "metadata", "upload"}
+    assert report["video_id"] == "fake1"
+    # Topic picked from the fake trends feed, then script and metadata in one call
+    assert report["llm_calls"] == 2
+    assert report["output_mb"] > 0
+    assert services.uploads
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = {"stages": {"render": {"wall_s": 10.0}, "assets": {"wall_s": 0.2}}}
+    report = {"stages": {"render": {"wall_s": 13.0}, "assets": {"wall_s": 0.6}, "upload": {"wall_s": 1.0}}}
+    assert bench_pipeline.compare(baseline, report, tolerance=0.25) == ["render: 13.00s vs baseline 10.00s"]
+    assert bench_pipeline.compare(baseline, report, tolerance=0.5) == []
+
+
+def test_config_key_separates_configurations():
+    assert bench_pipeline.config_key(bench_args()) != bench_pipeline.config_key(bench_args(parallel=True))
+    assert "encoder=draft" in bench_pipeline.config_key(bench_args())
@@ -0,0 +1,28 @@
+from checkpoints import JobCheckpoints, scene_files
+
+
+def test_saved_stage_is_loaded_back(tmp_path):
+    checkpoints = JobCheckpoints("job-1", root=str(tmp_path))
+    checkpoints.save("script", {"script": [{"text": "hi"}]})
+    assert JobCheckpoints("job-1", root=str(tmp_path)).load("script") == {"script": [{"text": "hi"}]}
+    assert checkpoints.load("render") is None
+    assert checkpoints.completed() == ["script"]
+
+
+def test_checkpoint_is_stale_once_its_files_are_gone(tmp_path):
+    audio = tmp_path / "voice_0.mp3"
+    audio.write_bytes(b"mp3")
+    scenes = [{"text": "hi", "audio_path": str(audio)}, {"text": "no audio"}]
+    checkpoints = JobCheckpoints("job-1", root=str(tmp_path))
+    checkpoints.save("audio", scenes, files=scene_files(scenes, "audio_path"))
+    assert checkpoints.load("audio") == scenes
+
+    audio.unlink()
+    assert checkpoints.load("audio") is None
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    checkpoints = JobCheckpoints("job-1", root=str(tmp_path))
+    with open(checkpoints.path("topic"), 'w') as f:
+        f.write('{"value": ')
+    assert checkpoints.load("topic") is None
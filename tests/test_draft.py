@@ -0,0 +1,68 @@
+import pytest
+
+from draft import validate_draft, scene_starts, DRAFT_MAX_BLACK_SHARE
+
+
+def scenes(tmp_path, durations, text="a calm ocean at sunrise"):
+    """Scenes whose footage and voiceover exist on disk (their content is never read)."""
+    script_data = []
+    for i, duration in enumerate(durations):
+        paths = {}
+        for key in ("video_path", "audio_path"):
+            path = tmp_path / f"{key}_{i}"
+            path.write_bytes(b"x")
+            paths[key] = str(path)
+        script_data.append(dict(paths, text=text, audio_duration=duration))
+    return script_data
+
+
+def draft_for(script_data, black=()):
+    starts = scene_starts(script_data)
+    return {"duration": sum(d for _, d in starts), "black": list(black), "scenes": starts, "subtitle_mode": "image"}
+
+
+def test_good_draft_has_no_problems(tmp_path):
+    script_data = scenes(tmp_path, [6, 6, 6])
+    assert validate_draft(script_data, draft_for(script_data)) == []
+
+
+def test_missing_scene(tmp_path):
+    script_data = scenes(tmp_path, [6, 6, 6])
+    script_data[1]["video_path"] = None
+    problems = validate_draft(script_data, draft_for(script_data[::2]))
+    assert problems == ["1 of 3 scenes have no footage or voiceover"]
+
+
+def test_words_after_the_voiceover(tmp_path):
+    script_data = scenes(tmp_path, [6, 6])
+    script_data[0]["words"] = [{"word": "late", "start": 7.0}, {"word": "ok", "start": 0.5}]
+    problems = validate_draft(script_data, draft_for(script_data))
+    assert any("subtitle words start after the voiceover ends" in p for p in problems)
+
+
+def test_clipped_word(tmp_path):
+    script_data = scenes(tmp_path, [6, 6], text="supercalifragilisticexpialidocious" * 4)
+    problems = validate_draft(script_data, draft_for(script_data))
+    assert any(p.startswith("Subtitles too wide for the frame") for p in problems)
+
+
+@pytest.mark.parametrize("durations, expected", [
+    ([30, 31], "would be trimmed"),
+    ([3, 3], "Video is only 6.0s long"),
+])
+def test_length_limits(tmp_path, durations, expected):
+    script_data = scenes(tmp_path, durations)
+    assert any(expected in p for p in validate_draft(script_data, draft_for(script_data)))
+
+
+def test_preview_length_mismatch(tmp_path):
+    script_data = scenes(tmp_path, [6, 6])
+    draft = dict(draft_for(script_data), duration=9.0)
+    assert validate_draft(script_data, draft) == ["Preview is 9.0s, planned 12.0s"]
+
+
+def test_black_footage(tmp_path):
+    script_data = scenes(tmp_path, [6, 6])
+    black_s = 6 * DRAFT_MAX_BLACK_SHARE + 1
+    problems = validate_draft(script_data, draft_for(script_data, black=[(6.0, 6.0 + black_s)]))
+    assert problems == [f"Scene 2: footage is black for {black_s:.1f}s of 6.0s"]
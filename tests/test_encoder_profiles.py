@@ -0,0 +1,59 @@
+import pytest
+
+from encoder_profiles import select_profile, resolve_profile, resolve_variants, encoder_settings, estimate, AUTO_BASE_CRF
+
+# 4 threads, perfect scaling; faster presets encode faster and compress worse
+CALIBRATION = {
+    "threads": 4, "thread_efficiency": 1.0, "crf": 23,
+    "presets": {
+        "ultrafast": {"encode_fps": 240, "kbps": 8000},
+        "veryfast": {"encode_fps": 120, "kbps": 5000},
+        "fast": {"encode_fps": 60, "kbps": 4000},
+        "medium": {"encode_fps": 40, "kbps": 3500},
+        "slow": {"encode_fps": 20, "kbps": 3000},
+    },
+}
+
+
+def test_without_budgets_uses_the_default_preset_on_all_threads():
+    profile = select_profile(30, calibration=CALIBRATION)
+    assert (profile["preset"], profile["crf"], profile["threads"]) == ("medium", AUTO_BASE_CRF, 4)
+
+
+def test_time_budget_picks_the_slowest_preset_that_fits():
+    # 30s at 24 fps = 720 frames: on 4 threads fast needs 12s, medium 18s, slow 36s
+    profile = select_profile(30, time_budget_s=20, calibration=CALIBRATION)
+    assert (profile["preset"], profile["threads"]) == ("medium", 4)
+    assert profile["estimated_s"] <= 20
+
+
+def test_time_budget_picks_the_fewest_threads_that_fit():
+    # fast needs 12s on 4 threads; veryfast 6s on 4, 8s on 3 and 12s on 2
+    profile = select_profile(30, time_budget_s=10, calibration=CALIBRATION)
+    assert (profile["preset"], profile["threads"]) == ("veryfast", 3)
+    assert estimate(CALIBRATION, "veryfast", AUTO_BASE_CRF, 30, 2)[0] > 10
+
+
+def test_forced_threads_are_kept():
+    assert select_profile(30, time_budget_s=60, threads=2, calibration=CALIBRATION)["threads"] == 2
+
+
+def test_impossible_budget_falls_back_to_the_fastest_preset():
+    profile = select_profile(30, time_budget_s=1, calibration=CALIBRATION)
+    assert (profile["preset"], profile["threads"]) == ("ultrafast", 4)
+
+
+def test_size_cap_raises_crf_and_sets_maxrate():
+    profile = select_profile(30, size_cap_mb=8, calibration=CALIBRATION)
+    assert profile["crf"] > AUTO_BASE_CRF
+    assert profile["estimated_mb"] <= 8 * 0.9
+    assert profile["maxrate_kbps"] < 8 * 1024 * 8 / 30
+
+
+def test_named_profiles_and_variants(tmp_path, monkeypatch):
+    assert resolve_profile(encoder_settings("quality"))["preset"] == "slow"
+    with pytest.raises(ValueError):
+        encoder_settings("nope")
+    variants = resolve_variants(["720p", "cut30"], resolve_profile(encoder_settings("balanced")), 45)
+    assert [(v["name"], v["width"], v["max_duration"]) for v in variants] == [("720p", 720, 58), ("cut30", 1080, 30)]
+    assert variants[0]["encoder"]["preset"] == "veryfast" and variants[0]["encoder"]["maxrate_kbps"] == 1500
@@ -0,0 +1,67 @@
+import json
+import time
+import datetime
+import multiprocessing
+
+from job_store import JobStore, normalize_topic
+
+
+def days_ago(n):
+    return time.time() - n * 86400
+
+
+def test_used_topics_are_recent_successes_deduplicated_by_key(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    store.record_job("a", "ok", topic="Taylor Swift", finished_at=days_ago(0))
+    store.record_job("b", "ok", topic="taylor swift!", finished_at=days_ago(1))
+    store.record_job("c", "error", topic="Zendaya", finished_at=days_ago(0))
+    store.record_job("d", "ok", topic="Lionel Messi", finished_at=days_ago(5))
+
+    assert len(store.used_topics(days=3)) == 1
+    assert normalize_topic(store.used_topics(days=3)[0]) == "taylor swift"
+    assert store.used_topics(days=1) == ["Taylor Swift"]
+    assert store.was_used("TAYLOR  SWIFT", days=1)
+    assert not store.was_used("Zendaya", days=1)
+    assert not store.was_used("Lionel Messi", days=3)
+
+
+def test_daily_report_counts_and_averages_stage_durations(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    store.record_job("a", "ok", topic="Zendaya", stage_durations={"render": 10.0, "upload": 2.0})
+    store.record_job("b", "ok", topic="Keanu Reeves", stage_durations={"render": 20.0})
+    store.record_job("c", "error", stage_durations={"render": 3.0})
+    # A retried job replaces its earlier record
+    store.record_job("c", "ok", topic="Black Holes", stage_durations={"render": 30.0})
+
+    report = store.daily_report()
+    assert (report["count"], report["failed"]) == (3, 0)
+    assert report["topics"] == ["Zendaya", "Keanu Reeves", "Black Holes"]
+    assert report["avg_stage_s"] == {"render": 20.0, "upload": 2.0}
+
+
+def record_many(path, worker, count):
+    store = JobStore(path)
+    for i in range(count):
+        store.record_job(f"{worker}-{i}", "ok", topic=f"topic {worker} {i}")
+
+
+def test_concurrent_processes_lose_no_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    processes = [multiprocessing.Process(target=record_many, args=(path, worker, 25)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert JobStore(path).daily_report()["count"] == 100
+
+
+def test_legacy_daily_stats_are_imported_once(tmp_path):
+    legacy = tmp_path / "daily_stats.json"
+    today = datetime.date.today().isoformat()
+    legacy.write_text(json.dumps({"date": today, "count": 2, "topics": ["Zendaya", "Black Holes"]}))
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    assert store.import_daily_stats(str(legacy)) == 2
+    assert store.import_daily_stats(str(legacy)) == 0
+    assert store.daily_report(today)["topics"] == ["Zendaya", "Black Holes"]
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from asset_cache import ResponseCache
+from llm_client import LLMClient, validate_package
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return FakeResponse(self.responses.pop(0))
+
+
+PACKAGE = {"script": [{"text": "Hi", "visual_query": "sky"}], "metadata": {"title": "T", "description": "", "tags": []}}
+
+
+def client(tmp_path, model, ttl=3600):
+    return LLMClient(model, cache=ResponseCache(str(tmp_path / "llm"), 1024 * 1024), ttl=ttl, parse_retries=1)
+
+
+def test_identical_prompt_is_served_from_the_cache(tmp_path):
+    model = FakeModel("```json\n" + json.dumps(PACKAGE) + "\n```")
+    assert client(tmp_path, model).generate_json("prompt", validate_package) == PACKAGE
+    # A new client (as in the next run) still hits the disk cache
+    assert client(tmp_path, model).generate_json("prompt", validate_package) == PACKAGE
+    assert model.calls == 1
+
+
+def test_expired_response_is_requested_again(tmp_path):
+    model = FakeModel(json.dumps(PACKAGE), json.dumps(PACKAGE))
+    client(tmp_path, model, ttl=-1).generate_json("prompt", validate_package)
+    client(tmp_path, model, ttl=-1).generate_json("prompt", validate_package)
+    assert model.calls == 2
+
+
+def test_invalid_response_is_retried_and_not_cached(tmp_path):
+    model = FakeModel("not json", json.dumps({"script": []}), json.dumps(PACKAGE))
+    with pytest.raises(ValueError, match="still invalid after 2 attempts"):
+        client(tmp_path, model).generate_json("prompt", validate_package)
+    assert client(tmp_path, model).generate_json("prompt", validate_package) == PACKAGE
+    assert model.calls == 3
@@ -0,0 +1,94 @@
+import json
+import threading
+
+import pytest
+
+import metrics as metrics_module
+
+from metrics import PipelineMetrics, MetricsRegistry
+
+
+def test_counters_go_to_the_running_stage(tmp_path):
+    sink = tmp_path / "pipeline.jsonl"
+    metrics = PipelineMetrics("job-1", str(sink))
+    with metrics.stage("assets"):
+        metrics.incr("bytes_downloaded", 100)
+        metrics.incr("bytes_downloaded", 50)
+        metrics.observe("scene", scene=1)
+    metrics.incr("bytes_downloaded", 1)  # outside any stage: dropped
+    record = metrics.finish("ok", topic="Space")
+
+    assert record["stages"]["assets"]["bytes_downloaded"] == 150
+    lines = [json.loads(line) for line in sink.read_text().splitlines()]
+    assert [line["type"] for line in lines] == ["scene", "stage", "job"]
+    assert lines[0]["stage"] == "assets"
+
+
+def test_explicit_stage_is_never_charged_to_the_next_one():
+    metrics = PipelineMetrics("job-1")
+    with metrics.stage("topic"):
+        stage = metrics.current_stage()
+    with metrics.stage("script"):
+        # A background fetch started in "topic" finishes now
+        metrics.incr("rss_requests", stage=stage)
+        metrics.incr("llm_calls")
+    summary = metrics.summary()
+    assert "rss_requests" not in summary["topic"] and "rss_requests" not in summary["script"]
+    assert summary["script"]["llm_calls"] == 1
+
+
+def test_failed_stage_is_recorded_as_error():
+    metrics = PipelineMetrics("job-1")
+    try:
+        with metrics.stage("render"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert metrics.summary()["render"]["status"] == "error"
+
+
+def test_prometheus_text():
+    registry = MetricsRegistry()
+    registry.observe_stage({"stage": "render", "status": "ok", "duration_s": 3.0, "counters": {"output_bytes": 10}})
+    registry.observe_job("ok")
+    text = registry.prometheus_text()
+    assert 'shorts_stage_duration_seconds_bucket{stage="render",le="5"} 1' in text
+    assert 'shorts_stage_duration_seconds_bucket{stage="render",le="2"} 0' in text
+    assert 'shorts_output_bytes_total{stage="render"} 10' in text
+    assert 'shorts_jobs_total{status="ok"} 1' in text
+
+
+def test_concurrent_jobs_export_without_errors(tmp_path, capsys):
+    errors = []
+
+    def job(i):
+        try:
+            metrics = PipelineMetrics(f"job-{i}", str(tmp_path / "pipeline.jsonl"))
+            for _ in range(30):
+                with metrics.stage("render"):
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert "Could not export" not in capsys.readouterr().out
+    assert not [name for name in (tmp_path / "metrics").iterdir() if name.suffix == ".tmp"]
+
+
+def test_export_failure_does_not_fail_or_mask_the_stage(tmp_path, monkeypatch):
+    def write_prometheus(path=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(metrics_module.registry, "write_prometheus", write_prometheus)
+    metrics = PipelineMetrics("job-1", str(tmp_path / "pipeline.jsonl"))
+    with metrics.stage("render"):
+        pass
+    with pytest.raises(ValueError, match="real error"):
+        with metrics.stage("upload"):
+            raise ValueError("real error")
+    assert [r["status"] for r in metrics.records] == ["ok", "error"]
@@ -0,0 +1,47 @@
+import shutil
+import subprocess
+
+from asset_cache import DiskCache
+from normalizer import ClipNormalizer, NORMALIZED_PROFILE
+from renderers import ffmpeg_binary
+
+# Small canonical profile, so the test transcodes quickly
+PROFILE = dict(NORMALIZED_PROFILE, width=72, height=128)
+
+
+def clip(path, size="128x96", rate=30):
+    subprocess.run([
+        ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=size={size}:rate={rate}",
+        "-t", "2", "-c:v", "libx264", "-preset", "ultrafast", path
+    ], check=True)
+    return path
+
+
+def probe(path):
+    result = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", path], capture_output=True, text=True)
+    return result.stderr
+
+
+def test_normalizes_once_per_source_content(tmp_path):
+    normalizer = ClipNormalizer(DiskCache(str(tmp_path / "norm"), 10 ** 9), PROFILE)
+    source = clip(str(tmp_path / "source.mp4"))
+
+    path, cached = normalizer.normalize_with_status(source)
+    assert not cached
+    info = probe(path)
+    assert "72x128" in info and "24 fps" in info
+
+    # Same bytes under another name (re-downloaded footage) hit the cache
+    copy = shutil.copy(source, tmp_path / "copy.mp4")
+    assert normalizer.normalize_with_status(str(copy)) == (path, True)
+
+
+def test_failed_scene_keeps_its_original_footage(tmp_path):
+    normalizer = ClipNormalizer(DiskCache(str(tmp_path / "norm"), 10 ** 9), PROFILE)
+    broken = tmp_path / "broken.mp4"
+    broken.write_bytes(b"not a video")
+    good = clip(str(tmp_path / "good.mp4"))
+
+    scenes = normalizer.normalize_scenes([{"video_path": str(broken)}, {"video_path": good}])
+    assert scenes[0]["video_path"] == str(broken) and not scenes[0].get("normalized")
+    assert scenes[1]["normalized"] and scenes[1]["source_path"] == good
@@ -0,0 +1,46 @@
+import os
+import subprocess
+
+from planner import plan_footage, mp4_prefix_size, top_level_layout, needed_duration, FOOTAGE_MARGIN_S
+from renderers import ffmpeg_binary
+
+
+def video(video_id, duration, *files):
+    return {"id": video_id, "duration": duration,
+            "video_files": [{"width": w, "height": h, "fps": fps, "file_type": "video/mp4"} for w, h, fps in files]}
+
+
+def test_prefers_footage_that_covers_the_voiceover():
+    short = video(1, 4, (1080, 1920, 30))
+    long_enough = video(2, 12, (1080, 1920, 30))
+    picked, _ = plan_footage([short, long_enough], needed_duration({"audio_duration": 8}))
+    assert picked["id"] == 2
+
+
+def test_prefers_the_rendition_closest_to_the_output():
+    clip = video(1, 12, (540, 960, 30), (1080, 1920, 30), (2160, 3840, 60))
+    _, picked = plan_footage([clip], 8)
+    assert (picked["width"], picked["fps"]) == (1080, 30)
+
+
+def test_no_usable_rendition():
+    assert plan_footage([{"id": 1, "duration": 10, "video_files": [{"file_type": "video/webm", "width": 1080}]}], 8) is None
+    assert needed_duration({}) == FOOTAGE_MARGIN_S
+
+
+def test_prefix_covers_only_the_needed_seconds(tmp_path):
+    path = str(tmp_path / "clip.mp4")
+    subprocess.run([
+        ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=128x128:rate=10",
+        "-t", "6", "-c:v", "libx264", "-g", "10", "-movflags", "+faststart", path
+    ], check=True)
+    with open(path, "rb") as f:
+        data = f.read()
+    layout = top_level_layout(data)
+    moov_end = next(end for box_type, _, end in layout if box_type == "moov")
+    assert [box_type for box_type, _, _ in layout].index("moov") < [box_type for box_type, _, _ in layout].index("mdat")
+
+    one, three = mp4_prefix_size(data[:moov_end], 1), mp4_prefix_size(data[:moov_end], 3)
+    assert moov_end < one < three < len(data)
+    # Past the end of the clip the prefix is the whole file
+    assert mp4_prefix_size(data[:moov_end], 60) == os.path.getsize(path)
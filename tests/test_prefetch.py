@@ -0,0 +1,106 @@
+import copy
+import time
+
+from asset_cache import FootageCache, AudioCache
+from prefetch import Prefetcher, RateLimiter
+
+
+class FakeJobStore:
+    def __init__(self):
+        self.used = []
+
+    def used_topics(self, days=1):
+        return list(self.used)
+
+
+class FakeBot:
+    """Just the bot surface the prefetcher uses; each warmed topic adds one clip and one voiceover."""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.footage_cache = FootageCache(str(tmp_path / "footage"), max_bytes=10 * 1024 * 1024)
+        self.audio_cache = AudioCache(str(tmp_path / "tts"), max_bytes=10 * 1024 * 1024)
+        self.job_store = FakeJobStore()
+        self.trends = ["Zendaya", "Keanu Reeves", "Black Holes"]
+        self.download_limiter = None
+
+    def select_trending_topics(self, count, regions=None, exclude=None):
+        return [t for t in self.trends if t not in (exclude or [])][:count]
+
+    def for_job(self, job_id):
+        return copy.copy(self)
+
+    def remove_job_assets(self):
+        pass
+
+    def generate_script_package(self, topic):
+        return {"script": [{"text": f"All about {topic}", "visual_query": topic}]}
+
+    def put(self, cache, key, ext):
+        path = self.tmp_path / f"{key}.tmp"
+        path.write_bytes(b"x" * 1000)
+        return cache.put(key, str(path), ext=ext)
+
+    def generate_voiceovers(self, script_data):
+        return [dict(s, audio_path=self.put(self.audio_cache, AudioCache.make_key(s["text"], "v", "r"), ".mp3"))
+                for s in script_data]
+
+    def download_stock_assets(self, script_data):
+        return [dict(s, video_path=self.put(self.footage_cache, FootageCache.make_key(s["visual_query"], "64x64"), ".mp4"))
+                for s in script_data]
+
+
+def prefetcher(tmp_path, bot, **kwargs):
+    return Prefetcher(bot, path=str(tmp_path / "prefetch.json"), candidates=2, bandwidth_kbps=0, **kwargs)
+
+
+def test_round_warms_the_caches_and_take_hands_out_the_oldest_topic(tmp_path):
+    bot = FakeBot(tmp_path)
+    assert prefetcher(tmp_path, bot).run_round() == ["Zendaya", "Keanu Reeves"]
+    assert len(bot.footage_cache.keys()) == 2 and len(bot.audio_cache.keys()) == 2
+
+    # A restarted scheduler finds the prefetched topics in the index
+    restarted = prefetcher(tmp_path, bot)
+    assert restarted.prefetched_bytes() == 4000
+    assert restarted.run_round() == []
+    assert restarted.take(exclude=["Zendaya"]) == "Keanu Reeves"
+    # Zendaya is in flight elsewhere: dropped from the prefetched set, its cache entries stay
+    assert restarted.take() is None
+    assert len(bot.footage_cache.keys()) == 2
+
+
+def test_topics_used_by_a_job_are_not_handed_out(tmp_path):
+    bot = FakeBot(tmp_path)
+    prefetch = prefetcher(tmp_path, bot)
+    prefetch.run_round()
+    bot.job_store.used = ["zendaya!"]
+    assert prefetch.take() == "Keanu Reeves"
+
+
+def test_no_prefetching_while_a_job_runs(tmp_path):
+    bot = FakeBot(tmp_path)
+    assert prefetcher(tmp_path, bot).run_round(idle=lambda: False) == []
+    assert bot.footage_cache.keys() == set()
+
+
+def test_expired_topics_delete_only_entries_nobody_read(tmp_path):
+    bot = FakeBot(tmp_path)
+    prefetch = prefetcher(tmp_path, bot, ttl=60)
+    prefetch.run_round()
+    zendaya = prefetch.entries["zendaya"]
+    # A job read Zendaya's footage after it was prefetched
+    time.sleep(0.01)
+    bot.footage_cache.get(zendaya["footage_keys"][0])
+
+    assert prefetch.expire(now=time.time() + 120) == 3000
+    assert prefetch.entries == {}
+    assert bot.footage_cache.keys() == set(zendaya["footage_keys"])
+    assert bot.audio_cache.keys() == set()
+
+
+def test_rate_limiter_holds_downloads_to_the_rate():
+    limiter = RateLimiter(bytes_per_s=100_000)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.consume(10_000)
+    assert time.monotonic() - started >= 0.25
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from render_queue import RenderQueue, RemoteRenderQueue, RenderFailed, serve, open_queue
+
+
+def manifest():
+    return {"version": 1, "scenes": [], "output_path": "/tmp/out.mp4", "profile": {"backend": "ffmpeg"}}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return RenderQueue(str(tmp_path / "queue.db"), lease_s=60, max_attempts=2)
+
+
+def test_database_is_not_in_wal_mode(queue):
+    assert queue.connect().execute("PRAGMA journal_mode").fetchone()[0] != "wal"
+
+
+def test_claim_hands_a_job_to_one_worker(queue):
+    queue.enqueue("job-1", manifest())
+    job = queue.claim("a")
+    assert job["job_id"] == "job-1" and job["attempt"] == 1
+    assert queue.claim("b") is None
+    assert queue.complete("job-1", "a", {"video_path": "/tmp/out.mp4"})
+    assert queue.wait("job-1", timeout=1) == {"video_path": "/tmp/out.mp4"}
+
+
+def test_expired_lease_is_requeued_then_failed(queue):
+    queue.enqueue("job-1", manifest())
+    queue.lease_s = -1
+    assert queue.claim("a")["attempt"] == 1
+    # The lease ran out: the next claim takes the job over
+    assert queue.claim("b")["attempt"] == 2
+    assert not queue.renew("job-1", "a")
+    assert not queue.complete("job-1", "a", {})
+    # Out of attempts: the job fails instead of going back to the queue
+    assert queue.claim("c") is None
+    assert queue.get("job-1")["status"] == "failed"
+    with pytest.raises(RenderFailed):
+        queue.wait("job-1", timeout=1)
+
+
+def test_failed_render_is_retried(queue):
+    queue.enqueue("job-1", manifest())
+    queue.claim("a")
+    queue.fail("job-1", "a", "boom")
+    assert queue.get("job-1")["status"] == "queued"
+    queue.claim("b")
+    queue.fail("job-1", "b", "boom")
+    assert queue.get("job-1")["status"] == "failed"
+
+
+def test_remote_queue_over_http(queue):
+    server = serve(queue, "127.0.0.1:0", token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        remote = RemoteRenderQueue(url, token="secret")
+        assert remote.lease_s == 60
+
+        queue.enqueue("job-1", manifest())
+        job = remote.claim("host-b")
+        assert job["job_id"] == "job-1" and job["manifest"] == manifest()
+        assert remote.renew("job-1", "host-b")
+        assert remote.complete("job-1", "host-b", {"video_path": "/tmp/out.mp4"})
+        assert queue.get("job-1")["status"] == "done"
+        assert remote.stats() == {"done": 1}
+
+        with pytest.raises(Exception, match="403"):
+            RemoteRenderQueue(url, token="wrong")
+    finally:
+        server.shutdown()
+
+
+def test_open_queue_uses_the_local_database_for_paths(tmp_path):
+    assert isinstance(open_queue(str(tmp_path / "queue.db")), RenderQueue)
+
+
+def test_queue_is_only_served_beyond_loopback_with_a_token(queue):
+    with pytest.raises(ValueError, match="RENDER_QUEUE_TOKEN"):
+        serve(queue, "0.0.0.0:0", token="")
+    for bind in ("127.0.0.1:0", "localhost:0"):
+        serve(queue, bind, token="").server_close()
+    serve(queue, "0.0.0.0:0", token="secret").server_close()
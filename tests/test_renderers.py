@@ -0,0 +1,183 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fakes import make_clip, make_tone
+import renderers
+from renderers import (
+    FFmpegRenderer, MoviePyRenderer, ParallelRenderer, SequentialRenderer, concat_segments, variant_path, MAX_DURATION
+)
+
+SIZE = (72, 128)
+ENCODER = {"preset": "ultrafast", "crf": 35}
+
+
+def probe(path):
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    infos = ffmpeg_parse_infos(path)
+    return infos["duration"], tuple(infos["video_size"])
+
+
+@pytest.fixture
+def scenes(tmp_path):
+    """Two scenes: 1s of footage each, under 1.5s and 1.0s voiceovers (the first loops its footage)."""
+    clip = make_clip(str(tmp_path / "clip.mp4"), 96, 160, duration=1, fps=24)
+    result = []
+    for i, (text, duration) in enumerate([("hello there", 1.5), ("bye", 1.0)]):
+        audio = str(tmp_path / f"voice_{i}.mp3")
+        subprocess.run(make_tone(audio, duration), check=True)
+        result.append({"text": text, "video_path": clip, "audio_path": audio, "audio_duration": duration})
+    return result
+
+
+def renderer(tmp_path):
+    return FFmpegRenderer(str(tmp_path), encoder=ENCODER, size=SIZE)
+
+
+def test_ffmpeg_command_loops_footage_and_burns_in_subtitles(tmp_path, scenes):
+    cmd = renderer(tmp_path).build_command(scenes, str(tmp_path / "out.mp4"))
+    assert cmd.count('-stream_loop') == 2
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert "concat=n=2:v=1:a=1" in graph and "ass=" in graph
+    assert cmd[cmd.index('-t') + 1] == str(MAX_DURATION)
+    assert os.path.exists(tmp_path / "subtitles.ass")
+
+
+def test_ffmpeg_render_produces_the_narrated_length(tmp_path, scenes):
+    output = renderer(tmp_path).render(scenes, str(tmp_path / "out.mp4"))
+    duration, size = probe(output)
+    assert duration == pytest.approx(2.5, abs=0.15)
+    assert size == SIZE
+
+
+def test_missing_footage_is_skipped_and_nothing_left_fails(tmp_path, scenes):
+    scenes[0]["video_path"] = str(tmp_path / "gone.mp4")
+    output = renderer(tmp_path).render(scenes, str(tmp_path / "out.mp4"))
+    assert probe(output)[0] == pytest.approx(1.0, abs=0.15)
+    with pytest.raises(Exception, match="No clips"):
+        renderer(tmp_path).render(scenes[:1], str(tmp_path / "none.mp4"))
+
+
+def test_parallel_segments_are_joined_in_scene_order(tmp_path, scenes):
+    output = ParallelRenderer(renderer(tmp_path), str(tmp_path), workers=2).render(scenes, str(tmp_path / "out.mp4"))
+    assert probe(output)[0] == pytest.approx(2.5, abs=0.15)
+    assert [probe(str(tmp_path / f"segment_{i}.mp4"))[0] for i in range(2)] == [
+        pytest.approx(1.5, abs=0.1), pytest.approx(1.0, abs=0.1)
+    ]
+
+
+def test_concat_joins_segments_and_caps_the_length(tmp_path, scenes):
+    segment = renderer(tmp_path).render_segment(scenes[0], str(tmp_path / "segment.mp4"))
+    output = concat_segments([segment] * 3, str(tmp_path / "out.mp4"), str(tmp_path), max_duration=4)
+    assert probe(output)[0] == pytest.approx(4.0, abs=0.15)
+
+
+class OneAtATime:
+    """Scene renderer wrapper that fails if two segments are ever rendered at once."""
+    name = "ffmpeg"
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.active = 0
+        self.rendered = []
+
+    def render_segment(self, scene, output_path, threads=None, variants=()):
+        self.active += 1
+        assert self.active == 1
+        try:
+            self.rendered.append(scene["text"])
+            return self.inner.render_segment(scene, output_path, threads, variants)
+        finally:
+            self.active -= 1
+
+
+def test_low_memory_mode_renders_scenes_one_at_a_time(tmp_path, scenes):
+    scene_renderer = OneAtATime(renderer(tmp_path))
+    low_memory = SequentialRenderer(scene_renderer, str(tmp_path))
+    output = low_memory.render(scenes, str(tmp_path / "out.mp4"))
+
+    assert scene_renderer.rendered == ["hello there", "bye"]
+    assert [stats["scene"] for stats in low_memory.scene_stats] == [1, 2]
+    assert all(stats["peak_rss_mb"] > 0 for stats in low_memory.scene_stats)
+    assert probe(output)[0] == pytest.approx(2.5, abs=0.15)
+
+
+def test_low_memory_mode_skips_scenes_past_the_length_cap(tmp_path, scenes, monkeypatch):
+    monkeypatch.setattr(renderers, "MAX_DURATION", 1.5)
+    scene_renderer = OneAtATime(renderer(tmp_path))
+    SequentialRenderer(scene_renderer, str(tmp_path)).render(scenes, str(tmp_path / "out.mp4"))
+    assert scene_renderer.rendered == ["hello there"]
+
+
+def test_scene_readers_are_closed_when_a_segment_fails(tmp_path, scenes, monkeypatch):
+    class Reader:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    readers = [Reader(), Reader()]
+
+    def build_scene_clip(scene, duration, sources=None):
+        sources.extend(readers)
+        raise Exception("decode error")
+
+    moviepy_renderer = MoviePyRenderer(str(tmp_path), subtitle_renderer=None, subtitle_mode="ass")
+    monkeypatch.setattr(moviepy_renderer, "build_scene_clip", build_scene_clip)
+    with pytest.raises(Exception, match="decode error"):
+        moviepy_renderer.render_segment(scenes[0], str(tmp_path / "segment.mp4"))
+    assert all(reader.closed for reader in readers)
+
+
+VARIANTS = [
+    {"name": "small", "width": 36, "height": 64, "max_duration": MAX_DURATION, "encoder": ENCODER},
+    {"name": "cut", "width": SIZE[0], "height": SIZE[1], "max_duration": 1.2, "encoder": ENCODER},
+]
+
+
+def test_variants_are_encoded_from_one_ffmpeg_pass(tmp_path, scenes, monkeypatch):
+    ffmpeg = renderer(tmp_path)
+    commands = []
+    run = ffmpeg.run
+    monkeypatch.setattr(ffmpeg, "run", lambda cmd: commands.append(cmd) or run(cmd))
+    output = ffmpeg.render(scenes, str(tmp_path / "short.mp4"), variants=VARIANTS)
+
+    assert len(commands) == 1
+    assert variant_path(output, VARIANTS[0]) == str(tmp_path / "short.small.mp4")
+    assert probe(output) == (pytest.approx(2.5, abs=0.15), SIZE)
+    assert probe(variant_path(output, VARIANTS[0])) == (pytest.approx(2.5, abs=0.15), (36, 64))
+    assert probe(variant_path(output, VARIANTS[1]))[0] == pytest.approx(1.2, abs=0.15)
+
+
+def test_parallel_variants_skip_segments_past_their_cut(tmp_path, scenes):
+    output = ParallelRenderer(renderer(tmp_path), str(tmp_path), workers=2).render(
+        scenes, str(tmp_path / "short.mp4"), variants=VARIANTS
+    )
+    # The second scene starts at 1.5s, after the cut ends
+    assert not os.path.exists(tmp_path / "segment_1.cut.mp4")
+    assert probe(variant_path(output, VARIANTS[1]))[0] == pytest.approx(1.2, abs=0.15)
+    assert probe(variant_path(output, VARIANTS[0])) == (pytest.approx(2.5, abs=0.15), (36, 64))
+
+
+class ThreadsRecorder(FFmpegRenderer):
+    def render_segment(self, scene, output_path, threads=None, variants=()):
+        self.threads_passed = threads
+        return super().render_segment(scene, output_path, threads, variants)
+
+
+def test_low_memory_mode_keeps_the_profile_thread_count(tmp_path, scenes, monkeypatch):
+    profiled = ThreadsRecorder(str(tmp_path), encoder=dict(ENCODER, threads=1), size=SIZE)
+    SequentialRenderer(profiled, str(tmp_path)).render(scenes, str(tmp_path / "out.mp4"))
+    assert profiled.threads_passed is None
+    args = profiled.encode_args(profiled.encoder, None)
+    assert args[args.index('-threads') + 1] == '1'
+
+    # Without a profile every core is used
+    monkeypatch.setattr(os, "cpu_count", lambda: 3)
+    unprofiled = ThreadsRecorder(str(tmp_path), size=SIZE)
+    SequentialRenderer(unprofiled, str(tmp_path)).render(scenes, str(tmp_path / "out.mp4"))
+    assert unprofiled.threads_passed == 3
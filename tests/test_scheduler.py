@@ -0,0 +1,107 @@
+import queue
+import threading
+
+import scheduler
+from draft import DraftRejected
+
+
+class FakeBot:
+    job_store = None
+
+    def for_job(self, job_id):
+        return self
+
+    def remove_job_assets(self):
+        pass
+
+
+def bare_scheduler(max_active_jobs=1):
+    """A PipelineScheduler without the bot, pools and config checks its constructor sets up."""
+    sched = object.__new__(scheduler.PipelineScheduler)
+    sched.bot = FakeBot()
+    sched.upload = False
+    sched.jobs = queue.Queue()
+    sched.active_jobs = threading.BoundedSemaphore(max_active_jobs)
+    sched.active_topics = set()
+    sched.topics_lock = threading.Lock()
+    sched.pending_jobs = 0
+    sched.job_topics = {}
+    sched.results = {}
+    sched.prefetcher = None
+    return sched
+
+
+def start(sched, job_id):
+    """What dispatch_forever does before running a job."""
+    sched.submit(job_id)
+    job = sched.jobs.get()
+    sched.active_jobs.acquire()
+    return job
+
+
+def test_failed_job_is_requeued_for_resume(monkeypatch):
+    def run_pipeline(*args, **kwargs):
+        raise Exception("Stage 'render' failed")
+
+    monkeypatch.setattr(scheduler, "run_pipeline", run_pipeline)
+    sched = bare_scheduler()
+    start(sched, "job-1")
+    sched.run_job("job-1")
+    assert sched.jobs.get_nowait() == ("job-1", 1)
+
+
+def test_rejected_draft_is_not_retried(monkeypatch):
+    def run_pipeline(*args, **kwargs):
+        raise DraftRejected("Draft rejected:\n  - Video is only 4.0s long")
+
+    monkeypatch.setattr(scheduler, "run_pipeline", run_pipeline)
+    sched = bare_scheduler()
+    start(sched, "job-1")
+    sched.run_job("job-1")
+    assert sched.jobs.empty()
+    assert sched.idle()
+
+
+def test_idle_only_once_every_attempt_has_finished(monkeypatch):
+    seen = []
+
+    def run_pipeline(bot, job_id, resume=False, **kwargs):
+        seen.append(sched.idle())
+        if not resume:
+            raise Exception("Stage 'upload' failed")
+        return {"topic": "Zendaya", "video_id": "abc", "metrics": {}}
+
+    monkeypatch.setattr(scheduler, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(scheduler, "report_previous_days", lambda store: None)
+    sched = bare_scheduler()
+    assert sched.idle()
+
+    sched.run_job(*start(sched, "job-1"))
+    # Requeued for a retry: still pending
+    assert not sched.idle()
+    job = sched.jobs.get_nowait()
+    sched.active_jobs.acquire()
+    sched.run_job(*job)
+    assert seen == [False, False]
+    assert sched.idle()
+    assert sched.results["job-1"]["video_id"] == "abc"
+
+
+def test_batch_runs_jobs_concurrently_and_returns_the_successes(monkeypatch):
+    # Every job waits for the other two: jobs run one by one never get past this
+    barrier = threading.Barrier(3, timeout=10)
+
+    def run_pipeline(bot, job_id, topic=None, **kwargs):
+        barrier.wait()
+        if topic == "Zendaya":
+            raise DraftRejected("Draft rejected:\n  - Video is only 4.0s long")
+        return {"topic": topic, "video_id": None, "metrics": {}}
+
+    monkeypatch.setattr(scheduler, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(scheduler, "report_previous_days", lambda store: None)
+    sched = bare_scheduler(max_active_jobs=3)
+    results = sched.run_batch(["Taylor Swift", "Zendaya", "Black Holes"])
+
+    assert sorted(result["topic"] for result in results.values()) == ["Black Holes", "Taylor Swift"]
+    assert sched.idle()
+    assert sched.in_flight_topics() == []
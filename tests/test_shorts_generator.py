@@ -0,0 +1,194 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import shorts_generator
+from fakes import FakeServices
+from shorts_generator import YouTubeShortsBot
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    services = FakeServices(str(tmp_path / "media"), width=64, height=64, clips=1, clip_duration=2).start()
+    monkeypatch.setattr(shorts_generator, "PEXELS_API_URL", f"{services.url}/videos/search")
+    yield services
+    services.stop()
+
+
+def scenes(*queries):
+    return [{"visual_query": query, "audio_duration": 1.0} for query in queries]
+
+
+def test_scenes_are_downloaded_concurrently_in_script_order(services):
+    bot = YouTubeShortsBot(download_workers=3).prepare()
+    # Every search waits until all three are in flight: a sequential download times out here
+    barrier = threading.Barrier(3, timeout=10)
+    search = bot.search_pexels
+
+    def search_pexels(query):
+        barrier.wait()
+        return search(query)
+
+    bot.search_pexels = search_pexels
+    result = bot.download_stock_assets(scenes("ocean", "city", "forest"))
+
+    assert [scene["visual_query"] for scene in result] == ["ocean", "city", "forest"]
+    for scene in result:
+        assert os.path.getsize(scene["video_path"]) > 0
+    # Downloads land in the footage cache under their final name only
+    assert not [name for name in os.listdir(os.path.dirname(result[0]["video_path"])) if name.endswith(".part")]
+
+
+def test_failed_scene_is_dropped_and_the_others_kept(services):
+    bot = YouTubeShortsBot(download_workers=2).prepare()
+    search = bot.search_pexels
+
+    def search_pexels(query):
+        if query == "city":
+            raise Exception("HTTP 500")
+        return search(query)
+
+    bot.search_pexels = search_pexels
+    result = bot.download_stock_assets(scenes("ocean", "city", "forest"))
+    assert [scene["visual_query"] for scene in result] == ["ocean", "forest"]
+
+
+class FakePipelineBot:
+    """The bot methods run_pipeline calls, recording each call; render fails until allowed."""
+    channel = None
+    job_store = None
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.calls = []
+        self.render_fails = True
+
+    def get_trending_topic(self, regions=None, exclude=None):
+        self.calls.append("topic")
+        return "Black Holes"
+
+    def generate_script_package(self, topic):
+        self.calls.append("script")
+        return {"script": [{"text": "Black holes bend light", "visual_query": "space"}],
+                "metadata": {"title": topic, "description": "", "tags": []}}
+
+    def generate_voiceovers(self, script_data):
+        self.calls.append("audio")
+        path = self.tmp_path / "voice_0.mp3"
+        path.write_bytes(b"mp3")
+        return [dict(scene, audio_path=str(path), audio_duration=1.0) for scene in script_data]
+
+    def download_stock_assets(self, script_data):
+        self.calls.append("assets")
+        path = self.tmp_path / "footage.mp4"
+        path.write_bytes(b"mp4")
+        return [dict(scene, video_path=str(path)) for scene in script_data]
+
+    def create_video(self, script_data, output_filename):
+        self.calls.append("render")
+        if self.render_fails:
+            return None
+        path = self.tmp_path / output_filename
+        path.write_bytes(b"video")
+        return str(path)
+
+    def generate_metadata(self, topic, script_data, metadata=None):
+        self.calls.append("metadata")
+        return metadata
+
+
+def test_resumed_job_only_reruns_the_failed_stage_onwards(tmp_path):
+    bot = FakePipelineBot(tmp_path)
+    with pytest.raises(Exception, match="Stage 'render' failed"):
+        shorts_generator.run_pipeline(bot, "job-1", upload=False)
+    assert bot.calls == ["topic", "script", "audio", "assets", "render"]
+
+    bot.calls = []
+    bot.render_fails = False
+    result = shorts_generator.run_pipeline(bot, "job-1", resume=True, upload=False)
+    assert bot.calls == ["render", "metadata"]
+    assert result["topic"] == "Black Holes" and os.path.exists(result["video_path"])
+
+
+def test_resume_reruns_a_stage_whose_files_are_gone(tmp_path):
+    bot = FakePipelineBot(tmp_path)
+    bot.render_fails = False
+    shorts_generator.run_pipeline(bot, "job-1", upload=False)
+
+    os.remove(tmp_path / "footage.mp4")
+    bot.calls = []
+    shorts_generator.run_pipeline(bot, "job-1", resume=True, upload=False)
+    assert bot.calls == ["assets"]
+
+
+class FakeLLM:
+    def __init__(self, topics):
+        self.topics = topics
+        self.calls = 0
+
+    def generate_json(self, prompt, validate, use_cache=True, metrics=None):
+        self.calls += 1
+        return validate(self.topics)
+
+
+def test_batch_topics_are_distinct_and_topped_up_from_the_trends():
+    bot = YouTubeShortsBot()
+    trends = ["Keanu Reeves", "Zendaya", "Lionel Messi", "Black Holes"]
+    bot.fresh_trends = lambda regions=None, exclude=None: (list(trends), ["Lionel Messi"])
+    llm = bot.shared("llm", lambda: FakeLLM(["Zendaya", "zendaya!", "Lionel Messi"]))
+
+    # One model call for the whole batch; duplicates and used topics are dropped
+    assert bot.select_trending_topics(3) == ["Zendaya", "Keanu Reeves", "Black Holes"]
+    assert llm.calls == 1
+
+
+def test_config_errors_are_all_reported_at_once(monkeypatch):
+    monkeypatch.delenv("PEXELS_API_KEY", raising=False)
+    monkeypatch.setenv("GEMINI_API_KEY", "key")
+    with pytest.raises(shorts_generator.ConfigError) as e:
+        shorts_generator.validate_config(upload=True, render_backend="blender", subtitle_mode="karaoke")
+    message = str(e.value)
+    for problem in ("PEXELS_API_KEY", "'blender'", "'karaoke'", "YouTube credentials"):
+        assert problem in message
+    assert "GEMINI_API_KEY" not in message
+
+
+def test_valid_config_passes_without_upload_credentials(monkeypatch):
+    monkeypatch.setenv("PEXELS_API_KEY", "key")
+    monkeypatch.setenv("GEMINI_API_KEY", "key")
+    shorts_generator.validate_config(upload=False, render_backend="ffmpeg", subtitle_mode="ass")
+
+
+def test_creating_a_bot_has_no_side_effects(tmp_path):
+    YouTubeShortsBot()
+    assert os.listdir(tmp_path) == []
+
+
+class FakeTrendFetcher:
+    def __init__(self):
+        self.regions = []
+
+    def fetch(self, regions=None, metrics=None):
+        self.regions.append(regions)
+        return ["Zendaya"]
+
+
+class FakeTopicLLM:
+    def generate(self, prompt, use_cache=True, metrics=None):
+        return "Zendaya"
+
+
+def test_trending_topic_accepts_a_single_region_and_the_old_keyword():
+    bot = YouTubeShortsBot()
+    fetcher = bot.shared("trend_fetcher", FakeTrendFetcher)
+    bot.shared("llm", FakeTopicLLM)
+
+    assert bot.get_trending_topic("US") == "Zendaya"
+    with pytest.warns(DeprecationWarning):
+        assert bot.get_trending_topic(region="GB") == "Zendaya"
+    assert bot.get_trending_topic(["US", "CA"]) == "Zendaya"
+    assert fetcher.regions == [["US"], ["GB"], ["US", "CA"]]
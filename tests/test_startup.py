@@ -0,0 +1,23 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_startup import MODULES, HEAVY
+
+
+def test_importing_the_pipeline_loads_no_heavy_libraries_and_writes_nothing(tmp_path):
+    probe = (
+        f"import sys, json; sys.path.insert(0, {ROOT!r}); "
+        + "".join(f"import {module}; " for module in MODULES)
+        + f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=tmp_path, capture_output=True, text=True,
+                          env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
+    # No log files, working directories or databases until something actually runs
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,51 @@
+import pytest
+
+from asset_cache import DiskCache
+from subtitles import SubtitleRenderer, word_timings, write_ass, _ass_time, MAX_WIDTH
+
+
+def test_word_timings_follow_tts_boundaries_without_gaps():
+    scene = {"text": "ignored", "words": [
+        {"word": "Black", "start": 0.1, "end": 0.4},
+        {"word": "holes", "start": 0.6, "end": 0.9},
+        {"word": "spin", "start": 2.5, "end": 2.8},
+    ]}
+    # Each word stays up until the next; words past the clip are dropped
+    assert word_timings(scene, 2.0) == [("Black", 0.1, 0.6), ("holes", 0.6, 2.0)]
+
+
+def test_word_timings_split_the_text_evenly_without_boundaries():
+    assert word_timings({"text": "one two three four"}, 2.0) == [
+        ("one", 0.0, 0.5), ("two", 0.5, 1.0), ("three", 1.0, 1.5), ("four", 1.5, 2.0)
+    ]
+    assert word_timings({"text": "  "}, 2.0) == []
+
+
+def test_word_images_are_rasterized_once_and_reused_from_disk(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "subtitles"), max_bytes=10 * 1024 * 1024)
+    renderer = SubtitleRenderer(cache=cache)
+    image = renderer.word_image("hello")
+    assert image.shape[2] == 4 and image.shape[1] <= MAX_WIDTH
+    # Case-insensitive: the same image, straight from memory
+    assert renderer.word_image("HELLO") is image
+
+    # A new renderer (next run) reads the PNG instead of drawing the word again
+    fresh = SubtitleRenderer(cache=DiskCache(str(tmp_path / "subtitles"), max_bytes=10 * 1024 * 1024))
+    monkeypatch.setattr(fresh, "_rasterize", lambda word: pytest.fail("word rasterized again"))
+    assert (fresh.word_image("hello") == image).all()
+
+
+def test_long_words_are_shrunk_to_fit():
+    image = SubtitleRenderer().word_image("pneumonoultramicroscopicsilicovolcanoconiosis")
+    assert image.shape[1] <= MAX_WIDTH
+
+
+def test_ass_track_has_one_event_per_word(tmp_path):
+    path = write_ass([("hi", 0.0, 0.5), ("{there}", 0.5, 61.25)], str(tmp_path / "subs.ass"), 540, 960)
+    events = [line for line in open(path, encoding="utf-8") if line.startswith("Dialogue:")]
+    assert events == [
+        "Dialogue: 0,0:00:00.00,0:00:00.50,Default,,0,0,0,,HI\n",
+        "Dialogue: 0,0:00:00.50,0:01:01.25,Default,,0,0,0,,(THERE)\n",
+    ]
+    assert "PlayResY: 960" in open(path, encoding="utf-8").read()
+    assert _ass_time(3725.5) == "1:02:05.50"
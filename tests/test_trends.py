@@ -0,0 +1,107 @@
+import threading
+
+from metrics import PipelineMetrics
+from trends import TrendFetcher, TREND_REGIONS
+
+
+def feed(*titles):
+    items = "".join(f"<item><title>{t}</title></item>" for t in titles)
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, release=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.release = release
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        if self.release is not None:
+            self.release.wait(5)
+        for i in range(0, len(self.body), 7):
+            yield self.body[i:i + 7]
+
+
+class FakeSession:
+    """Serves one feed per URL; URLs in slow block until release is set."""
+
+    def __init__(self, feeds, slow=(), release=None):
+        self.feeds = feeds
+        self.slow = set(slow)
+        self.release = release
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        if headers and headers.get("If-None-Match") == "v1":
+            return FakeResponse(304)
+        return FakeResponse(200, self.feeds[url], {"ETag": "v1"}, self.release if url in self.slow else None)
+
+
+def test_feeds_are_merged_and_deduplicated(tmp_path):
+    urls = TrendFetcher.feed_urls(TREND_REGIONS)
+    session = FakeSession({url: feed("Black Holes", f"Topic {i}", "black  holes") for i, url in enumerate(urls)})
+    topics = TrendFetcher(str(tmp_path), session).fetch()
+    assert topics == ["Black Holes"] + [f"Topic {i}" for i in range(len(urls))]
+
+
+def test_stale_feed_is_revalidated_with_its_etag(tmp_path, monkeypatch):
+    import trends
+    monkeypatch.setattr(trends, "TREND_CACHE_TTL", 0)
+    url = TrendFetcher.feed_urls(["US"])[0]
+    session = FakeSession({url: feed("Zendaya")})
+    fetcher = TrendFetcher(str(tmp_path), session)
+    assert fetcher.fetch_feed(url) == ["Zendaya"]
+    assert fetcher.fetch_feed(url) == ["Zendaya"]
+    assert session.requests[1][1]["If-None-Match"] == "v1"
+
+
+def test_late_feed_counts_for_the_stage_that_started_it(tmp_path):
+    urls = TrendFetcher.feed_urls(["US"])
+    release = threading.Event()
+    session = FakeSession({url: feed(f"Feed {i}") for i, url in enumerate(urls)}, slow=urls[:1], release=release)
+    fetcher = TrendFetcher(str(tmp_path), session)
+    metrics = PipelineMetrics("job-1")
+
+    with metrics.stage("topic"):
+        topics = fetcher.fetch(["US"], deadline=0.5, metrics=metrics)
+    assert topics == [f"Feed {i}" for i in range(1, len(urls))]
+    with metrics.stage("script"):
+        release.set()
+        fetcher.pool.shutdown(wait=True)
+
+    summary = metrics.summary()
+    assert summary["topic"]["rss_requests"] == len(urls)
+    assert "rss_requests" not in summary["script"]
+
+
+def test_malformed_feed_leaves_no_temp_file_and_keeps_the_cached_copy(tmp_path, monkeypatch):
+    import os
+    import trends
+    monkeypatch.setattr(trends, "TREND_CACHE_TTL", 0)
+    url = TrendFetcher.feed_urls(["US"])[0]
+    session = FakeSession({url: feed("Zendaya")})
+    fetcher = TrendFetcher(str(tmp_path), session)
+    fetcher.fetch_feed(url)
+
+    # The feed changed and is now broken (no ETag match, so it is downloaded again)
+    session.feeds[url] = b"<rss><channel><item><title>Half"
+    fetcher.index[url]["etag"] = None
+    try:
+        fetcher.fetch_feed(url)
+        assert False, "malformed feed parsed"
+    except Exception:
+        pass
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    assert fetcher._parse_file(fetcher._cache_path(url)) == ["Zendaya"]
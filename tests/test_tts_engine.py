@@ -0,0 +1,94 @@
+import os
+import sys
+import types
+import asyncio
+
+import pytest
+
+import tts_engine
+from asset_cache import AudioCache
+from tts_engine import TICKS_PER_SECOND, MP3_BYTES_PER_SECOND
+
+
+class FakeCommunicate:
+    """edge_tts.Communicate streaming 0.5s of audio per word, with a WordBoundary for each."""
+    created = []
+
+    def __init__(self, text, voice, rate=None, boundary=None):
+        self.text = text
+        FakeCommunicate.created.append((text, voice, rate, boundary))
+
+    async def stream(self):
+        for i, word in enumerate(self.text.split()):
+            if word == "FAIL":
+                raise Exception("503 Service Unavailable")
+            yield {"type": "WordBoundary", "text": word,
+                   "offset": int(i * 0.5 * TICKS_PER_SECOND), "duration": int(0.4 * TICKS_PER_SECOND)}
+            yield {"type": "audio", "data": b"\xff" * int(0.5 * MP3_BYTES_PER_SECOND)}
+
+
+@pytest.fixture(autouse=True)
+def edge_tts(monkeypatch):
+    FakeCommunicate.created = []
+    monkeypatch.setitem(sys.modules, "edge_tts", types.SimpleNamespace(Communicate=FakeCommunicate))
+    monkeypatch.setattr(tts_engine, "TTS_MAX_RETRIES", 0)
+
+
+def test_synthesize_returns_word_timings_and_duration(tmp_path):
+    path = str(tmp_path / "voice.mp3")
+    result = asyncio.run(tts_engine.synthesize("hello brave world", path))
+
+    assert [w["word"] for w in result["words"]] == ["hello", "brave", "world"]
+    assert result["words"][1]["start"] == pytest.approx(0.5)
+    assert result["words"][1]["end"] == pytest.approx(0.9)
+    assert result["duration"] == pytest.approx(1.5)
+    assert FakeCommunicate.created[0][3] == "WordBoundary"
+    assert os.listdir(tmp_path) == ["voice.mp3"]
+
+
+def test_failed_synthesis_leaves_no_partial_file(tmp_path):
+    with pytest.raises(Exception):
+        asyncio.run(tts_engine.synthesize("hello FAIL", str(tmp_path / "voice.mp3")))
+    assert os.listdir(tmp_path) == []
+
+
+def test_batch_keeps_order_and_returns_failures_in_place(tmp_path):
+    items = [(text, str(tmp_path / f"voice_{i}.mp3")) for i, text in enumerate(["one two", "FAIL", "three"])]
+    limiter = tts_engine.TokenBucket(rate=1000, capacity=10)
+    results = asyncio.run(tts_engine.synthesize_batch_async(items, limiter=limiter))
+
+    assert [w["word"] for w in results[0]["words"]] == ["one", "two"]
+    assert isinstance(results[1], Exception)
+    assert results[2]["path"] == items[2][1]
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    async def take(n):
+        bucket = tts_engine.TokenBucket(rate=20, capacity=2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(n):
+            await bucket.acquire()
+        return loop.time() - started
+
+    # The burst is free, then one token every 50ms
+    assert asyncio.run(take(2)) < 0.04
+    assert asyncio.run(take(4)) >= 0.09
+
+
+def test_cached_voiceover_is_reused_without_a_request(tmp_path):
+    cache = AudioCache(str(tmp_path / "tts"), max_bytes=10 * 1024 * 1024)
+    first = tts_engine.synthesize_batch([("hello world", str(tmp_path / "a.mp3"))], cache=cache)[0]
+    again = tts_engine.synthesize_batch([("hello world", str(tmp_path / "b.mp3"))], cache=cache)[0]
+
+    assert len(FakeCommunicate.created) == 1
+    assert again["cached"] and again["path"] == first["path"]
+    assert again["duration"] == first["duration"] and again["words"] == first["words"]
+
+
+def test_cache_key_depends_on_text_voice_and_rate():
+    key = AudioCache.make_key("hello", "en-US-ChristopherNeural", "+25%")
+    assert key == AudioCache.make_key("hello", "en-US-ChristopherNeural", "+25%")
+    assert key != AudioCache.make_key("hello!", "en-US-ChristopherNeural", "+25%")
+    assert key != AudioCache.make_key("hello", "en-US-AriaNeural", "+25%")
+    assert key != AudioCache.make_key("hello", "en-US-ChristopherNeural", "+0%")
@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fakes import FakeServices
+from youtube_uploader import YouTubeUploader, UploadSessions, UploadQueue, CHUNK_ALIGN
+
+
+@pytest.fixture
+def services(tmp_path):
+    services = FakeServices(str(tmp_path / "media"), width=64, height=64, clips=1, clip_duration=1).start()
+    yield services
+    services.stop()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "short.mp4"
+    path.write_bytes(os.urandom(5 * CHUNK_ALIGN + 1000))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(YouTubeUploader, "backoff", staticmethod(lambda attempt: 0))
+
+
+def test_failed_chunks_are_retried(services, video, tmp_path):
+    services.upload_fail_every = 2
+    uploader = services.uploader(CHUNK_ALIGN, sessions=UploadSessions(str(tmp_path / "sessions.json")))
+    assert uploader.upload(video, "title", "description", ["tag"]) == "fake1"
+    assert services.upload_failures > 0
+    assert services.uploads == [os.path.getsize(video)]
+
+
+def test_restarted_process_resumes_the_persisted_session(services, video, tmp_path):
+    sessions_file = str(tmp_path / "sessions.json")
+    services.upload_fail_every = 3
+    # No retries: the first process gives up on the third chunk
+    first = services.uploader(CHUNK_ALIGN, max_retries=0, sessions=UploadSessions(sessions_file))
+    with pytest.raises(Exception, match="session kept"):
+        first.upload(video, "title", "description", ["tag"])
+    assert services.upload_sessions["1"]["received"] == 2 * CHUNK_ALIGN
+
+    # A new uploader (as after a restart) finds the session on disk and sends only the rest
+    services.upload_fail_every = 0
+    second = services.uploader(CHUNK_ALIGN, sessions=UploadSessions(sessions_file))
+    chunks_before = services.upload_chunks
+    assert second.upload(video, "title", "description", ["tag"]) == "fake1"
+    assert services.upload_chunks - chunks_before == 4
+    assert len(services.upload_sessions) == 1
+    assert UploadSessions(sessions_file).get(second.upload_key(video)) is None
+
+
+def test_upload_queue_returns_video_ids(services, video, tmp_path):
+    queue = UploadQueue(workers=2, uploaders={
+        channel: services.uploader(CHUNK_ALIGN, sessions=UploadSessions(str(tmp_path / f"{channel}.json")))
+        for channel in ("default", "second")
+    })
+    futures = [queue.submit(video, "title", "description", [], channel=channel) for channel in (None, "second")]
+    assert sorted(future.result(timeout=30) for future in futures) == ["fake1", "fake2"]
+    queue.close()
+
+
+def test_upload_holding_every_byte_is_finalized_with_a_status_query(services, video, tmp_path):
+    size = os.path.getsize(video)
+    ranges = []
+    receive_chunk = services.receive_chunk
+
+    def receive_without_finalizing(session_id, content_range, data):
+        ranges.append(content_range)
+        status, body, headers = receive_chunk(session_id, content_range, data)
+        if status == 201 and data:
+            # Every byte stored, but this reply doesn't carry the video yet
+            return 308, b"", {"Range": f"bytes=0-{size - 1}"}
+        return status, body, headers
+
+    services.receive_chunk = receive_without_finalizing
+    uploader = services.uploader(CHUNK_ALIGN, sessions=UploadSessions(str(tmp_path / "sessions.json")))
+    assert uploader.upload(video, "title", "description", ["tag"]) == "fake1"
+    assert ranges[-1] == f"bytes */{size}"
+    assert not [r for r in ranges if r.startswith(f"bytes {size}-")]
+
+
+def test_authenticate_youtube_returns_an_authorized_session(monkeypatch):
+    import youtube_uploader
+    from google.auth.credentials import AnonymousCredentials
+    from google.auth.transport.requests import AuthorizedSession
+
+    token_files = []
+    monkeypatch.setattr(youtube_uploader, "load_credentials",
+                        lambda token_file="token.json": token_files.append(token_file) or AnonymousCredentials())
+    assert isinstance(youtube_uploader.authenticate_youtube(), AuthorizedSession)
+    assert isinstance(YouTubeUploader(token_file="tokens/second.json").session(), AuthorizedSession)
+    assert token_files == ["token.json", "tokens/second.json"]
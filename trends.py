@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from job_store import normalize_topic
+
+TRENDS_RSS_URL = os.getenv("TRENDS_RSS_URL", "https://trends.google.com/trending/rss")
+# Comma separated Google Trends geos, e.g. "US,GB,CA"
+TREND_REGIONS = [r.strip() for r in os.getenv("TREND_REGIONS", "US").split(",") if r.strip()]
+# Daily, Entertainment, Sports
+TREND_CATEGORIES = ["", "e", "s"]
+# Topic selection never waits longer than this for slow feeds (seconds)
+TREND_FETCH_DEADLINE = float(os.getenv("TREND_FETCH_DEADLINE", "8"))
+# Feeds fetched more recently than this are served from the local cache without a request
+TREND_CACHE_TTL = int(os.getenv("TREND_CACHE_TTL", "300"))
+TREND_TIMEOUT = (3, 6)  # connect, read
+
+
+class TrendFetcher:
+    """Fetches Google Trends RSS feeds concurrently with conditional requests and a local response cache."""
+
+    def __init__(self, cache_dir, session=None, workers=8):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.session = session or requests.Session()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trends")
+        self.lock = threading.Lock()
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.index = json.load(f)
+            except Exception:
+                self.index = {}
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def feed_urls(regions):
+        return [
+            f"{TRENDS_RSS_URL}?geo={region}" + (f"&cat={cat}" if cat else "")
+            for region in regions for cat in TREND_CATEGORIES
+        ]
+
+    def _cache_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".xml")
+
+    @staticmethod
+    def _parse_file(path):
+        """Incrementally parses a cached feed, returning item titles."""
+        titles = []
+        for _, elem in ET.iterparse(path, events=("end",)):
+            if elem.tag == "item":
+                title = elem.findtext("title")
+                if title and title.strip():
+                    titles.append(title.strip())
+                elem.clear()
+        return titles
+
+    def fetch_feed(self, url, metrics=None, stage=None):
+        """Returns the titles of one feed, revalidating the cached copy with ETag/If-Modified-Since.
+
+        Counters go to the metrics stage named by stage (see fetch).
+        """
+        path = self._cache_path(url)
+        with self.lock:
+            entry = dict(self.index.get(url, {}))
+        has_cache = entry and os.path.exists(path)
+
+        if has_cache and time.time() - entry.get("fetched_at", 0) < TREND_CACHE_TTL:
+            if metrics is not None:
+                metrics.incr("rss_cache_fresh", stage=stage)
+            return self._parse_file(path)
+
+        headers = {}
+        if has_cache:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        if metrics is not None:
+            metrics.incr("rss_requests", stage=stage)
+        with self.session.get(url, headers=headers, timeout=TREND_TIMEOUT, stream=True) as r:
+            if r.status_code == 304 and has_cache:
+                if metrics is not None:
+                    metrics.incr("rss_not_modified", stage=stage)
+                entry["fetched_at"] = time.time()
+                titles = self._parse_file(path)
+            else:
+                r.raise_for_status()
+                # Parse while streaming; the body is kept for later revalidation
+                parser = ET.XMLPullParser(events=("end",))
+                titles = []
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in r.iter_content(chunk_size=16 * 1024):
+                            f.write(chunk)
+                            parser.feed(chunk)
+                            for _, elem in parser.read_events():
+                                if elem.tag == "item":
+                                    title = elem.findtext("title")
+                                    if title and title.strip():
+                                        titles.append(title.strip())
+                                    elem.clear()
+                    parser.close()
+                    os.replace(tmp_path, path)
+                finally:
+                    # Left behind only when the download or the parse failed
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                entry = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "fetched_at": time.time()
+                }
+
+        with self.lock:
+            self.index[url] = entry
+            self._save_index()
+        return titles
+
+    def fetch(self, regions=None, deadline=TREND_FETCH_DEADLINE, metrics=None):
+        """Fetches all feeds for the regions concurrently; returns titles deduplicated by normalized key.
+
+        Feeds still running at the deadline are ignored (their cached copy is used if there is one).
+        """
+        urls = self.feed_urls(regions or TREND_REGIONS)
+        # Feeds that miss the deadline finish later: they must count for the stage that started them
+        stage = metrics.current_stage() if metrics is not None else None
+        if stage is None:
+            metrics = None
+        futures = {self.pool.submit(self.fetch_feed, url, metrics, stage): url for url in urls}
+        done, pending = wait(futures, timeout=deadline)
+
+        results = {}
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"  ⚠️ Failed to fetch {futures[future]}: {e}")
+        for future in pending:
+            url = futures[future]
+            print(f"  ⏱️ {url} missed the {deadline}s deadline")
+            if os.path.exists(self._cache_path(url)):
+                results[url] = self._parse_file(self._cache_path(url))
+
+        # Keep feed order (daily first) and the first spelling of each topic
+        seen = set()
+        topics = []
+        for url in urls:
+            for title in results.get(url, []):
+                key = normalize_topic(title)
+                if key and key not in seen:
+                    seen.add(key)
+                    topics.append(title)
+        return topics
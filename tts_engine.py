@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+from asset_cache import AudioCache
+
+VOICE = "en-US-ChristopherNeural"
+RATE = "+25%"
+
+# Edge TTS reports offsets in 100ns ticks and streams 48 kbps CBR mp3
+TICKS_PER_SECOND = 10_000_000
+MP3_BYTES_PER_SECOND = 48000 / 8
+
+# Token bucket defaults: sustained requests/sec and burst size
+TTS_REQUESTS_PER_SECOND = float(os.getenv("TTS_REQUESTS_PER_SECOND", "1"))
+TTS_BURST = int(os.getenv("TTS_BURST", "3"))
+TTS_MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """Async token bucket rate limiter (replaces fixed sleeps between TTS calls)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def synthesize(text, path, voice=VOICE, rate=RATE):
+    """Synthesizes text to an mp3 at path, capturing word boundaries.
+
+    Returns {"path", "duration", "words"} where each word is
+    {"word", "start", "end"} in seconds from the start of the clip.
+    """
+    import edge_tts  # imported on first synthesis (slow import)
+
+    communicate = edge_tts.Communicate(text, voice, rate=rate, boundary="WordBoundary")
+    words = []
+    audio_bytes = 0
+    tmp_path = path + ".part"
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+                    audio_bytes += len(chunk["data"])
+                elif chunk["type"] == "WordBoundary":
+                    start = chunk["offset"] / TICKS_PER_SECOND
+                    words.append({
+                        "word": chunk["text"],
+                        "start": start,
+                        "end": start + chunk["duration"] / TICKS_PER_SECOND
+                    })
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    # CBR audio: byte count gives the exact length (never shorter than the last word)
+    duration = audio_bytes / MP3_BYTES_PER_SECOND
+    if words:
+        duration = max(duration, words[-1]["end"])
+
+    return {"path": path, "duration": duration, "words": words}
+
+
+async def _synthesize_limited(limiter, text, path, voice, rate, cache=None):
+    """Rate-limited synthesize() with exponential backoff on transient errors (e.g. 429).
+
+    With a cache, a hit returns the stored clip without touching the network or the limiter.
+    """
+    if cache is not None:
+        key = AudioCache.make_key(text, voice, rate)
+        entry = cache.get(key)
+        if entry:
+            return {"path": entry["path"], "cached": True, **entry["meta"]}
+
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            result = await synthesize(text, path, voice, rate)
+            break
+        except Exception as e:
+            if attempt == TTS_MAX_RETRIES:
+                raise
+            delay = 2 ** attempt
+            print(f"  ⚠️ TTS failed ({e}), retrying in {delay}s...")
+            await asyncio.sleep(delay)
+
+    if cache is not None:
+        meta = {"duration": result["duration"], "words": result["words"]}
+        result["path"] = cache.put(key, result["path"], ext=".mp3", meta=meta)
+    return result
+
+
+async def synthesize_batch_async(items, voice=VOICE, rate=RATE, limiter=None, cache=None):
+    """Synthesizes a list of (text, path) pairs in one event loop.
+
+    Results keep input order; a failed item is returned as its exception.
+    """
+    limiter = limiter or TokenBucket(TTS_REQUESTS_PER_SECOND, TTS_BURST)
+    tasks = [_synthesize_limited(limiter, text, path, voice, rate, cache) for text, path in items]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def synthesize_batch(items, voice=VOICE, rate=RATE, cache=None):
+    """Sync wrapper around synthesize_batch_async (one event loop for the whole batch)."""
+    return asyncio.run(synthesize_batch_async(items, voice, rate, cache=cache))
@@ -1,79 +1,372 @@
 import os
 import sys
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
+import json
+import time
+import queue
+import random
+import hashlib
+import threading
+from concurrent.futures import Future
+
+import requests
+
+# The Google client libraries are imported on first use: they are slow to import
+# and not needed at all for runs that don't upload
 
 # Scopes needed for uploading
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
-def authenticate_youtube():
-    """Handles OAuth2 authentication with YouTube."""
+# Resumable upload endpoint (overridable, e.g. to point at a local fake)
+UPLOAD_URL = os.getenv("YOUTUBE_UPLOAD_URL", "https://www.googleapis.com/upload/youtube/v3/videos")
+# Bytes per request; YouTube requires a multiple of 256 KB (except the last chunk)
+UPLOAD_CHUNK_MB = int(os.getenv("UPLOAD_CHUNK_MB", "8"))
+CHUNK_ALIGN = 256 * 1024
+# Retries (with exponential backoff) on connection errors and 5xx/429 before giving up
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "8"))
+UPLOAD_TIMEOUT = 120  # seconds per request
+RETRIABLE_STATUS = {429, 500, 502, 503, 504}
+# Resumable session URIs, so a restarted process continues an interrupted upload
+UPLOAD_SESSIONS_FILE = os.getenv("UPLOAD_SESSIONS_FILE", "upload_sessions.json")
+# YouTube keeps a session for about a week
+SESSION_MAX_AGE = 6 * 24 * 3600
+# Upload queue: pending uploads before submit() blocks, and uploads in flight
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "4"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+
+_queue_lock = threading.Lock()
+
+
+def channel_token_file(channel=None):
+    """token.json for the default channel, tokens/<channel>.json for the others."""
+    if not channel or channel == "default":
+        return "token.json"
+    return os.path.join("tokens", f"{channel}.json")
+
+
+def load_credentials(token_file="token.json", secrets_file="client_secrets.json"):
+    """Handles OAuth2 authentication with YouTube and returns valid credentials."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
     creds = None
     # The file token.json stores the user's access and refresh tokens.
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    
+    if os.path.exists(token_file):
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(
-                "client_secrets.json", SCOPES
+                secrets_file, SCOPES
             )
             # Use run_local_server with open_browser=False for remote environments
             # This will print a URL that the user can visit on their local machine
             creds = flow.run_local_server(port=0, open_browser=False)
-        
+
         # Save the credentials for the next run
-        with open("token.json", "w") as token:
+        if os.path.dirname(token_file):
+            os.makedirs(os.path.dirname(token_file), exist_ok=True)
+        with open(token_file, "w") as token:
             token.write(creds.to_json())
-    
-    return build("youtube", "v3", credentials=creds)
-
-def upload_video(file_path, title, description, tags, category_id="22"):
-    """Uploads a video to YouTube."""
-    youtube = authenticate_youtube()
-    
-    print(f"🚀 Uploading {file_path}...")
-    
-    body = {
-        "snippet": {
-            "title": title[:100],  # Max 100 chars
-            "description": description[:5000],
-            "tags": tags,
-            "categoryId": category_id
-        },
-        "status": {
-            "privacyStatus": "public", 
-            "selfDeclaredMadeForKids": False
+
+    return creds
+
+
+def authenticate_youtube(token_file="token.json"):
+    """Handles OAuth2 authentication with YouTube and returns an authorized HTTP session."""
+    from google.auth.transport.requests import AuthorizedSession
+    return AuthorizedSession(load_credentials(token_file))
+
+
+class SessionExpired(Exception):
+    """The resumable session URI is no longer valid (404/410); the upload must start over."""
+
+
+class UploadSessions:
+    """Persisted map of upload key -> resumable session URI (atomic JSON file)."""
+
+    def __init__(self, path=UPLOAD_SESSIONS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self, sessions):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(sessions, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        with self.lock:
+            entry = self._load().get(key)
+        if entry and time.time() - entry["created"] < SESSION_MAX_AGE:
+            return entry["uri"]
+        return None
+
+    def set(self, key, uri):
+        with self.lock:
+            sessions = self._load()
+            # Forget sessions YouTube has expired anyway
+            sessions = {k: v for k, v in sessions.items() if time.time() - v["created"] < SESSION_MAX_AGE}
+            sessions[key] = {"uri": uri, "created": time.time()}
+            self._save(sessions)
+
+    def remove(self, key):
+        with self.lock:
+            sessions = self._load()
+            if sessions.pop(key, None) is not None:
+                self._save(sessions)
+
+
+class YouTubeUploader:
+    """Chunked resumable uploads for one channel, reusing its credentials and HTTP session."""
+
+    def __init__(self, token_file="token.json", chunk_size=UPLOAD_CHUNK_MB * 1024 * 1024,
+                 max_retries=UPLOAD_MAX_RETRIES, sessions=None, upload_url=UPLOAD_URL, http=None):
+        self.token_file = token_file
+        self.chunk_size = max(CHUNK_ALIGN, chunk_size // CHUNK_ALIGN * CHUNK_ALIGN)
+        self.max_retries = max_retries
+        self.sessions = sessions or UploadSessions()
+        self.upload_url = upload_url
+        # AuthorizedSession refreshes the access token by itself when it expires
+        self.http = http
+        self.lock = threading.Lock()
+
+    def session(self):
+        with self.lock:
+            if self.http is None:
+                self.http = authenticate_youtube(self.token_file)
+            return self.http
+
+    def upload_key(self, file_path):
+        stat = os.stat(file_path)
+        payload = f"{self.token_file}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime}"
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @staticmethod
+    def backoff(attempt):
+        return min(64, 2 ** attempt) + random.random()
+
+    def start_session(self, body, size):
+        """Creates a resumable upload session and returns its URI."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session().post(
+                    self.upload_url,
+                    params={"uploadType": "resumable", "part": "snippet,status"},
+                    json=body,
+                    headers={"X-Upload-Content-Type": "video/mp4", "X-Upload-Content-Length": str(size)},
+                    timeout=UPLOAD_TIMEOUT
+                )
+                if r.status_code not in RETRIABLE_STATUS:
+                    r.raise_for_status()
+                    return r.headers["Location"]
+                error = f"HTTP {r.status_code}"
+            except requests.ConnectionError as e:
+                error = e
+            except requests.Timeout as e:
+                error = e
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt)
+                print(f"  ⚠️ Upload session start failed ({error}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+        raise Exception(f"Could not start upload session: {error}")
+
+    @staticmethod
+    def _parse_response(r):
+        """Returns (next_offset, video_resource or None) for a chunk/status response."""
+        if r.status_code in (200, 201):
+            return None, r.json()
+        if r.status_code == 308:
+            # Range: bytes=0-N means N+1 bytes are stored; no header means nothing yet
+            received = r.headers.get("Range")
+            return (int(received.split("-")[1]) + 1 if received else 0), None
+        if r.status_code in (404, 410):
+            raise SessionExpired(f"HTTP {r.status_code}")
+        r.raise_for_status()
+        raise Exception(f"Unexpected upload response: HTTP {r.status_code}")
+
+    def query_offset(self, uri, size):
+        """Asks the server how much of the file it already has."""
+        r = self.session().put(
+            uri, data=b"", headers={"Content-Range": f"bytes */{size}"}, timeout=UPLOAD_TIMEOUT
+        )
+        return self._parse_response(r)
+
+    def upload(self, file_path, title, description, tags, category_id="22", privacy_status="public"):
+        """Uploads a video, resuming a persisted session for the same file if there is one."""
+        size = os.path.getsize(file_path)
+        key = self.upload_key(file_path)
+        body = {
+            "snippet": {
+                "title": title[:100],  # Max 100 chars
+                "description": description[:5000],
+                "tags": tags,
+                "categoryId": category_id
+            },
+            "status": {
+                "privacyStatus": privacy_status,
+                "selfDeclaredMadeForKids": False
+            }
         }
-    }
-
-    media = MediaFileUpload(
-        file_path, 
-        chunksize=-1, 
-        resumable=True, 
-        mimetype="video/mp4"
-    )
-
-    request = youtube.videos().insert(
-        part="snippet,status",
-        body=body,
-        media_body=media
-    )
-
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            print(f"Uploaded {int(status.progress() * 100)}%")
-
-    print(f"✅ Upload Complete! Video ID: {response.get('id')}")
-    return response.get('id')
+
+        offset = 0
+        uri = self.sessions.get(key)
+        if uri:
+            try:
+                offset, video = self.query_offset(uri, size)
+                if video:
+                    self.sessions.remove(key)
+                    print(f"✅ Upload was already complete. Video ID: {video.get('id')}")
+                    return video.get('id')
+                print(f"⏩ Resuming upload of {file_path} at {offset * 100 // max(1, size)}%")
+            except SessionExpired:
+                self.sessions.remove(key)
+                uri = None
+            except Exception as e:
+                # Status unknown: the chunk loop below asks again before sending
+                print(f"  ⚠️ Could not query upload session: {e}")
+
+        if not uri:
+            print(f"🚀 Uploading {file_path}...")
+            uri = self.start_session(body, size)
+            self.sessions.set(key, uri)
+
+        attempt = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                error = None
+                try:
+                    # The server already has every byte: a status query finalizes the upload
+                    finalize = offset >= size
+                    if finalize:
+                        chunk, content_range = b"", f"bytes */{size}"
+                    else:
+                        f.seek(offset)
+                        chunk = f.read(self.chunk_size)
+                        content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{size}"
+                    r = self.session().put(
+                        uri, data=chunk, headers={"Content-Range": content_range}, timeout=UPLOAD_TIMEOUT
+                    )
+                    if r.status_code in RETRIABLE_STATUS:
+                        error = f"HTTP {r.status_code}"
+                    else:
+                        offset, video = self._parse_response(r)
+                        if video:
+                            self.sessions.remove(key)
+                            print(f"✅ Upload Complete! Video ID: {video.get('id')}")
+                            return video.get('id')
+                        if finalize and offset >= size:
+                            error = "all bytes received but the upload was not finalized"
+                        else:
+                            attempt = 0
+                            print(f"Uploaded {offset * 100 // max(1, size)}%")
+                            continue
+                except SessionExpired:
+                    print("  ⚠️ Upload session expired, starting over...")
+                    self.sessions.remove(key)
+                    uri = self.start_session(body, size)
+                    self.sessions.set(key, uri)
+                    offset = 0
+                    error = "session expired"
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise Exception(f"Upload failed after {self.max_retries} retries: {error} "
+                                    f"(session kept; the next attempt resumes at {offset} bytes)")
+                delay = self.backoff(attempt - 1)
+                print(f"  ⚠️ Chunk failed ({error}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                # Only the bytes the server doesn't have yet are sent again
+                try:
+                    offset, video = self.query_offset(uri, size)
+                    if video:
+                        self.sessions.remove(key)
+                        print(f"✅ Upload Complete! Video ID: {video.get('id')}")
+                        return video.get('id')
+                except SessionExpired:
+                    pass  # handled by the next chunk request
+                except Exception as e:
+                    print(f"  ⚠️ Could not query upload session: {e}")
+
+
+class UploadQueue:
+    """Bounded queue of uploads (possibly to several channels) served by a few worker threads."""
+
+    def __init__(self, maxsize=UPLOAD_QUEUE_SIZE, workers=UPLOAD_WORKERS, uploaders=None):
+        # channel -> YouTubeUploader, created on first use
+        self.uploaders = dict(uploaders or {})
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue(maxsize=max(1, maxsize))
+        self.threads = [
+            threading.Thread(target=self._work, name=f"upload-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def uploader(self, channel=None):
+        channel = channel or "default"
+        with self.lock:
+            if channel not in self.uploaders:
+                self.uploaders[channel] = YouTubeUploader(token_file=channel_token_file(channel))
+            return self.uploaders[channel]
+
+    def submit(self, file_path, title, description, tags, channel=None, **kwargs):
+        """Queues an upload and returns a Future of its video id (blocks while the queue is full)."""
+        future = Future()
+        self.jobs.put((future, channel, (file_path, title, description, tags), kwargs))
+        return future
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, channel, args, kwargs = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self.uploader(channel).upload(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def close(self):
+        """Waits for queued uploads to finish and stops the workers."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+_upload_queue = None
+
+
+def get_upload_queue():
+    """The process-wide upload queue (one uploader, so one set of credentials, per channel)."""
+    global _upload_queue
+    with _queue_lock:
+        if _upload_queue is None:
+            _upload_queue = UploadQueue()
+        return _upload_queue
+
+
+def upload_video(file_path, title, description, tags, category_id="22", channel=None):
+    """Uploads a video to YouTube through the upload queue and waits for its video id."""
+    return get_upload_queue().submit(file_path, title, description, tags, channel=channel,
+                                     category_id=category_id).result()
 
 if __name__ == "__main__":
     # Example usage
@@ -81,4 +374,4 @@ if __name__ == "__main__":
         vid_path = sys.argv[1]
         upload_video(vid_path, "Automated Short", "#shorts #ai", ["shorts", "automation"])
     else:
-        print("Please provide a video path as an argument.")
\ No newline at end of file
+        print("Please provide a video path as an argument.")